@@ -0,0 +1,258 @@
+"""Local HTTP service answering dashboard aggregations on demand.
+
+The datasets are loaded once into a compact in-memory frame with the per-row bin
+codes precomputed, so each request only builds a row mask for its filters and
+reduces the matching rows. Responses are cached, carry an ETag (answering 304 to
+If-None-Match) and are gzip-compressed when the client accepts it.
+
+    python aggregation_service.py [--inputs 'exports/*_IST.csv'] [--port 8000]
+
+Endpoints (all accept ?start=YYYY-MM-DD&end=YYYY-MM-DD&city=Chennai&status=COMPLETED,CANCELLED):
+    /api/data      the full payload, same shape as data.json
+    /api/summary   /api/hourly   /api/distance   /api/fare   /api/pickup
+    /api/rollup    time buckets at ?minutes=5|15|60, folded onto one day with &timeOfDay=1
+    /api/cities    cities available for the city filter
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from batch_process import city_from_path, collect_inputs
+from binning import dimension_specs
+from compact_loader import load_compact
+from dimension_aggregator import (DEFAULT_SPECS, SUMMARY_KEY, bin_codes, build_output_data, reduce_by_codes,
+                                  required_columns, row_fields)
+from ist_conversion import DATE_COLUMNS, IST_OFFSET
+from prepared_dataset import IST_FILE, is_prepared, load_prepared, prepared_path_for
+from rollup_cubes import GRANULARITIES, bucket_codes, cube_from_codes, finalize_cube, roll_up
+
+ENDPOINTS = {
+    '/api/data': None,
+    '/api/summary': 'summary',
+    '/api/hourly': 'hourlyData',
+    '/api/distance': 'distanceData',
+    '/api/fare': 'fareData',
+    '/api/pickup': 'pickupDistanceData',
+}
+
+RESPONSE_CACHE_SIZE = 256
+
+
+class AggregationDataset:
+    """All loaded rows with bin codes and aggregation fields computed once up front"""
+
+    def __init__(self, df, specs=DEFAULT_SPECS):
+        self.specs = specs
+        self.created_at = df['created_at'].to_numpy(dtype='datetime64[ns]')
+        self.status = df['status'].astype(str).to_numpy()
+        self.city = df['city'].astype(str).to_numpy()
+        self.cities = sorted(set(self.city))
+        self.fields = row_fields(df)
+        self.codes = {spec.name: bin_codes(spec, df) for spec in specs}
+        self.buckets = bucket_codes(df['created_at'], GRANULARITIES[0])
+
+    @classmethod
+    def from_inputs(cls, inputs, input_is_gst=False, specs=DEFAULT_SPECS):
+        """Load [(path, city)] into one compact frame with a city column"""
+        frames = []
+        for path, city in inputs:
+            print(f"Loading {path} ({city})...")
+            if is_prepared(path):
+                df = load_prepared(required_columns(specs), path)
+            else:
+                df = load_compact(path, required_columns(specs))
+            if input_is_gst:
+                for col in DATE_COLUMNS:
+                    if col in df.columns:
+                        df[col] = df[col] + pd.Timedelta(IST_OFFSET)
+            frames.append(df.assign(city=city))
+        return cls(pd.concat(frames, ignore_index=True), specs)
+
+    def mask(self, start=None, end=None, city=None, statuses=None):
+        mask = np.ones(len(self.created_at), dtype=bool)
+        if start is not None:
+            mask &= self.created_at >= np.datetime64(start)
+        if end is not None:
+            mask &= self.created_at < np.datetime64(end)
+        if city:
+            mask &= self.city == city
+        if statuses:
+            mask &= np.isin(self.status, list(statuses))
+        return mask
+
+    def _masked_fields(self, mask):
+        return {name: None if values is None else values[mask] for name, values in self.fields.items()}
+
+    def aggregate(self, **filters):
+        """Dashboard payload (same shape as data.json) for the rows matching filters"""
+        mask = self.mask(**filters)
+        fields = self._masked_fields(mask)
+        partials = {SUMMARY_KEY: reduce_by_codes(np.zeros(int(mask.sum()), dtype='int64'), fields, 1)}
+        for spec in self.specs:
+            partials[spec.name] = reduce_by_codes(self.codes[spec.name][mask], fields, spec.n_bins)
+        return build_output_data(partials, self.specs)
+
+    def rollup(self, minutes, time_of_day=False, **filters):
+        """Time buckets of the matching rows, rolled up from the finest cube"""
+        mask = self.mask(**filters)
+        cube = cube_from_codes(self.buckets[mask], self._masked_fields(mask), GRANULARITIES[0])
+        return {
+            'granularityMinutes': minutes,
+            'rollupData': finalize_cube(roll_up(cube, GRANULARITIES[0], minutes), time_of_day),
+        }
+
+
+def parse_filters(query):
+    """Normalize query parameters into hashable filters; end dates are inclusive"""
+    params = {key: values[-1] for key, values in parse_qs(query).items()}
+    start = pd.Timestamp(params['start']) if params.get('start') else None
+    end = None
+    if params.get('end'):
+        end = pd.Timestamp(params['end'])
+        if len(params['end']) <= 10:
+            end += pd.Timedelta(days=1)
+    statuses = tuple(sorted(s.strip().upper() for s in params.get('status', '').split(',') if s.strip()))
+    return {
+        'start': start.to_datetime64() if start is not None else None,
+        'end': end.to_datetime64() if end is not None else None,
+        'city': params.get('city') or None,
+        'statuses': statuses or None,
+    }
+
+
+def parse_rollup_options(query):
+    params = {key: values[-1] for key, values in parse_qs(query).items()}
+    minutes = int(params.get('minutes', GRANULARITIES[-1]))
+    if minutes not in GRANULARITIES:
+        raise ValueError(f"minutes must be one of {', '.join(map(str, GRANULARITIES))}")
+    return {'minutes': minutes, 'time_of_day': params.get('timeOfDay') in ('1', 'true')}
+
+
+class ResponseCache:
+    """Small thread-safe LRU of encoded responses"""
+
+    def __init__(self, max_entries=RESPONSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        value = build()
+        with self.lock:
+            self.entries[key] = value
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return value
+
+
+def encode_response(payload):
+    body = json.dumps(payload).encode()
+    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+    return {'body': body, 'gzip': gzip.compress(body, compresslevel=6), 'etag': etag}
+
+
+def make_handler(dataset, cache):
+    class AggregationHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == '/api/cities':
+                response = cache.get_or_build(('cities',), lambda: encode_response(dataset.cities))
+            elif url.path == '/api/rollup':
+                try:
+                    filters = parse_filters(url.query)
+                    options = parse_rollup_options(url.query)
+                except ValueError as e:
+                    self.send_error(400, f"Invalid filter: {e}")
+                    return
+                key = (url.path,) + tuple(sorted((k, str(v)) for k, v in {**filters, **options}.items()))
+                response = cache.get_or_build(key, lambda: encode_response(dataset.rollup(**options, **filters)))
+            elif url.path in ENDPOINTS:
+                try:
+                    filters = parse_filters(url.query)
+                except ValueError as e:
+                    self.send_error(400, f"Invalid filter: {e}")
+                    return
+                key = (url.path,) + tuple(sorted((k, str(v)) for k, v in filters.items()))
+                section = ENDPOINTS[url.path]
+
+                def build():
+                    payload = dataset.aggregate(**filters)
+                    return encode_response(payload if section is None else payload[section])
+
+                response = cache.get_or_build(key, build)
+            else:
+                self.send_error(404, "Unknown endpoint")
+                return
+
+            if self.headers.get('If-None-Match') == response['etag']:
+                self.send_response(304)
+                self._send_common_headers(response)
+                self.end_headers()
+                return
+
+            use_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+            body = response['gzip'] if use_gzip else response['body']
+            self.send_response(200)
+            self._send_common_headers(response)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            if use_gzip:
+                self.send_header('Content-Encoding', 'gzip')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_common_headers(self, response):
+            self.send_header('ETag', response['etag'])
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Vary', 'Accept-Encoding')
+            # The dashboard dev server runs on another port
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Access-Control-Expose-Headers', 'ETag')
+
+        def log_message(self, format, *args):
+            pass
+
+    return AggregationHandler
+
+
+def default_inputs():
+    """The prepared dataset if it is fresh, otherwise the IST CSV"""
+    path = prepared_path_for(IST_FILE) or IST_FILE
+    return [(path, city_from_path(IST_FILE))]
+
+
+def serve(dataset, host='127.0.0.1', port=8000):
+    server = ThreadingHTTPServer((host, port), make_handler(dataset, ResponseCache()))
+    print(f"Serving aggregations for {len(dataset.created_at)} rows on http://{host}:{port}/api/data")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Shutting down.")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve dashboard aggregations over HTTP")
+    parser.add_argument('--inputs', nargs='*', default=[], help="Glob patterns of IST exports")
+    parser.add_argument('--manifest', help="File listing one export per line, optionally 'path,city'")
+    parser.add_argument('--gst', action='store_true', help="Inputs are raw GST exports")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('AGGREGATION_PORT', 8000)))
+    args = parser.parse_args()
+
+    inputs = collect_inputs(args.inputs, args.manifest) or default_inputs()
+    serve(AggregationDataset.from_inputs(inputs, args.gst, dimension_specs()), args.host, args.port)
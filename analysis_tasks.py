@@ -0,0 +1,151 @@
+"""Background tasks for the interactive analyzer: run analyses off the menu thread, with progress and cancel.
+
+A TaskRunner runs each submitted function on a worker thread and keeps a Task
+per submission with its state, elapsed time and progress. Long-running code
+reports progress by calling checkpoint() (streaming_ingest.read_chunks does so
+for every chunk it reads); outside a task checkpoint() does nothing, so the
+same code runs unchanged from scripts.
+
+Cancellation is cooperative: Task.cancel() sets a flag and the task's next
+checkpoint raises TaskCancelled. A read that is not chunked (e.g. one Parquet
+read) cannot be interrupted, but its result is dropped.
+"""
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_WORKERS = 2
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+_current = threading.local()
+
+
+class TaskCancelled(BaseException):
+    """Raised at a checkpoint of a cancelled task.
+
+    A BaseException (like KeyboardInterrupt) so that the `except Exception`
+    error handling of the analyses does not swallow it.
+    """
+
+
+def current_task():
+    return getattr(_current, 'task', None)
+
+
+def checkpoint(message=None, rows=None):
+    """Report progress of the running task and stop it if it was cancelled; a no-op outside tasks"""
+    task = getattr(_current, 'task', None)
+    if task is not None:
+        task.progress(message, rows)
+
+
+class Task:
+    """One submitted function, its state and progress; report (if given) is called with the result"""
+
+    def __init__(self, task_id, name, func, report=None):
+        self.id = task_id
+        self.name = name
+        self.func = func
+        self.report = report
+        self.state = PENDING
+        self.message = ''
+        self.rows = 0
+        self.result = None
+        self.error = None
+        self.started = None
+        self.finished = None
+        self.reported = False
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def progress(self, message=None, rows=None):
+        if self._cancel.is_set():
+            raise TaskCancelled(self.name)
+        if message is not None:
+            self.message = message
+        if rows is not None:
+            self.rows += rows
+
+    def run(self):
+        _current.task = self
+        self.started = time.perf_counter()
+        self.state = RUNNING
+        try:
+            # Cancelled while still queued
+            self.progress()
+            self.result = self.func()
+            self.state = DONE
+        except TaskCancelled:
+            self.state = CANCELLED
+        except Exception as e:
+            self.error = e
+            self.state = FAILED
+        finally:
+            self.finished = time.perf_counter()
+            _current.task = None
+            self._done.set()
+
+    def wait(self, timeout=None):
+        """Block until the task has finished or timeout seconds have passed; True if it finished"""
+        return self._done.wait(timeout)
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    def describe(self):
+        rows = f"{self.rows:,} rows" if self.rows else ''
+        return f"#{self.id:<3} {self.name:28} {self.state:9} {self.elapsed:7.1f}s {rows:>14}  {self.message}"
+
+
+class TaskRunner:
+    """Runs tasks on a small pool of worker threads and hands back finished ones for reporting"""
+
+    def __init__(self, workers=DEFAULT_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='analysis')
+        self.tasks = {}
+        self._ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def submit(self, name, func, report=None):
+        with self.lock:
+            task = Task(next(self._ids), name, func, report)
+            self.tasks[task.id] = task
+        self.executor.submit(task.run)
+        return task
+
+    def cancel(self, task_id):
+        """Ask a task to stop; False if there is no such unfinished task"""
+        task = self.tasks.get(task_id)
+        if task is None or task.finished is not None:
+            return False
+        task.cancel()
+        return True
+
+    def active(self):
+        return [task for task in self.tasks.values() if task.finished is None]
+
+    def finished(self):
+        """Tasks that finished since the last call, in submission order"""
+        with self.lock:
+            tasks = [task for task in self.tasks.values() if task.finished is not None and not task.reported]
+            for task in tasks:
+                task.reported = True
+        return tasks
+
+    def shutdown(self):
+        """Cancel everything still running and wait for the workers to stop"""
+        for task in self.active():
+            task.cancel()
+        self.executor.shutdown(wait=True, cancel_futures=True)
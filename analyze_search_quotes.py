@@ -1,66 +1,29 @@
-import pandas as pd
-import numpy as np
+import argparse
+from compact_loader import load_compact
+from instrumentation import add_trace_argument, enable_from, stage
+from prepared_dataset import load_prepared, prepared_path_for
+from quote_summary import SUMMARY_COLUMNS, print_quote_summary, quote_summary_partial
+from streaming_ingest import stream_quote_summary
+
+parser = argparse.ArgumentParser(description="Analyze search tries and driver quotes")
+parser.add_argument('--chunksize', type=int, default=None,
+                    help="Stream the CSV in chunks of this many rows instead of loading it whole")
+add_trace_argument(parser)
+args = parser.parse_args()
+enable_from(args.trace)
 
 # Load the IST converted file
 print("Analyzing search tries and driver quotes...")
-df = pd.read_csv('Chennai_22March_IST.csv')
-
-# Basic dataset stats
-total_records = len(df)
-print(f"\nTotal records in dataset: {total_records}")
-
-# Analyze search tries
-search_repeat_counts = df['search_repeat_counter'].value_counts().sort_index()
-search_repeat_types = df['search_repeat_type'].value_counts()
-
-# Analyze driver quotes
-driver_quotes_present = df['dq.id'].notna().sum()
-driver_quotes_absent = df['dq.id'].isna().sum()
-
-# Analyze completed vs cancelled rides
-completed_rides = df[df['status'] == 'COMPLETED']
-cancelled_rides = df[df['status'] == 'CANCELLED']
-active_rides = df[df['status'] == 'ACTIVE']
-
-# Analyze driver data
-drivers_with_ratings = df['driver_rating'].notna().sum()
-avg_driver_rating = df['driver_rating'].mean()
-
-# Analyze fare and distance data
-avg_base_fare = df['base_fare'].mean()
-avg_distance = df[df['distance'].notna()]['distance'].mean() / 1000  # Convert to kilometers
+prepared_path = prepared_path_for('Chennai_22March_IST.csv')
+if prepared_path and not args.chunksize:
+    # Read only the columns the report needs from the typed, prepared dataset
+    summary = quote_summary_partial(load_prepared(SUMMARY_COLUMNS, prepared_path))
+elif args.chunksize:
+    summary = stream_quote_summary('Chennai_22March_IST.csv', args.chunksize)
+else:
+    df = load_compact('Chennai_22March_IST.csv', SUMMARY_COLUMNS)
+    summary = quote_summary_partial(df)
 
 # Print results
-print("\n=== SEARCH TRY ANALYSIS ===")
-print(f"Search repeat counter distribution:\n{search_repeat_counts}")
-print(f"\nSearch repeat type distribution:\n{search_repeat_types}")
-
-print("\n=== DRIVER QUOTE ANALYSIS ===")
-print(f"Records with driver quotes: {driver_quotes_present} ({driver_quotes_present/total_records*100:.2f}%)")
-print(f"Records without driver quotes: {driver_quotes_absent} ({driver_quotes_absent/total_records*100:.2f}%)")
-
-print("\n=== RIDE STATUS ANALYSIS ===")
-print(f"Completed rides: {len(completed_rides)} ({len(completed_rides)/total_records*100:.2f}%)")
-print(f"Cancelled rides: {len(cancelled_rides)} ({len(cancelled_rides)/total_records*100:.2f}%)")
-print(f"Active rides: {len(active_rides)} ({len(active_rides)/total_records*100:.2f}%)")
-
-print("\n=== DRIVER ANALYSIS ===")
-print(f"Drivers with ratings: {drivers_with_ratings} ({drivers_with_ratings/total_records*100:.2f}%)")
-print(f"Average driver rating: {avg_driver_rating:.2f}")
-
-print("\n=== FARE AND DISTANCE ANALYSIS ===")
-print(f"Average base fare: ₹{avg_base_fare:.2f}")
-print(f"Average distance: {avg_distance:.2f} km")
-
-# Analyze relationship between search tries and driver quotes
-print("\n=== RELATIONSHIP BETWEEN SEARCH TRIES AND DRIVER QUOTES ===")
-# Group by search_repeat_type and calculate the percentage of records with driver quotes
-quote_by_search_type = df.groupby('search_repeat_type')['dq.id'].notna().agg(['count', 'sum'])
-quote_by_search_type['percentage'] = (quote_by_search_type['sum'] / quote_by_search_type['count']) * 100
-print(quote_by_search_type)
-
-# Time distribution of search tries
-df['hour'] = pd.to_datetime(df['created_at']).dt.hour
-hourly_searches = df.groupby('hour').size()
-print("\n=== TIME DISTRIBUTION OF SEARCH TRIES ===")
-print(hourly_searches) 
\ No newline at end of file
+with stage('print_quote_summary'):
+    print_quote_summary(summary)
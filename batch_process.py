@@ -0,0 +1,170 @@
+"""Batch IST conversion and dimension aggregation over many city/date exports.
+
+Each input file is converted and aggregated in its own worker process; the
+per-file aggregate states are then merged into one dashboard JSON per city and
+one overall, plus content-hashed dashboard shards per city and date
+(dashboard_shards.py) under <output-dir>/shards/.
+
+    python batch_process.py 'exports/*_*.csv' --workers 8 --output-dir batch_output
+    python batch_process.py --manifest manifest.txt --write-ist
+
+A manifest lists one export per line, optionally followed by a comma and the
+city name; otherwise the city is taken from the file name (Chennai_22March.csv).
+--write-ist writes <name>_IST.csv next to each input; unless --ist is given,
+such files are skipped when the patterns match them again on a later run.
+"""
+import argparse
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from binning import dimension_specs
+from dashboard_shards import ALL, partials_by_date, write_shards
+from dimension_aggregator import DEFAULT_SPECS, SUMMARY_KEY, aggregate_partials, build_output_data, merge_partials
+from ist_conversion import DATE_COLUMNS, convert_frame_to_ist
+from sketches import finalize_sketches, merge_sketches, sketch_partials
+from streaming_ingest import DEFAULT_CHUNKSIZE, read_chunks
+
+
+def city_from_path(path):
+    """Chennai_22March.csv -> Chennai"""
+    return os.path.basename(path).split('_')[0].split('.')[0]
+
+
+def ist_path_for(path):
+    stem, ext = os.path.splitext(path)
+    return f'{stem}_IST{ext}'
+
+
+def is_ist_copy(path):
+    """Chennai_22March_IST.csv, as written by --write-ist next to its GST original"""
+    return os.path.splitext(path)[0].endswith('_IST')
+
+
+def collect_inputs(patterns=(), manifest=None, skip_ist_copies=False):
+    """Return [(path, city)] from glob patterns and/or a manifest file.
+
+    With skip_ist_copies, <name>_IST.csv files are left out: they are the converted
+    copies of other inputs and would be converted and counted a second time.
+    A path listed under two different cities raises ValueError.
+    """
+    inputs = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            inputs.append((path, city_from_path(path)))
+    if manifest:
+        with open(manifest) as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                path, _, city = line.partition(',')
+                path = path.strip()
+                inputs.append((path, city.strip() or city_from_path(path)))
+    if skip_ist_copies:
+        inputs = [(path, city) for path, city in inputs if not is_ist_copy(path)]
+    # A file matched twice would be counted twice
+    inputs = list(dict.fromkeys(inputs))
+    cities = {}
+    for path, city in inputs:
+        if cities.setdefault(os.path.abspath(path), city) != city:
+            raise ValueError(f"{path} is listed under both {cities[os.path.abspath(path)]} and {city}")
+    return inputs
+
+
+def process_file(path, input_is_ist=False, write_ist=False, chunksize=DEFAULT_CHUNKSIZE, specs=DEFAULT_SPECS):
+    """Convert one export to IST and aggregate it, streaming in chunks.
+
+    Runs in a worker process; returns (path, rows, partials, date partials, sketches, seconds).
+    """
+    start = time.perf_counter()
+    partials = sketches = None
+    date_partials = {}
+    ist_path = ist_path_for(path) if write_ist and not input_is_ist else None
+
+    # Text columns keep the IST CSV byte-faithful; the aggregation coerces what it needs
+    for i, chunk in enumerate(read_chunks(path, chunksize, dtype=str)):
+        if not input_is_ist:
+            chunk = convert_frame_to_ist(chunk, DATE_COLUMNS)
+        if ist_path:
+            chunk.to_csv(ist_path, index=False, mode='w' if i == 0 else 'a', header=(i == 0))
+        partials = merge_partials(partials, aggregate_partials(chunk, specs))
+        for day, state in partials_by_date(chunk, specs).items():
+            date_partials[day] = merge_partials(date_partials.get(day), state)
+        sketches = merge_sketches(sketches, sketch_partials(chunk, specs))
+
+    rows = int(partials[SUMMARY_KEY]['totalSearches'].iloc[0]) if partials else 0
+    return path, rows, partials, date_partials, sketches, time.perf_counter() - start
+
+
+def run_batch(inputs, workers=None, output_dir='batch_output', input_is_ist=False, write_ist=False,
+              chunksize=DEFAULT_CHUNKSIZE, specs=DEFAULT_SPECS):
+    """Process inputs over a process pool and write per-city and overall JSON (plus percentile sketches and shards)"""
+    per_city = {}
+    per_city_date = {}
+    per_city_sketches = {}
+    overall = overall_sketches = None
+    total_rows = 0
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(process_file, path, input_is_ist, write_ist, chunksize, specs): city for path, city in inputs}
+        for future in as_completed(futures):
+            path, rows, partials, date_partials, sketches, seconds = future.result()
+            total_rows += rows
+            print(f"Processed {path}: {rows} rows in {seconds:.2f}s")
+            if partials is None:
+                continue
+            city = futures[future]
+            per_city[city] = merge_partials(per_city.get(city), partials)
+            overall = merge_partials(overall, partials)
+            for day, state in date_partials.items():
+                per_city_date[(city, day)] = merge_partials(per_city_date.get((city, day)), state)
+            per_city_sketches[city] = merge_sketches(per_city_sketches.get(city), sketches)
+            overall_sketches = merge_sketches(overall_sketches, sketches)
+    elapsed = time.perf_counter() - start
+
+    os.makedirs(output_dir, exist_ok=True)
+    outputs = {f'{city}.json': build_output_data(partials, specs) for city, partials in per_city.items()}
+    for city, sketches in per_city_sketches.items():
+        outputs[f'{city}.sketches.json'] = finalize_sketches(sketches, specs)
+    if overall is not None:
+        outputs['overall.json'] = build_output_data(overall, specs)
+        outputs['overall.sketches.json'] = finalize_sketches(overall_sketches, specs)
+    for name, output_data in outputs.items():
+        with open(os.path.join(output_dir, name), 'w') as f:
+            json.dump(output_data, f, indent=2)
+    if overall is not None:
+        shard_partials = dict(per_city_date)
+        shard_partials.update({(city, ALL): partials for city, partials in per_city.items()})
+        shard_partials[(ALL, ALL)] = overall
+        write_shards(shard_partials, os.path.join(output_dir, 'shards'), specs)
+
+    throughput = total_rows / elapsed if elapsed > 0 else 0.0
+    print(f"\nProcessed {len(inputs)} files, {total_rows} rows in {elapsed:.2f}s "
+          f"({throughput:,.0f} rows/s with {workers or os.cpu_count()} workers)")
+    print(f"Wrote {len(outputs)} JSON files to {output_dir}/")
+    return {'files': len(inputs), 'rows': total_rows, 'seconds': elapsed, 'rows_per_second': throughput}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert and aggregate many exports in parallel")
+    parser.add_argument('patterns', nargs='*', help="Glob patterns of export CSVs")
+    parser.add_argument('--manifest', help="File listing one export per line, optionally 'path,city'")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--output-dir', default='batch_output')
+    parser.add_argument('--ist', action='store_true', help="Inputs are already in IST")
+    parser.add_argument('--write-ist', action='store_true', help="Also write <name>_IST.csv next to each input")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args()
+
+    try:
+        # Without --ist the inputs are GST exports; their _IST copies from an earlier --write-ist are skipped
+        inputs = collect_inputs(args.patterns, args.manifest, skip_ist_copies=not args.ist)
+    except ValueError as e:
+        parser.error(str(e))
+    if not inputs:
+        parser.error("no input files matched")
+    run_batch(inputs, args.workers, args.output_dir, args.ist, args.write_ist, args.chunksize, dimension_specs())
@@ -0,0 +1,72 @@
+"""Import time and cold start of the CLI (cli.py) versus the standalone scripts.
+
+Every measurement runs in a fresh interpreter. Import times are the wall time of
+importing one module; cold starts are the wall time of a whole command, from
+process start to exit, with the median of --repeat runs reported.
+Run from the repository root after `python cli.py prepare` so the stats header exists:
+    python -m benchmarks.cli_startup_benchmark [--repeat 5] [--output startup.json]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+IMPORT_MODULES = ['dataset_stats', 'cli', 'pandas', 'matplotlib.figure', 'quote_summary', 'chennai_data_analyzer']
+
+COMMANDS = [
+    ('cli.py --help', ['cli.py', '--help']),
+    ('cli.py time-range (stats)', ['cli.py', 'time-range']),
+    ('cli.py time-range --no-stats', ['cli.py', 'time-range', '--no-stats']),
+    ('time_range_ist.py', ['time_range_ist.py']),
+    ('cli.py analyze (stats)', ['cli.py', 'analyze']),
+    ('analyze_search_quotes.py', ['analyze_search_quotes.py']),
+]
+
+IMPORT_HARNESS = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+
+def import_seconds(module):
+    output = subprocess.run([sys.executable, '-c', IMPORT_HARNESS.format(module=module)],
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def command_seconds(argv):
+    start = time.perf_counter()
+    subprocess.run([sys.executable] + argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time and cold start of the CLI and the scripts")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per measurement; the median is reported")
+    parser.add_argument('--output', help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    results = {'imports': {}, 'commands': {}}
+    print(f"{'Import':34} {'Median (s)':>11}")
+    for module in IMPORT_MODULES:
+        seconds = statistics.median(import_seconds(module) for _ in range(args.repeat))
+        results['imports'][module] = seconds
+        print(f"{module:34} {seconds:>11.3f}")
+
+    print(f"\n{'Command':34} {'Median (s)':>11} {'Min (s)':>9}")
+    for name, argv in COMMANDS:
+        runs = [command_seconds(argv) for _ in range(args.repeat)]
+        results['commands'][name] = {'median_s': statistics.median(runs), 'min_s': min(runs)}
+        print(f"{name:34} {statistics.median(runs):>11.3f} {min(runs):>9.3f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
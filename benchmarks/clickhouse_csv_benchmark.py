@@ -0,0 +1,73 @@
+"""Compare the ClickHouse-dialect reader against read_csv followed by coercion.
+
+Both paths produce the typed frame the prepared dataset stores: the baseline
+reads every column as pandas infers it and then runs apply_schema (\\N and the
+epoch sentinel masked by string comparison, to_numeric/to_datetime per column);
+clickhouse_csv.read_export does it while parsing.
+
+Run from the repository root:
+    python -m benchmarks.clickhouse_csv_benchmark [--input Chennai_22March.csv] [--size 1m]
+"""
+import argparse
+import time
+
+import pandas as pd
+import pyarrow  # noqa: F401  (imported before timing so both paths start warm)
+
+from benchmarks.synthetic_data import SIZES, synthetic_path
+from clickhouse_csv import read_export
+from prepared_dataset import apply_schema
+
+
+def baseline(path):
+    return apply_schema(pd.read_csv(path), shift_to_ist=True)
+
+
+def dialect_reader(path):
+    return read_export(path, shift_to_ist=True)
+
+
+def best_of(func, path, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(path)
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+def same_values(left, right):
+    if list(left.columns) != list(right.columns):
+        return False
+    for col in left.columns:
+        a = left[col].astype(object).where(left[col].notna(), None)
+        b = right[col].astype(object).where(right[col].notna(), None)
+        if a.tolist() != b.tolist():
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--input', default=None, help='GST export to read (default: Chennai_22March.csv)')
+    parser.add_argument('--size', choices=sorted(SIZES), help='Use a synthetic export of this size instead')
+    parser.add_argument('--repeat', type=int, default=3, help='Report the best of this many runs')
+    args = parser.parse_args()
+
+    path = synthetic_path(args.size) if args.size else (args.input or 'Chennai_22March.csv')
+    print(f"Reading {path}...")
+
+    expected, baseline_time = best_of(baseline, path, args.repeat)
+    result, reader_time = best_of(dialect_reader, path, args.repeat)
+    rows = len(expected)
+
+    print(f"Rows: {rows}")
+    print(f"\nread_csv + coercion: {baseline_time:.3f}s ({rows / baseline_time:,.0f} rows/s)")
+    print(f"Dialect reader:      {reader_time:.3f}s ({rows / reader_time:,.0f} rows/s)")
+    print(f"Speedup:             {baseline_time / reader_time:.1f}x")
+    print(f"Same dtypes:         {(expected.dtypes.astype(str) == result.dtypes.astype(str)).all()}")
+    print(f"Same values:         {same_values(expected, result)}")
+
+
+if __name__ == "__main__":
+    main()
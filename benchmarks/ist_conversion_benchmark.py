@@ -0,0 +1,72 @@
+"""Compare the vectorized GST->IST conversion against the old per-row apply path.
+
+Run from the repository root:
+    python -m benchmarks.ist_conversion_benchmark [--repeat N]
+"""
+import argparse
+import datetime
+import io
+import time
+
+import pandas as pd
+
+from ist_conversion import DATE_COLUMNS, convert_frame_to_ist
+
+
+def legacy_convert_to_ist(date_str):
+    # The per-row implementation previously used by convert_gst_to_ist.py
+    if pd.isna(date_str) or date_str == '1970-01-01 00:00:00':
+        return date_str
+
+    try:
+        dt = datetime.datetime.strptime(date_str, '%Y-%m-%d %H:%M:%S')
+        ist_dt = dt + datetime.timedelta(hours=5, minutes=30)
+        return ist_dt.strftime('%Y-%m-%d %H:%M:%S')
+    except:
+        return date_str
+
+
+def legacy_convert_frame(df):
+    df = df.copy()
+    for col in DATE_COLUMNS:
+        df[col] = df[col].apply(legacy_convert_to_ist)
+    return df
+
+
+def time_call(func, df):
+    start = time.perf_counter()
+    result = func(df)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--input', default='Chennai_22March.csv')
+    parser.add_argument('--repeat', type=int, default=10,
+                        help='Tile the input this many times to simulate a larger export')
+    args = parser.parse_args()
+
+    print(f"Reading {args.input}...")
+    df = pd.read_csv(args.input)
+    if args.repeat > 1:
+        df = pd.concat([df] * args.repeat, ignore_index=True)
+    print(f"Rows: {len(df)}")
+
+    legacy_df, legacy_time = time_call(legacy_convert_frame, df)
+    vectorized_df, vectorized_time = time_call(convert_frame_to_ist, df)
+
+    # The IST CSV written by both paths must be byte-identical
+    legacy_csv = io.StringIO()
+    vectorized_csv = io.StringIO()
+    legacy_df.to_csv(legacy_csv, index=False)
+    vectorized_df.to_csv(vectorized_csv, index=False)
+    identical = legacy_csv.getvalue() == vectorized_csv.getvalue()
+
+    print(f"\nLegacy apply path:  {legacy_time:.3f}s ({len(df) / legacy_time:,.0f} rows/s)")
+    print(f"Vectorized path:    {vectorized_time:.3f}s ({len(df) / vectorized_time:,.0f} rows/s)")
+    print(f"Speedup:            {legacy_time / vectorized_time:.1f}x")
+    print(f"Byte-identical CSV: {identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Throughput of the live DAR calculator replaying an export as an event stream.
+
+The export is turned into search try / driver quote events once; --days replays
+them that many times, shifted a day apart, to show that memory stays flat as the
+stream grows. Both the in-process path (decoded events) and the JSON-lines path
+used by --tail/--socket are timed.
+
+Run from the repository root:
+    python -m benchmarks.live_dar_benchmark [--input Chennai_22March_IST.csv] [--days 7]
+"""
+import argparse
+import json
+import resource
+import sys
+import time
+
+import numpy as np
+
+from live_dar import DRIVER_QUOTE, LiveDarCalculator, replay_events
+
+SECONDS_PER_DAY = 24 * 3600
+
+
+def peak_rss_mb():
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def build_events(csv_path, days):
+    base = list(replay_events(csv_path))
+    events = []
+    for day in range(days):
+        shift = day * SECONDS_PER_DAY
+        events.extend((ts + shift, kind, f'{search_try_id}-{day}', distance)
+                      for ts, kind, search_try_id, distance in base)
+    return events
+
+
+def run_decoded(events):
+    calculator = LiveDarCalculator()
+    on_try, on_quote = calculator.on_search_try, calculator.on_driver_quote
+    max_pending = 0
+    start = time.perf_counter()
+    for i, (ts, kind, search_try_id, distance) in enumerate(events):
+        if kind == DRIVER_QUOTE:
+            on_quote(search_try_id, ts, distance)
+        else:
+            on_try(search_try_id, ts)
+        if i % 1000 == 0:
+            max_pending = max(max_pending, len(calculator.pending))
+    return calculator, time.perf_counter() - start, max_pending
+
+
+def run_json(lines):
+    calculator = LiveDarCalculator()
+    start = time.perf_counter()
+    for line in lines:
+        calculator.process(json.loads(line))
+    return calculator, time.perf_counter() - start
+
+
+def to_json_lines(events):
+    lines = []
+    for ts, kind, search_try_id, distance in events:
+        event = {'type': kind, 'search_try_id': search_try_id,
+                 'created_at': str(np.datetime64(int(ts), 's')).replace('T', ' ')}
+        if kind == DRIVER_QUOTE and distance == distance:
+            event['distance_to_pickup'] = float(distance)
+        lines.append(json.dumps(event))
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--input', default='Chennai_22March_IST.csv')
+    parser.add_argument('--days', type=int, default=7, help='Replay the export this many days in a row')
+    args = parser.parse_args()
+
+    print(f"Building events from {args.input}...")
+    events = build_events(args.input, args.days)
+    print(f"Events: {len(events):,} over {args.days} days")
+
+    calculator, decoded_time, max_pending = run_decoded(events)
+    rss_after_decoded = peak_rss_mb()
+    _, json_time = run_json(to_json_lines(events))
+
+    snapshot = calculator.snapshot()
+    print(f"\nDecoded events: {decoded_time:.3f}s ({len(events) / decoded_time:,.0f} events/s)")
+    print(f"JSON lines:     {json_time:.3f}s ({len(events) / json_time:,.0f} events/s)")
+    print(f"Max pending tries: {max_pending:,}  matched={snapshot['matched']:,} expired={snapshot['expired']:,} "
+          f"duplicates={snapshot['duplicates']:,}")
+    print(f"Peak RSS after decoded replay: {rss_after_decoded:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Pipeline-wide benchmark over synthetic exports.
+
+Times every stage of the pipeline (CSV load, GST->IST conversion, numeric
+coercion, the search quote summary, JSON aggregation and JSON write) at each
+requested size and reports wall time, peak RSS and rows/s as JSON, so results
+can be stored and compared across releases. peak_rss_mb is the stage's own
+peak where the kernel lets it be reset (Linux, /proc/self/clear_refs;
+per_stage_peak is then true) and otherwise the process-wide peak so far;
+process_peak_rss_mb is always the process-wide peak.
+
+    python -m benchmarks.pipeline_benchmark --sizes 10k 1m --output bench.json
+
+Each size runs in a fresh interpreter so peak RSS is not inherited from a
+previous size. Synthetic inputs are generated once into benchmarks/data/.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic_data import SIZES, synthetic_path
+from instrumentation import _reset_rss_peak, _rss_peak_kb
+
+
+def peak_rss_mb():
+    """Process-wide peak RSS since start"""
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def run_stages(csv_path):
+    """Run every pipeline stage on one file, returning a list of stage records"""
+    import pandas as pd
+
+    from dimension_aggregator import DEFAULT_SPECS, aggregate_partials, build_output_data
+    from ist_conversion import DATE_COLUMNS, convert_frame_to_ist
+    from quote_summary import quote_summary_partial
+
+    results = []
+    state = {}
+
+    def stage(name, func):
+        per_stage_peak = _reset_rss_peak()
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        func()
+        wall = time.perf_counter() - start_wall
+        rows = state['rows']
+        results.append({
+            'stage': name,
+            'wall_seconds': wall,
+            'cpu_seconds': time.process_time() - start_cpu,
+            'peak_rss_mb': _rss_peak_kb() / 1024 if per_stage_peak else peak_rss_mb(),
+            'per_stage_peak': per_stage_peak,
+            'process_peak_rss_mb': peak_rss_mb(),
+            'rows': rows,
+            'rows_per_second': rows / wall if wall > 0 else None,
+        })
+
+    def load():
+        state['df'] = pd.read_csv(csv_path)
+        state['rows'] = len(state['df'])
+
+    def convert():
+        state['df'] = convert_frame_to_ist(state['df'], DATE_COLUMNS)
+
+    def coerce():
+        df = state['df']
+        for col in DATE_COLUMNS:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+        for col in ['distance', 'distance_to_pickup', 'base_fare', 'driver_rating']:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    def summarize():
+        state['summary'] = quote_summary_partial(state['df'])
+
+    def aggregate():
+        state['output'] = build_output_data(aggregate_partials(state['df'], DEFAULT_SPECS), DEFAULT_SPECS)
+
+    def write_json():
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=True) as f:
+            json.dump(state['output'], f, indent=2)
+
+    stage('csv_load', load)
+    stage('gst_to_ist', convert)
+    stage('numeric_coercion', coerce)
+    stage('search_quote_summary', summarize)
+    stage('json_aggregation', aggregate)
+    stage('json_write', write_json)
+    return results
+
+
+def benchmark_size(size):
+    """Run one size in a child interpreter and return its stage records"""
+    csv_path = synthetic_path(size)
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.pipeline_benchmark', '--child', csv_path],
+        capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def environment():
+    import numpy
+    import pandas
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'commit': commit or None,
+        'python': platform.python_version(),
+        'pandas': pandas.__version__,
+        'numpy': numpy.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every pipeline stage on synthetic exports")
+    parser.add_argument('--sizes', nargs='+', default=['10k', '1m'], choices=sorted(SIZES))
+    parser.add_argument('--output', help="Write the JSON report here as well as to stdout")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_stages(args.child)))
+        return
+
+    report = {'environment': environment(), 'results': {}}
+    for size in args.sizes:
+        print(f"Benchmarking {size} ({SIZES[size]:,} rows)...", file=sys.stderr)
+        report['results'][size] = benchmark_size(size)
+        for record in report['results'][size]:
+            print(f"  {record['stage']:22} {record['wall_seconds']:8.3f}s "
+                  f"{record['peak_rss_mb']:9.1f} MB  {record['rows_per_second'] or 0:>12,.0f} rows/s",
+                  file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Cold load time and memory: raw CSV + coercion versus the prepared Parquet file and mapped column store.
+
+Each variant runs in a fresh interpreter so the numbers reflect a cold start.
+After loading, every numeric column is summed once so lazily mapped pages are
+actually read. Private memory is what the process holds on its own; pages of a
+mapped column store are shared with every other process reading it.
+Run from the repository root after `python prepared_dataset.py`:
+    python -m benchmarks.prepared_dataset_benchmark
+"""
+import json
+import subprocess
+import sys
+
+from dimension_aggregator import DEFAULT_SPECS, required_columns
+from prepared_dataset import IST_FILE, MAPPED_DIR, PREPARED_FILE
+
+# The load-and-clean work every script used to do on the IST CSV
+CSV_LOAD = f"""
+import pandas as pd
+df = pd.read_csv({IST_FILE!r})
+for col in ['created_at', 'start_time', 'dq.created_at']:
+    df[col] = pd.to_datetime(df[col], errors='coerce')
+for col in ['distance', 'distance_to_pickup', 'base_fare', 'driver_rating']:
+    df[col] = pd.to_numeric(df[col], errors='coerce')
+"""
+
+PARQUET_LOAD_ALL = f"""
+from prepared_dataset import load_prepared
+df = load_prepared(path={PREPARED_FILE!r})
+"""
+
+PARQUET_LOAD_PRUNED = f"""
+from prepared_dataset import load_prepared
+df = load_prepared({required_columns(DEFAULT_SPECS)!r}, {PREPARED_FILE!r})
+"""
+
+MAPPED_LOAD_ALL = f"""
+from prepared_dataset import load_prepared
+df = load_prepared(path={MAPPED_DIR!r})
+"""
+
+MAPPED_LOAD_PRUNED = f"""
+from prepared_dataset import load_prepared
+df = load_prepared({required_columns(DEFAULT_SPECS)!r}, {MAPPED_DIR!r})
+"""
+
+# Libraries are imported before the timer so only the load itself is measured
+HARNESS = """
+import json, resource, time
+import pandas, pyarrow
+start = time.perf_counter()
+{body}
+elapsed = time.perf_counter() - start
+df.select_dtypes('number').sum()
+private_kb = 0
+with open('/proc/self/smaps_rollup') as f:
+    for line in f:
+        if line.startswith(('Private_Clean:', 'Private_Dirty:')):
+            private_kb += int(line.split()[1])
+print(json.dumps({{'seconds': elapsed, 'rows': len(df), 'private_mb': private_kb / 1024,
+                  'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}}))
+"""
+
+
+def run_variant(body):
+    output = subprocess.run([sys.executable, '-c', HARNESS.format(body=body)],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    variants = [
+        ('CSV + coercion', CSV_LOAD),
+        ('Parquet, all columns', PARQUET_LOAD_ALL),
+        ('Parquet, aggregation columns', PARQUET_LOAD_PRUNED),
+        ('Mapped, all columns', MAPPED_LOAD_ALL),
+        ('Mapped, aggregation columns', MAPPED_LOAD_PRUNED),
+    ]
+    print(f"{'Variant':32} {'Load (s)':>10} {'Peak RSS (MB)':>15} {'Private (MB)':>14}")
+    for name, body in variants:
+        result = run_variant(body)
+        print(f"{name:32} {result['seconds']:>10.3f} {result['max_rss_mb']:>15.1f} {result['private_mb']:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Synthetic search try exports matching the real Chennai schema.
+
+Rows are written in the ClickHouse CSV dialect of the real exports: quoted
+strings, unquoted numbers, unquoted \\N for NULL, "" for missing dq.id and the
+"1970-01-01 00:00:00" sentinel for missing dq.created_at. driver_rating carries
+some non-numeric junk, and the quote-present ratio, hourly demand curve and
+value ranges follow the 22 March sample.
+
+    python -m benchmarks.synthetic_data --rows 1000000 --output synthetic_1m.csv
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from ist_conversion import IST_OFFSET
+
+HEADER = ['id', 'created_at', 'start_time', 'vehicle_variant', 'status', 'search_repeat_counter',
+          'customer_extra_fee', 'search_repeat_type', 'base_fare', 'service_tier_array', 'dq.id', 'dq.status',
+          'search_try_id', 'driver_id', 'distance_to_pickup', 'duration_to_pickup', 'dq.vehicle_variant',
+          'dq.created_at', 'driver_name', 'driver_rating', 'distance', 'fare_parameters_id', 'estimated_fare',
+          'special_location_tag', 'client_sdk_version', 'client_bundle_version']
+
+SIZES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+
+NULL = '\\N'
+EPOCH_SENTINEL = '"1970-01-01 00:00:00"'
+QUOTE_RATIO = 0.848
+
+# Searches per IST hour of day in the sample export
+HOURLY_PROFILE = np.array([24, 3, 5, 13, 28, 59, 113, 191, 340, 419, 522, 525,
+                           573, 603, 548, 602, 542, 640, 712, 663, 450, 472, 232, 54], dtype='float64')
+
+SEARCH_REPEAT_TYPES = (['INITIAL', 'REALLOCATION', 'RETRIED', 'CANCELLED_AND_RETRIED'], [0.80, 0.13, 0.06, 0.01])
+SERVICE_TIERS = (["['Auto']", "['Auto','AC Mini']", "['Auto','AC Mini','Sedan']"], [0.985, 0.013, 0.002])
+LOCATION_TAGS = ['None_SureStation_PriorityDrop', 'SureStation_None_PriorityPickup',
+                 'SureShoppingMall_None_PriorityPickup', 'None_SureMetro_PriorityDrop']
+SDK_VERSIONS = (['3.0.36', '3.0.28', '3.0.38'], [0.90, 0.09, 0.01])
+BUNDLE_VERSIONS = (['3.0.124', '3.0.68', '3.0.110', '3.0.121'], [0.85, 0.08, 0.04, 0.03])
+RATING_JUNK = ['NaN', 'N/A', '', 'null']
+FIRST_NAMES = ['KAMESH', 'SIVAGURU', 'PADMAVATHY', 'SANTHANRAJ', 'VIJI', 'GOVINDAN', 'ARUNKUMAR', 'CHELLAIYA',
+               'MURUGAN', 'SELVI', 'RAJA', 'KANNAN', 'LAKSHMI', 'PRAKASH', 'SURESH', 'DEVI']
+INITIALS = list('ABCDEFGHIJKLMNPRSTV')
+
+_HEX = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)
+
+
+def random_uuids(rng, n):
+    """n random UUID4-style strings, generated without a Python loop"""
+    raw = rng.integers(0, 256, size=(n, 16), dtype=np.uint8)
+    hex_chars = np.empty((n, 32), dtype=np.uint8)
+    hex_chars[:, 0::2] = _HEX[raw >> 4]
+    hex_chars[:, 1::2] = _HEX[raw & 0x0F]
+    out = np.full((n, 36), ord('-'), dtype=np.uint8)
+    for start, end, src in [(0, 8, 0), (9, 13, 8), (14, 18, 12), (19, 23, 16), (24, 36, 20)]:
+        out[:, start:end] = hex_chars[:, src:src + end - start]
+    return pd.Series(out.view('S36').ravel()).str.decode('ascii')
+
+
+def format_timestamps(seconds):
+    text = np.datetime_as_string(seconds.astype('datetime64[s]'), unit='s')
+    return pd.Series(text).str.replace('T', ' ', regex=False)
+
+
+def quoted(series):
+    return '"' + series.astype(str) + '"'
+
+
+def choice(rng, options, n):
+    values, weights = options
+    return pd.Series(np.asarray(values, dtype=object)[rng.choice(len(values), size=n, p=weights)])
+
+
+def _where(mask, present, missing=NULL):
+    return present.where(mask, missing)
+
+
+def generate_chunk(rng, start_row, n, total_rows, day_start, driver_ids, driver_names):
+    """Return one chunk of export lines (without trailing newlines) as a Series of str"""
+    # Monotone created_at following the hourly demand curve (IST), stored in GST like the real export
+    cdf = np.concatenate([[0.0], np.cumsum(HOURLY_PROFILE) / HOURLY_PROFILE.sum()])
+    position = (start_row + np.arange(n) + rng.random(n)) / total_rows
+    ist_seconds = np.interp(position, cdf, np.arange(25) * 3600.0).astype('int64')
+    created = day_start + ist_seconds.astype('timedelta64[s]') - IST_OFFSET
+
+    has_quote = rng.random(n) < QUOTE_RATIO
+    ids = random_uuids(rng, n)
+    driver_index = rng.integers(0, len(driver_ids), size=n)
+    base_fare = np.clip(rng.lognormal(5.0, 0.55, size=n), 30, 1200).astype('int64')
+    distance = np.clip(rng.lognormal(8.9, 0.8, size=n), 200, 60000).astype('int64')
+    pickup = rng.integers(0, 2001, size=n)
+
+    status = np.where(has_quote,
+                      np.where(rng.random(n) < 0.993, 'COMPLETED', 'ACTIVE'),
+                      np.where(rng.random(n) < 0.997, 'CANCELLED', 'COMPLETED'))
+
+    ratings = pd.Series(np.round(rng.uniform(3.0, 5.0, size=n), 1).astype(str))
+    ratings = ratings.str.replace(r'\.0$', '', regex=True)
+    rating_kind = rng.random(n)
+    ratings = ratings.where(rating_kind >= 0.2, NULL)
+    junk = pd.Series(np.asarray(RATING_JUNK, dtype=object)[rng.integers(0, len(RATING_JUNK), size=n)])
+    ratings = ratings.where(rating_kind >= 0.01, junk)
+
+    extra_fee = pd.Series((rng.integers(1, 5, size=n) * 10).astype(str))
+    location_tags = pd.Series(np.asarray(LOCATION_TAGS, dtype=object)[rng.integers(0, len(LOCATION_TAGS), size=n)])
+    quote = pd.Series(has_quote)
+
+    columns = [
+        quoted(ids),
+        quoted(format_timestamps(created)),
+        quoted(format_timestamps(created - rng.integers(0, 900, size=n).astype('timedelta64[s]'))),
+        pd.Series('"AUTO_RICKSHAW"', index=range(n)),
+        quoted(pd.Series(status)),
+        quoted(pd.Series(np.minimum(rng.geometric(0.78, size=n) - 1, 6).astype(str))),
+        _where(pd.Series(rng.random(n) < 0.055), quoted(extra_fee)),
+        quoted(choice(rng, SEARCH_REPEAT_TYPES, n)),
+        pd.Series(base_fare.astype(str)),
+        quoted(choice(rng, SERVICE_TIERS, n)),
+        _where(quote, quoted(random_uuids(rng, n)), '""'),
+        _where(quote, pd.Series(np.where(rng.random(n) < 0.996, '"Inactive"', '"Active"'))),
+        _where(quote, quoted(ids), '""'),
+        _where(quote, quoted(driver_ids.iloc[driver_index].reset_index(drop=True))),
+        _where(quote, pd.Series(pickup.astype(str))),
+        _where(quote, pd.Series((pickup // 8 + rng.integers(0, 60, size=n)).astype(str))),
+        _where(quote, pd.Series('"AUTO_RICKSHAW"', index=range(n))),
+        _where(quote, quoted(format_timestamps(created + rng.integers(1, 60, size=n).astype('timedelta64[s]'))),
+               EPOCH_SENTINEL),
+        _where(quote, quoted(driver_names.iloc[driver_index].reset_index(drop=True))),
+        _where(quote, ratings),
+        _where(quote, pd.Series(distance.astype(str))),
+        _where(quote, quoted(random_uuids(rng, n))),
+        _where(quote, pd.Series(base_fare.astype(str))),
+        _where(quote & pd.Series(rng.random(n) < 0.1), quoted(location_tags)),
+        _where(quote, quoted(choice(rng, SDK_VERSIONS, n))),
+        _where(quote, quoted(choice(rng, BUNDLE_VERSIONS, n))),
+    ]
+    return columns[0].str.cat(columns[1:], sep=',')
+
+
+def generate_export(output_path, rows, seed=22, chunk_rows=500_000, date='2025-03-22'):
+    """Write a synthetic export of the given number of rows, chunk by chunk.
+
+    The rows go to a .tmp file that replaces output_path once complete, so an
+    interrupted run never leaves a truncated export behind.
+    """
+    rng = np.random.default_rng(seed)
+    n_drivers = max(100, rows // 20)
+    driver_ids = random_uuids(rng, n_drivers)
+    driver_names = pd.Series(np.asarray(FIRST_NAMES, dtype=object)[rng.integers(0, len(FIRST_NAMES), n_drivers)]
+                             + ' ' + np.asarray(INITIALS, dtype=object)[rng.integers(0, len(INITIALS), n_drivers)])
+    day_start = np.datetime64(date, 's')
+
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(','.join(f'"{col}"' for col in HEADER) + '\n')
+        for start_row in range(0, rows, chunk_rows):
+            n = min(chunk_rows, rows - start_row)
+            lines = generate_chunk(rng, start_row, n, rows, day_start, driver_ids, driver_names)
+            f.write('\n'.join(lines))
+            f.write('\n')
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def synthetic_path(size, data_dir=os.path.join('benchmarks', 'data')):
+    """Path of the cached synthetic export for a preset size, generating it if missing"""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f'synthetic_{size}.csv')
+    if not os.path.exists(path):
+        # Progress goes to stderr: the benchmarks print their JSON report to stdout
+        print(f"Generating {SIZES[size]:,} synthetic rows into {path}...", file=sys.stderr)
+        generate_export(path, SIZES[size])
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic search try export")
+    parser.add_argument('--rows', type=int, default=SIZES['10k'])
+    parser.add_argument('--output', default='synthetic_export.csv')
+    parser.add_argument('--seed', type=int, default=22)
+    args = parser.parse_args()
+    generate_export(args.output, args.rows, args.seed)
+    print(f"Wrote {args.rows:,} rows to {args.output}")
@@ -0,0 +1,204 @@
+"""Persistent hour/bin index sidecar for slice queries without re-parsing the dataset.
+
+For every row the sidecar stores an int8 code per binning scheme (hour of day,
+distance, fare, pickup distance; -1 where the row falls in no bin) and whether
+it got a driver quote. The distance, fare and pickup bins are those of
+binning.dimension_specs(); a sidecar built with other bins is rebuilt. Row ids are also grouped into offset tables, one per
+scheme and one per (hour, scheme) pair, so a query such as "conversion rate for
+hour 18 and fare bin 100-150" reads only the row ids of that slice.
+
+    python bin_index.py --input Chennai_22March_IST.csv
+    python bin_index.py --input Chennai_22March_IST.csv --query hour=18 fare=100-150
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+from binning import bins_signature, dimension_specs
+from compact_loader import load_compact
+from dimension_aggregator import DEFAULT_SPECS, bin_codes, quote_present, required_columns
+
+# Query name of each dashboard dimension
+SCHEME_NAMES = {
+    'hourlyData': 'hour',
+    'distanceData': 'distance',
+    'fareData': 'fare',
+    'pickupDistanceData': 'pickup',
+}
+
+
+def schemes_for(specs=DEFAULT_SPECS):
+    """{scheme name: DimensionSpec} of the dashboard dimension specs"""
+    return {SCHEME_NAMES[spec.name]: spec for spec in specs}
+
+
+SCHEMES = schemes_for()
+
+INDEX_SUFFIX = '.binindex.npz'
+
+
+def bin_code(schemes, name, value):
+    """Code of one filter value, given as a bin code (int) or label (str, e.g. '18' or '100-150')"""
+    if name not in schemes:
+        raise ValueError(f"Unknown scheme {name!r}; expected one of {', '.join(schemes)}")
+    labels = [str(label) for label in schemes[name].labels]
+    if isinstance(value, str):
+        if value not in labels:
+            raise ValueError(f"{value!r} is not a bin of {name}; expected one of {', '.join(labels)}")
+        return labels.index(value)
+    if not 0 <= value < len(labels):
+        raise ValueError(f"{value!r} is not a bin of {name}")
+    return value
+
+
+def parse_filters(items, schemes=SCHEMES):
+    """{scheme: code} of command-line filters like ['hour=18', 'fare=100-150']"""
+    codes = {}
+    for item in items:
+        name, sep, value = item.partition('=')
+        if not sep:
+            raise ValueError(f"Filter {item!r} is not of the form scheme=bin")
+        codes[name] = bin_code(schemes, name, value)
+    return codes
+
+
+def index_path_for(dataset_path):
+    return dataset_path + INDEX_SUFFIX
+
+
+def _group_rows(keys, n_keys):
+    """Row ids ordered by key plus CSR offsets: rows of key k are order[offsets[k]:offsets[k + 1]]"""
+    valid = keys >= 0
+    row_ids = np.flatnonzero(valid).astype(np.int32)
+    order = row_ids[np.argsort(keys[valid], kind='stable')]
+    offsets = np.zeros(n_keys + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys[valid], minlength=n_keys), out=offsets[1:])
+    return order, offsets
+
+
+class BinIndex:
+    """Per-row bin codes and offset tables for one dataset"""
+
+    def __init__(self, arrays, schemes=SCHEMES):
+        self.arrays = arrays
+        self.schemes = schemes
+        self.codes = {name: arrays[f'codes_{name}'] for name in schemes}
+        self.has_quote = arrays['has_quote']
+
+    @classmethod
+    def build(cls, df, schemes=SCHEMES):
+        arrays = {'has_quote': quote_present(df)}
+        for name, spec in schemes.items():
+            arrays[f'codes_{name}'] = bin_codes(spec, df).astype(np.int8)
+
+        n_hours = schemes['hour'].n_bins
+        hours = arrays['codes_hour'].astype(np.int64)
+        for name, spec in schemes.items():
+            codes = arrays[f'codes_{name}'].astype(np.int64)
+            arrays[f'order_{name}'], arrays[f'offsets_{name}'] = _group_rows(codes, spec.n_bins)
+            if name != 'hour':
+                # Joint hour x bin key; -1 if either side is missing
+                keys = np.where((hours >= 0) & (codes >= 0), hours * spec.n_bins + codes, -1)
+                arrays[f'order_hour_{name}'], arrays[f'offsets_hour_{name}'] = _group_rows(keys, n_hours * spec.n_bins)
+        return cls(arrays, schemes)
+
+    def save(self, path, source_path=None):
+        meta = {'bins': np.array(json.dumps(bins_signature(self.schemes.values())))}
+        if source_path is not None:
+            stat = os.stat(source_path)
+            meta.update(source_size=np.int64(stat.st_size), source_mtime_ns=np.int64(stat.st_mtime_ns))
+        with open(path, 'wb') as f:
+            np.savez(f, **self.arrays, **meta)
+
+    @classmethod
+    def load(cls, path, source_path=None, schemes=SCHEMES):
+        """Load a sidecar, or return None if it is missing, older than source_path or built with other bins"""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            arrays = {key: data[key] for key in data.files}
+        bins = arrays.pop('bins', None)
+        if bins is None or str(bins) != json.dumps(bins_signature(schemes.values())):
+            return None
+        if source_path is not None:
+            stat = os.stat(source_path)
+            if (arrays.pop('source_size', None) != stat.st_size
+                    or arrays.pop('source_mtime_ns', None) != stat.st_mtime_ns):
+                return None
+        return cls(arrays, schemes)
+
+    def _slice(self, table, key):
+        offsets = self.arrays[f'offsets_{table}']
+        return self.arrays[f'order_{table}'][offsets[key]:offsets[key + 1]]
+
+    def rows(self, **filters):
+        """Row ids matching every filter, e.g. rows(hour=18, fare='100-150')"""
+        if not filters:
+            return np.arange(len(self.has_quote), dtype=np.int32)
+        codes = {name: bin_code(self.schemes, name, value) for name, value in filters.items()}
+
+        # Start from the narrowest offset table available, then filter by the remaining codes
+        candidates = []
+        for name, code in codes.items():
+            candidates.append(((name,), self._slice(name, code)))
+        if 'hour' in codes:
+            for name, code in codes.items():
+                if name != 'hour':
+                    key = codes['hour'] * self.schemes[name].n_bins + code
+                    candidates.append((('hour', name), self._slice(f'hour_{name}', key)))
+        covered, rows = min(candidates, key=lambda candidate: len(candidate[1]))
+
+        for name, code in codes.items():
+            if name not in covered:
+                rows = rows[self.codes[name][rows] == code]
+        return rows
+
+    def slice_stats(self, **filters):
+        """Searches, quotes and conversion rate (%) of one slice"""
+        rows = self.rows(**filters)
+        total = len(rows)
+        quotes = int(self.has_quote[rows].sum())
+        return {'totalSearches': total, 'quotesReceived': quotes,
+                'conversionRate': quotes / total * 100 if total else 0.0}
+
+
+def build_index(dataset_path, index_path=None, schemes=SCHEMES):
+    """Build and save the sidecar for a dataset CSV; returns the BinIndex"""
+    index_path = index_path or index_path_for(dataset_path)
+    print(f"Building bin index for {dataset_path}...")
+    df = load_compact(dataset_path, required_columns(schemes.values()))
+    index = BinIndex.build(df, schemes)
+    index.save(index_path, dataset_path)
+    print(f"Index written to {index_path}")
+    return index
+
+
+def load_or_build_index(dataset_path, schemes=SCHEMES):
+    """Return the sidecar index of dataset_path, rebuilding it if missing or stale"""
+    index = BinIndex.load(index_path_for(dataset_path), dataset_path, schemes)
+    return index if index is not None else build_index(dataset_path, schemes=schemes)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the hour/bin index sidecar")
+    parser.add_argument('--input', default='Chennai_22March_IST.csv')
+    parser.add_argument('--query', nargs='*', default=None,
+                        help="Filters like hour=18 fare=100-150 distance=5-10 pickup=0-500")
+    args = parser.parse_args()
+
+    schemes = schemes_for(dimension_specs())
+    if args.query is None:
+        build_index(args.input, schemes=schemes)
+    else:
+        # Checked before the index is loaded or built, so a typo fails fast
+        try:
+            codes = parse_filters(args.query, schemes)
+        except ValueError as e:
+            parser.error(str(e))
+        index = load_or_build_index(args.input, schemes)
+        stats = index.slice_stats(**codes)
+        filters = dict(item.split('=', 1) for item in args.query)
+        print(f"Slice {filters}: {stats['totalSearches']} searches, {stats['quotesReceived']} quotes, "
+              f"{stats['conversionRate']:.2f}% conversion")
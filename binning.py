@@ -0,0 +1,292 @@
+"""Registry of binning specs: fixed, quantile and log-scale bins over any numeric column.
+
+A BinningSpec declares how a column is binned; resolve() derives the edges and
+labels and returns the DimensionSpec the aggregator already bins with
+(dimension_aggregator.bin_codes, one np.searchsorted over the edges). The
+distance, fare and pickup breakdowns of data.json are registered as fixed
+binnings; more are declared in binnings.json without touching code:
+
+    [
+      {"name": "pickupQuantiles", "column": "distance_to_pickup", "kind": "quantile", "bins": 5},
+      {"name": "pickupDurationLog", "column": "duration_to_pickup", "kind": "log", "bins": 6, "low": 30, "high": 600},
+      {"name": "ratingBands", "column": "driver_rating", "kind": "fixed",
+       "edges": [0, 4, 4.5, 4.8, null], "labels": ["<4", "4-4.5", "4.5-4.8", "4.8+"]}
+    ]
+
+Edges are left-closed; null (or "inf") stands for infinity. A declared binning
+replaces a built-in one of the same name, in binnings.json and, through
+dimension_specs(), in the breakdowns of data.json, its shards and sketches
+(csv_to_json_converter.py, incremental_update.py, batch_process.py), the
+aggregation service, the bin index and the cross-tabs:
+
+    [{"name": "distanceData", "column": "distance", "scale": 1000, "edges": [0, 2, 4, 8, 16, null]}]
+
+Those breakdowns are merged across chunks, dates, files and runs, so a built-in
+can only be redefined there with fixed edges.
+
+Edges and per-row bin codes are cached per spec in the result cache, keyed on
+the dataset's content and the spec's definition, so adding or changing one
+binning reads and bins only that binning's column. The dashboard lists every
+binning from the written binnings.json.
+
+    python binning.py [--input Chennai_22March_IST.columns] [--specs binnings.json] [--list]
+"""
+import argparse
+import json
+import math
+import os
+from dataclasses import dataclass, fields, replace
+
+import numpy as np
+
+from compact_loader import load_compact
+from dimension_aggregator import (DEFAULT_SPECS, DISTANCE_SPEC, FARE_SPEC, INF, PICKUP_SPEC, DimensionSpec, bin_codes,
+                                  empty_state, finalize_dimension, numeric_values, quote_present)
+from instrumentation import add_trace_argument, enable_from, traced
+from prepared_dataset import IST_FILE, is_prepared, load_prepared, prepared_path_for
+from result_cache import DEFAULT_MAX_BYTES, ResultCache
+
+BINNINGS_FILE = 'binnings.json'
+DEFAULT_OUTPUT_PATH = 'chennai-rickshaw-analytics/public/binnings.json'
+KINDS = ('fixed', 'quantile', 'log')
+LABEL_KEY = 'range'
+
+# Quantile and log edges are rounded to this many significant digits so labels stay readable
+EDGE_DIGITS = 3
+
+
+def _edge(value):
+    return INF if value is None or value == 'inf' else float(value)
+
+
+def _round(value):
+    return float(f'{value:.{EDGE_DIGITS}g}')
+
+
+def edge_labels(edges):
+    """'a-b' for every bin and 'a+' for an open-ended last bin"""
+    return tuple(f'{low:g}+' if high == INF else f'{low:g}-{high:g}' for low, high in zip(edges, edges[1:]))
+
+
+@dataclass(frozen=True)
+class BinningSpec:
+    """Declarative binning of one column; resolve() derives its edges from the values where needed"""
+    name: str
+    column: str
+    kind: str = 'fixed'
+    title: str = None
+    edges: tuple = None         # fixed: left-closed bin edges, the last may be INF
+    labels: tuple = None        # fixed: one per bin, generated from the edges when omitted
+    bins: int = None            # quantile, log: number of bins
+    low: float = None           # log: end of the first bin [0, low); default the smallest positive value
+    high: float = None          # log: start of the open-ended last bin; default the largest value
+    scale: float = 1.0          # divide the column by this before binning
+
+    def __post_init__(self):
+        if self.kind not in KINDS:
+            raise ValueError(f"Binning {self.name}: kind must be one of {', '.join(KINDS)}")
+        if self.kind == 'fixed':
+            if not self.edges or len(self.edges) < 2 or list(self.edges) != sorted(self.edges):
+                raise ValueError(f"Binning {self.name}: fixed binnings need at least two increasing edges")
+            if self.labels is not None and len(self.labels) != len(self.edges) - 1:
+                raise ValueError(f"Binning {self.name}: {len(self.edges) - 1} bins but {len(self.labels)} labels")
+        elif not self.bins or self.bins < (2 if self.kind == 'log' else 1):
+            raise ValueError(f"Binning {self.name}: {self.kind} binnings need a number of bins")
+
+    @classmethod
+    def from_dict(cls, data):
+        unknown = set(data) - {field.name for field in fields(cls)}
+        if unknown:
+            raise ValueError(f"Binning {data.get('name')}: unknown keys {', '.join(sorted(unknown))}")
+        data = dict(data)
+        if data.get('edges') is not None:
+            data['edges'] = tuple(_edge(value) for value in data['edges'])
+        if data.get('labels') is not None:
+            data['labels'] = tuple(str(label) for label in data['labels'])
+        return cls(**data)
+
+    @classmethod
+    def from_dimension(cls, spec, title):
+        return cls(name=spec.name, column=spec.column, title=title, edges=spec.edges,
+                   labels=tuple(str(label) for label in spec.labels), scale=spec.scale)
+
+    def definition(self):
+        """JSON-able form of the spec (INF edges as None); also the cache key of its bin codes"""
+        data = {field.name: getattr(self, field.name) for field in fields(self)}
+        if self.edges is not None:
+            data['edges'] = [None if edge == INF else edge for edge in self.edges]
+        if self.labels is not None:
+            data['labels'] = list(self.labels)
+        return data
+
+    def _edges(self, values):
+        if self.kind == 'fixed':
+            return tuple(self.edges)
+        present = values[~np.isnan(values)]
+        if len(present) == 0:
+            return (0.0, INF)
+        start = 0.0 if present.min() >= 0 else math.floor(present.min())
+        if self.kind == 'quantile':
+            inner = np.quantile(present, np.linspace(0, 1, self.bins + 1)[1:-1])
+        else:
+            positive = present[present > 0]
+            low = self.low or (positive.min() if len(positive) else 1.0)
+            high = self.high or max(present.max(), low)
+            inner = np.geomspace(low, high, self.bins - 1)
+        # Rounding can merge neighbouring edges (e.g. quantiles of a skewed column); such bins are dropped
+        inner = sorted({_round(edge) for edge in inner if edge > start})
+        return (start, *inner, INF)
+
+    def resolve(self, values):
+        """The DimensionSpec with this spec's edges and labels; values (scaled) are only read by quantile and log"""
+        edges = self._edges(values / self.scale)
+        labels = self.labels if self.kind == 'fixed' and self.labels is not None else edge_labels(edges)
+        return DimensionSpec(name=self.name, label_key=LABEL_KEY, column=self.column, labels=tuple(labels),
+                             edges=edges, scale=self.scale)
+
+
+BUILTIN_BINNINGS = (
+    BinningSpec.from_dimension(DISTANCE_SPEC, 'Trip distance (km)'),
+    BinningSpec.from_dimension(FARE_SPEC, 'Base fare (₹)'),
+    BinningSpec.from_dimension(PICKUP_SPEC, 'Pickup distance (m)'),
+)
+
+
+def load_registry(path=BINNINGS_FILE):
+    """The built-in binnings plus those declared in path (a JSON list), in order; names are unique"""
+    registry = {spec.name: spec for spec in BUILTIN_BINNINGS}
+    if path and os.path.exists(path):
+        with open(path) as f:
+            for data in json.load(f):
+                spec = BinningSpec.from_dict(data)
+                registry[spec.name] = spec
+    return list(registry.values())
+
+
+def dimension_specs(path=BINNINGS_FILE, specs=DEFAULT_SPECS):
+    """The dashboard's dimension specs, with the built-in binnings that path redefines replaced.
+
+    Only fixed edges can replace a built-in breakdown; label keys and averages stay the built-in ones.
+    """
+    registry = {spec.name: spec for spec in load_registry(path)}
+    resolved = []
+    for dimension in specs:
+        binning = registry.get(dimension.name)
+        if binning is None or binning in BUILTIN_BINNINGS:
+            resolved.append(dimension)
+            continue
+        if binning.kind != 'fixed':
+            raise ValueError(f"Binning {binning.name}: a dashboard breakdown can only be redefined with fixed edges, "
+                             f"its partial states are merged across chunks, dates and files")
+        labels = binning.labels if binning.labels is not None else edge_labels(binning.edges)
+        resolved.append(replace(dimension, column=binning.column, edges=tuple(binning.edges), labels=tuple(labels),
+                                scale=binning.scale))
+    return tuple(resolved)
+
+
+def bins_signature(specs):
+    """Column, scale and edges of every binned dimension; state built with other bins no longer fits"""
+    return {spec.name: [spec.column, spec.scale, [None if edge == float('inf') else edge for edge in spec.edges]]
+            for spec in specs if spec.edges is not None}
+
+
+def source_path(path):
+    """The file whose content keys the cache: the dataset itself, or a column store's schema"""
+    return os.path.join(path, 'schema.json') if os.path.isdir(path) else path
+
+
+def load_columns(path, columns):
+    if is_prepared(path):
+        return load_prepared(columns, path)
+    return load_compact(path, columns)
+
+
+@traced()
+def binning_codes(specs, path, cache=None):
+    """{name: (resolved DimensionSpec, per-row bin codes)} and the per-row quote flags.
+
+    With a cache, only the columns of specs whose codes are not cached yet are read.
+    """
+    source = source_path(path)
+    keys = {}
+    results = {}
+    quoted = None
+    if cache is not None:
+        keys = {spec.name: cache.key(source, f'binning/{spec.name}', spec.definition()) for spec in specs}
+        keys['quoted'] = cache.key(source, 'binning/quoted')
+        for spec in specs:
+            value = cache.get(keys[spec.name])
+            if value is not None:
+                results[spec.name] = value
+        quoted = cache.get(keys['quoted'])
+
+    missing = [spec for spec in specs if spec.name not in results]
+    columns = list(dict.fromkeys([spec.column for spec in missing] + (['dq.id'] if quoted is None else [])))
+    if columns:
+        print(f"Reading {', '.join(columns)} from {path}...")
+        df = load_columns(path, columns)
+        if quoted is None:
+            quoted = quote_present(df)
+            if cache is not None:
+                cache.put(keys['quoted'], quoted)
+        for spec in missing:
+            resolved = spec.resolve(numeric_values(df, spec.column))
+            codes = bin_codes(resolved, df).astype(np.int16)
+            results[spec.name] = (resolved, codes)
+            if cache is not None:
+                cache.put(keys[spec.name], results[spec.name])
+    return results, quoted
+
+
+def binning_records(resolved, codes, quoted):
+    """Searches, quotes and conversion rate per bin, as in the breakdowns of data.json"""
+    state = empty_state(resolved.n_bins)
+    valid = codes >= 0
+    state['totalSearches'] = np.bincount(codes[valid], minlength=resolved.n_bins)
+    state['quotesReceived'] = np.bincount(codes[valid], weights=quoted[valid], minlength=resolved.n_bins).astype('int64')
+    return finalize_dimension(resolved, state)
+
+
+def build_binnings(specs, path, cache=None):
+    """Dashboard payload listing every binning with its resolved edges and per-bin data"""
+    results, quoted = binning_codes(specs, path, cache)
+    binnings = []
+    for spec in specs:
+        resolved, codes = results[spec.name]
+        binnings.append({
+            'name': spec.name,
+            'title': spec.title or spec.name,
+            'column': spec.column,
+            'kind': spec.kind,
+            'edges': [None if edge == INF else edge for edge in resolved.edges],
+            'labels': list(resolved.labels),
+            'data': binning_records(resolved, codes, quoted),
+        })
+    return {'labelKey': LABEL_KEY, 'binnings': binnings}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bin columns by the fixed, quantile and log binnings of the registry")
+    parser.add_argument('--input', default=None, help="IST export (CSV, prepared parquet or mapped column store)")
+    parser.add_argument('--specs', default=BINNINGS_FILE, help="JSON list of binnings added to the built-in ones")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_PATH)
+    parser.add_argument('--list', action='store_true', help="Only list the registered binnings")
+    parser.add_argument('--no-cache', action='store_true', help="Recompute the bin codes of every binning")
+    add_trace_argument(parser)
+    args = parser.parse_args()
+    enable_from(args.trace)
+
+    specs = load_registry(args.specs)
+    if args.list:
+        for spec in specs:
+            definition = {key: value for key, value in spec.definition().items()
+                          if value is not None and key not in ('name', 'column', 'kind', 'title')}
+            print(f"{spec.name:24} {spec.kind:9} {spec.column:20} {json.dumps(definition)}")
+    else:
+        path = args.input or prepared_path_for(IST_FILE) or IST_FILE
+        cache = None if args.no_cache else ResultCache(max_bytes=DEFAULT_MAX_BYTES)
+        payload = build_binnings(specs, path, cache)
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        print(f"Writing {len(payload['binnings'])} binnings to {args.output}...")
+        with open(args.output, 'w') as f:
+            json.dump(payload, f, indent=2)
@@ -1,5 +1,5 @@
-import React, { useState, useEffect } from 'react';
-import { Container, Row, Col, Card, Nav, Navbar, Alert } from 'react-bootstrap';
+import React, { useState, useEffect, useRef } from 'react';
+import { Container, Row, Col, Card, Nav, Navbar, Alert, Form } from 'react-bootstrap';
 import 'bootstrap/dist/css/bootstrap.min.css';
 import './App.css';
 
@@ -9,16 +9,103 @@ import DistanceAnalysis from './components/DistanceAnalysis';
 import FareAnalysis from './components/FareAnalysis';
 import PickupDistanceAnalysis from './components/PickupDistanceAnalysis';
 import Summary from './components/Summary';
+import RollupAnalysis from './components/RollupAnalysis';
+import BinningAnalysis from './components/BinningAnalysis';
+
+// When set (e.g. http://localhost:8000), data comes from aggregation_service.py and can be filtered
+const API_URL = process.env.REACT_APP_API_URL;
+
+const STATUSES = ['COMPLETED', 'CANCELLED', 'ACTIVE'];
+
+// Payload section each tab renders, and the aggregation service endpoint serving it
+const TAB_SECTIONS = {
+  summary: { section: 'summary', endpoint: '/api/summary' },
+  hourly: { section: 'hourlyData', endpoint: '/api/hourly' },
+  distance: { section: 'distanceData', endpoint: '/api/distance' },
+  fare: { section: 'fareData', endpoint: '/api/fare' },
+  pickup: { section: 'pickupDistanceData', endpoint: '/api/pickup' },
+};
+
+// Written by csv_to_json_converter.py: content-hashed shards per section, city and date
+const SHARD_DIR = '/shards';
+const ALL = 'all';
+
+function buildQuery(filters) {
+  const params = new URLSearchParams();
+  Object.entries(filters).forEach(([key, value]) => {
+    if (value) {
+      params.set(key, value);
+    }
+  });
+  return params.toString();
+}
+
+function sectionUrl(tab, filters, manifest) {
+  const { section, endpoint } = TAB_SECTIONS[tab];
+  if (API_URL) {
+    return `${API_URL}${endpoint}?${buildQuery(filters)}`;
+  }
+  const byCity = manifest.shards[section] || {};
+  const byDate = byCity[filters.city || ALL] || {};
+  const shard = byDate[filters.date || ALL];
+  return shard ? `${SHARD_DIR}/${shard}` : null;
+}
 
 function App() {
+  const [manifest, setManifest] = useState(null);
   const [data, setData] = useState(null);
-  const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [activeTab, setActiveTab] = useState('summary');
+  const [filters, setFilters] = useState(
+    API_URL ? { start: '', end: '', city: '', status: '' } : { date: '', city: '' }
+  );
+  const [cities, setCities] = useState([]);
+  // Responses by URL; shard URLs change whenever their contents do, so they never go stale
+  const responses = useRef(new Map());
+
+  useEffect(() => {
+    if (API_URL) {
+      fetch(`${API_URL}/api/cities`)
+        .then(response => response.json())
+        .then(setCities)
+        .catch(err => console.error('Error fetching cities:', err));
+      return;
+    }
+    // The manifest is small and changes with every run, so always revalidate it
+    fetch(`${SHARD_DIR}/manifest.json`, { cache: 'no-cache' })
+      .then(response => {
+        if (!response.ok) {
+          throw new Error('Failed to fetch the shard manifest');
+        }
+        return response.json();
+      })
+      .then(jsonManifest => {
+        setManifest(jsonManifest);
+        setCities(jsonManifest.cities);
+      })
+      .catch(err => {
+        console.error('Error fetching manifest:', err);
+        setError(err.message);
+      });
+  }, []);
 
   useEffect(() => {
-    // Fetch the data from our JSON file
-    fetch('/data.json')
+    // Only the section the active tab shows is fetched, for the selected filters
+    if (!TAB_SECTIONS[activeTab] || (!API_URL && !manifest)) {
+      return;
+    }
+    const url = sectionUrl(activeTab, filters, manifest);
+    if (!url) {
+      setData({ tab: activeTab, empty: true });
+      return;
+    }
+    if (responses.current.has(url)) {
+      setData({ tab: activeTab, payload: responses.current.get(url) });
+      return;
+    }
+    let cancelled = false;
+    setData(null);
+    fetch(url)
       .then(response => {
         if (!response.ok) {
           throw new Error('Failed to fetch data');
@@ -26,24 +113,24 @@ function App() {
         return response.json();
       })
       .then(jsonData => {
-        setData(jsonData);
-        setLoading(false);
+        responses.current.set(url, jsonData);
+        if (!cancelled) {
+          setData({ tab: activeTab, payload: jsonData });
+          setError(null);
+        }
       })
       .catch(err => {
         console.error('Error fetching data:', err);
-        setError(err.message);
-        setLoading(false);
+        if (!cancelled) {
+          setError(err.message);
+        }
       });
-  }, []);
+    return () => {
+      cancelled = true;
+    };
+  }, [activeTab, filters, manifest]);
 
-  if (loading) {
-    return (
-      <Container className="mt-5 text-center">
-        <h2>Loading data...</h2>
-        <p>Please wait while we analyze the Chennai auto-rickshaw data.</p>
-      </Container>
-    );
-  }
+  const updateFilter = (key) => (event) => setFilters({ ...filters, [key]: event.target.value });
 
   if (error) {
     return (
@@ -52,13 +139,30 @@ function App() {
           <Alert.Heading>Error loading data</Alert.Heading>
           <p>{error}</p>
           <p>
-            Make sure you've run the Python script to generate the data.json file.
+            Make sure you've run the Python script to generate the dashboard data (data.json and shards/).
           </p>
         </Alert>
       </Container>
     );
   }
 
+  const tabData = data && data.tab === activeTab ? data : null;
+
+  const renderSection = (render) => {
+    if (!tabData) {
+      return (
+        <div className="mt-5 text-center">
+          <h2>Loading data...</h2>
+          <p>Please wait while we analyze the Chennai auto-rickshaw data.</p>
+        </div>
+      );
+    }
+    if (tabData.empty) {
+      return <Alert variant="info">No data for the selected city and date.</Alert>;
+    }
+    return render(tabData.payload);
+  };
+
   return (
     <div className="App">
       <Navbar bg="dark" variant="dark" expand="lg">
@@ -102,6 +206,20 @@ function App() {
               >
                 By Pickup Distance
               </Nav.Link>
+              <Nav.Link 
+                href="#rollups" 
+                active={activeTab === 'rollups'}
+                onClick={() => setActiveTab('rollups')}
+              >
+                Time Rollups
+              </Nav.Link>
+              <Nav.Link 
+                href="#binnings" 
+                active={activeTab === 'binnings'}
+                onClick={() => setActiveTab('binnings')}
+              >
+                Binnings
+              </Nav.Link>
             </Nav>
           </Navbar.Collapse>
         </Container>
@@ -118,25 +236,75 @@ function App() {
           </Col>
         </Row>
 
-        {activeTab === 'summary' && (
-          <Summary data={data.summary} />
+        {!API_URL && manifest && (
+          <Card className="mb-4">
+            <Card.Body>
+              <Row>
+                <Col md={3}>
+                  <Form.Label>Date</Form.Label>
+                  <Form.Select value={filters.date} onChange={updateFilter('date')}>
+                    <option value="">All dates</option>
+                    {manifest.dates.map(date => <option key={date} value={date}>{date}</option>)}
+                  </Form.Select>
+                </Col>
+                <Col md={3}>
+                  <Form.Label>City</Form.Label>
+                  <Form.Select value={filters.city} onChange={updateFilter('city')}>
+                    <option value="">All cities</option>
+                    {cities.map(city => <option key={city} value={city}>{city}</option>)}
+                  </Form.Select>
+                </Col>
+              </Row>
+            </Card.Body>
+          </Card>
         )}
 
-        {activeTab === 'hourly' && (
-          <HourlyAnalysis data={data.hourlyData} />
+        {API_URL && (
+          <Card className="mb-4">
+            <Card.Body>
+              <Row>
+                <Col md={3}>
+                  <Form.Label>From</Form.Label>
+                  <Form.Control type="date" value={filters.start} onChange={updateFilter('start')} />
+                </Col>
+                <Col md={3}>
+                  <Form.Label>To</Form.Label>
+                  <Form.Control type="date" value={filters.end} onChange={updateFilter('end')} />
+                </Col>
+                <Col md={3}>
+                  <Form.Label>City</Form.Label>
+                  <Form.Select value={filters.city} onChange={updateFilter('city')}>
+                    <option value="">All cities</option>
+                    {cities.map(city => <option key={city} value={city}>{city}</option>)}
+                  </Form.Select>
+                </Col>
+                <Col md={3}>
+                  <Form.Label>Status</Form.Label>
+                  <Form.Select value={filters.status} onChange={updateFilter('status')}>
+                    <option value="">All statuses</option>
+                    {STATUSES.map(status => <option key={status} value={status}>{status}</option>)}
+                  </Form.Select>
+                </Col>
+              </Row>
+            </Card.Body>
+          </Card>
         )}
 
-        {activeTab === 'distance' && (
-          <DistanceAnalysis data={data.distanceData} />
-        )}
+        {activeTab === 'summary' && renderSection(payload => <Summary data={payload} />)}
 
-        {activeTab === 'fare' && (
-          <FareAnalysis data={data.fareData} />
-        )}
+        {activeTab === 'hourly' && renderSection(payload => <HourlyAnalysis data={payload} />)}
+
+        {activeTab === 'distance' && renderSection(payload => <DistanceAnalysis data={payload} />)}
+
+        {activeTab === 'fare' && renderSection(payload => <FareAnalysis data={payload} />)}
 
-        {activeTab === 'pickup' && (
-          <PickupDistanceAnalysis data={data.pickupDistanceData} />
+        {activeTab === 'pickup' && renderSection(payload => <PickupDistanceAnalysis data={payload} />)}
+
+        {activeTab === 'rollups' && (
+          <RollupAnalysis apiUrl={API_URL} query={buildQuery(filters)} />
         )}
+
+        {activeTab === 'binnings' && <BinningAnalysis />}
       </Container>
 
       <footer className="bg-light mt-5 py-3 text-center">
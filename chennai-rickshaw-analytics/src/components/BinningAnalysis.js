@@ -0,0 +1,95 @@
+import React, { useState, useEffect } from 'react';
+import { Row, Col, Card, Form, Alert } from 'react-bootstrap';
+import {
+  XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer,
+  Bar, Line, ComposedChart
+} from 'recharts';
+
+const KIND_DESCRIPTIONS = {
+  fixed: 'Fixed edges',
+  quantile: 'Quantile edges: every bin holds about the same number of search tries',
+  log: 'Log-scale edges',
+};
+
+const BinningAnalysis = () => {
+  const [binnings, setBinnings] = useState([]);
+  const [labelKey, setLabelKey] = useState('range');
+  const [selected, setSelected] = useState('');
+  const [error, setError] = useState(null);
+
+  useEffect(() => {
+    // Written by binning.py; lists every registered binning, so new ones show up without code changes
+    fetch('/binnings.json', { cache: 'no-cache' })
+      .then(response => {
+        if (!response.ok) {
+          throw new Error('Failed to fetch binnings');
+        }
+        return response.json();
+      })
+      .then(jsonData => {
+        setBinnings(jsonData.binnings);
+        setLabelKey(jsonData.labelKey);
+        setSelected(current => current || (jsonData.binnings[0] && jsonData.binnings[0].name) || '');
+        setError(null);
+      })
+      .catch(err => {
+        console.error('Error fetching binnings:', err);
+        setError(err.message);
+      });
+  }, []);
+
+  const binning = binnings.find(candidate => candidate.name === selected);
+
+  return (
+    <div>
+      <h2 className="mb-4">Binnings</h2>
+      <p className="text-muted mb-4">
+        Search tries and driver quotes under every binning of the registry: the fixed breakdowns of the
+        dashboard plus the quantile, log-scale and custom binnings declared in binnings.json.
+      </p>
+
+      <Row className="mb-4">
+        <Col md={4}>
+          <Form.Label>Binning</Form.Label>
+          <Form.Select value={selected} onChange={(event) => setSelected(event.target.value)}>
+            {binnings.map(candidate => (
+              <option key={candidate.name} value={candidate.name}>{candidate.title}</option>
+            ))}
+          </Form.Select>
+        </Col>
+        {binning && (
+          <Col md={8} className="d-flex align-items-end">
+            <span className="text-muted">
+              {KIND_DESCRIPTIONS[binning.kind] || binning.kind} on <code>{binning.column}</code>
+            </span>
+          </Col>
+        )}
+      </Row>
+
+      {error && <Alert variant="danger">{error}</Alert>}
+
+      {binning && (
+        <Card className="mb-4">
+          <Card.Body>
+            <Card.Title>{binning.title}</Card.Title>
+            <ResponsiveContainer width="100%" height={400}>
+              <ComposedChart data={binning.data}>
+                <CartesianGrid strokeDasharray="3 3" />
+                <XAxis dataKey={labelKey} />
+                <YAxis yAxisId="left" />
+                <YAxis yAxisId="right" orientation="right" domain={[0, 100]} />
+                <Tooltip />
+                <Legend />
+                <Bar yAxisId="left" dataKey="totalSearches" name="Total Searches" fill="#8884d8" />
+                <Bar yAxisId="left" dataKey="quotesReceived" name="Quotes Received" fill="#82ca9d" />
+                <Line yAxisId="right" type="monotone" dataKey="conversionRate" name="Conversion Rate (%)" stroke="#ff7300" />
+              </ComposedChart>
+            </ResponsiveContainer>
+          </Card.Body>
+        </Card>
+      )}
+    </div>
+  );
+};
+
+export default BinningAnalysis;
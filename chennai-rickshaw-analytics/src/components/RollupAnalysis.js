@@ -0,0 +1,89 @@
+import React, { useState, useEffect } from 'react';
+import { Row, Col, Card, Form, Alert } from 'react-bootstrap';
+import {
+  XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer,
+  Bar, Line, Brush, ComposedChart
+} from 'recharts';
+
+const GRANULARITIES = [5, 15, 60];
+
+const RollupAnalysis = ({ apiUrl, query }) => {
+  const [minutes, setMinutes] = useState(15);
+  const [timeOfDay, setTimeOfDay] = useState(false);
+  const [data, setData] = useState([]);
+  const [error, setError] = useState(null);
+
+  useEffect(() => {
+    // The aggregation service rolls up filtered rows on demand; otherwise use the prebuilt rollup files
+    const url = apiUrl
+      ? `${apiUrl}/api/rollup?minutes=${minutes}&timeOfDay=${timeOfDay ? 1 : 0}&${query}`
+      : `/rollups/${minutes}min.json`;
+    fetch(url)
+      .then(response => {
+        if (!response.ok) {
+          throw new Error('Failed to fetch rollup data');
+        }
+        return response.json();
+      })
+      .then(jsonData => {
+        setData(!apiUrl && timeOfDay ? jsonData.timeOfDayData : jsonData.rollupData);
+        setError(null);
+      })
+      .catch(err => {
+        console.error('Error fetching rollup data:', err);
+        setError(err.message);
+      });
+  }, [apiUrl, query, minutes, timeOfDay]);
+
+  return (
+    <div>
+      <h2 className="mb-4">Time Rollups</h2>
+      <p className="text-muted mb-4">
+        Search tries and driver quotes in 5, 15 or 60 minute buckets. Folding the days onto one
+        day shows which periods are consistently short of drivers across dates.
+      </p>
+
+      <Row className="mb-4">
+        <Col md={3}>
+          <Form.Label>Granularity</Form.Label>
+          <Form.Select value={minutes} onChange={(event) => setMinutes(Number(event.target.value))}>
+            {GRANULARITIES.map(value => <option key={value} value={value}>{value} minutes</option>)}
+          </Form.Select>
+        </Col>
+        <Col md={3} className="d-flex align-items-end">
+          <Form.Check
+            type="switch"
+            id="time-of-day"
+            label="Fold days onto time of day"
+            checked={timeOfDay}
+            onChange={(event) => setTimeOfDay(event.target.checked)}
+          />
+        </Col>
+      </Row>
+
+      {error && <Alert variant="danger">{error}</Alert>}
+
+      <Card className="mb-4">
+        <Card.Body>
+          <Card.Title>Search Tries and Quotes per {minutes} Minutes</Card.Title>
+          <ResponsiveContainer width="100%" height={400}>
+            <ComposedChart data={data}>
+              <CartesianGrid strokeDasharray="3 3" />
+              <XAxis dataKey="bucket" />
+              <YAxis yAxisId="left" />
+              <YAxis yAxisId="right" orientation="right" />
+              <Tooltip />
+              <Legend />
+              <Bar yAxisId="left" dataKey="totalSearches" name="Total Searches" fill="#8884d8" />
+              <Bar yAxisId="left" dataKey="quotesReceived" name="Quotes Received" fill="#82ca9d" />
+              <Line yAxisId="right" type="monotone" dataKey="conversionRate" name="Conversion Rate (%)" stroke="#ff7300" dot={false} />
+              <Brush dataKey="bucket" height={30} stroke="#8884d8" />
+            </ComposedChart>
+          </ResponsiveContainer>
+        </Card.Body>
+      </Card>
+    </div>
+  );
+};
+
+export default RollupAnalysis;
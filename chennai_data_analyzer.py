@@ -1,16 +1,51 @@
+import argparse
 import pandas as pd
 import numpy as np
-import datetime
 import os
 import sys
-import matplotlib.pyplot as plt
+import threading
+from contextlib import contextmanager
+from analysis_tasks import CANCELLED, DONE, FAILED, TaskRunner, checkpoint
+from compact_loader import compact_frame, load_compact
+from instrumentation import add_trace_argument, enable_from, traced
+from ist_conversion import DATE_COLUMNS, convert_frame_to_ist
+from prepared_dataset import is_prepared, prepared_path_for
+from query_plan import Filter, QueryPlan, execute, scan
+from quote_summary import SUMMARY_COLUMNS, merge_quote_summaries, print_quote_summary, quote_summary_partial
+from result_cache import DEFAULT_MAX_BYTES, ResultCache
+from streaming_ingest import stream_convert_to_ist
+
+# Columns and rows each analysis needs; plans of a session are merged and loaded once
+ANALYSIS_PLANS = {
+    'time_range': QueryPlan.of(['created_at']),
+    'search_quotes': QueryPlan.of(SUMMARY_COLUMNS),
+}
+
+DEFAULT_PLOT_DIR = 'plots'
+
+# How long the menu waits for a task it just started before showing the menu again
+REPORT_WAIT_SECONDS = 0.5
 
 class ChennaiDataAnalyzer:
-    def __init__(self):
+    def __init__(self, chunksize=None, cache=None, memory_report=False, filters=(), plot_dir=DEFAULT_PLOT_DIR):
         self.original_file = 'Chennai_22March.csv'
         self.ist_file = 'Chennai_22March_IST.csv'
         self.df_original = None
         self.df_ist = None
+        # When set, analyses stream the CSV in chunks of this many rows instead of loading it
+        self.chunksize = chunksize
+        # Optional ResultCache; analyses on an unchanged file are then served from disk
+        self.cache = cache
+        # Print per-column memory before and after compaction when loading a CSV
+        self.memory_report = memory_report
+        # Row filters (query_plan.Filter) applied to every analysis, pushed down into the reader
+        self.filters = tuple(filters)
+        # file_type -> (QueryPlan the frame was loaded with, frame)
+        self.loaded = {}
+        # Where visualize_data saves its figures
+        self.plot_dir = plot_dir
+        # Held while a frame is loaded or replaced, so background tasks never load the same data twice
+        self._load_lock = threading.RLock()
         
     def check_files(self):
         """Check if the required files exist"""
@@ -21,21 +56,34 @@ class ChennaiDataAnalyzer:
         print(f"Original file '{self.original_file}' found.")
         return True
     
-    def load_data(self, file_type='original'):
-        """Load the specified data file"""
+    @traced()
+    def load_data(self, file_type='original', plan=None):
+        """Load the specified data file; plan (a QueryPlan) limits the columns and rows read"""
+        plan = plan or QueryPlan()
+        with self._data_lock():
+            return self._load(file_type, plan)
+    
+    def _load(self, file_type, plan):
         try:
             if file_type == 'original':
-                print(f"Loading original data from {self.original_file}...")
-                self.df_original = pd.read_csv(self.original_file)
+                print(f"Loading original data from {self.original_file} ({plan.describe()})...")
+                self.df_original = self._execute(plan, self.original_file)
+                self.loaded['original'] = (plan, self.df_original)
                 return self.df_original
             elif file_type == 'ist':
-                if os.path.exists(self.ist_file):
-                    print(f"Loading IST data from {self.ist_file}...")
-                    self.df_ist = pd.read_csv(self.ist_file)
-                    return self.df_ist
+                prepared_path = prepared_path_for(self.ist_file)
+                if prepared_path:
+                    # Typed, already-cleaned copy written by prepared_dataset.py
+                    print(f"Loading prepared IST data from {prepared_path} ({plan.describe()})...")
+                    self.df_ist = self._execute(plan, prepared_path)
+                elif os.path.exists(self.ist_file):
+                    print(f"Loading IST data from {self.ist_file} ({plan.describe()})...")
+                    self.df_ist = self._execute(plan, self.ist_file)
                 else:
                     print(f"IST file '{self.ist_file}' not found. Please convert to IST first.")
                     return None
+                self.loaded['ist'] = (plan, self.df_ist)
+                return self.df_ist
             else:
                 print("Invalid file type specified.")
                 return None
@@ -43,79 +91,116 @@ class ChennaiDataAnalyzer:
             print(f"Error loading data: {e}")
             return None
     
+    @contextmanager
+    def _data_lock(self):
+        """Hold the load lock; a task waiting for another task's load can still be cancelled"""
+        while not self._load_lock.acquire(timeout=0.1):
+            checkpoint("waiting for the dataset to load")
+        try:
+            yield
+        finally:
+            self._load_lock.release()
+    
+    def _execute(self, plan, file_path):
+        if self.memory_report and not is_prepared(file_path) and not plan.filters:
+            return load_compact(file_path, plan.read_columns(), report=True)
+        return execute(plan, file_path)
+    
+    @traced()
+    def plan_session(self, analyses, file_type='ist'):
+        """Load file_type once with the merged plan of several analyses (names from ANALYSIS_PLANS)"""
+        plan = None
+        for name in analyses:
+            analysis_plan = self._plan(name)
+            plan = analysis_plan if plan is None else plan.merge(analysis_plan)
+        if plan is not None:
+            return self.load_data(file_type, plan)
+    
+    def _plan(self, name):
+        return ANALYSIS_PLANS[name].with_filters(self.filters)
+    
+    @traced()
     def convert_to_ist(self):
         """Convert dates from GST to IST in the original file"""
-        if self.df_original is None:
-            self.load_data('original')
-            
-        if self.df_original is None:
+        if self.chunksize:
+            print(f"Converting dates from GST to IST in chunks of {self.chunksize} rows...")
+            stream_convert_to_ist(self.original_file, self.ist_file, self.chunksize)
+            print(f"Conversion completed. New file created: {self.ist_file}")
             return
-            
-        print("Converting dates from GST to IST...")
-        
-        # Create a copy of the dataframe to avoid modifying the original
-        df = self.df_original.copy()
-        
-        # Identify date columns
-        date_columns = ['created_at', 'start_time', 'dq.created_at']
         
-        # Function to convert GST to IST
-        def convert_date(date_str):
-            if pd.isna(date_str) or date_str == '1970-01-01 00:00:00':
-                return date_str
+        # The IST file must round-trip the export's text, so read it raw rather than compacted
+        try:
+            print(f"Reading {self.original_file}...")
+            df = pd.read_csv(self.original_file)
+        except Exception as e:
+            print(f"Error loading data: {e}")
+            return
             
-            try:
-                # Parse the date string
-                dt = datetime.datetime.strptime(date_str, '%Y-%m-%d %H:%M:%S')
-                
-                # Add 5 hours and 30 minutes to convert from GST to IST
-                ist_dt = dt + datetime.timedelta(hours=5, minutes=30)
-                
-                # Return the IST date string
-                return ist_dt.strftime('%Y-%m-%d %H:%M:%S')
-            except:
-                return date_str
+        print("Converting dates from GST to IST...")
         
         # Convert date columns from GST to IST
-        for col in date_columns:
-            df[col] = df[col].apply(convert_date)
+        df = convert_frame_to_ist(df, DATE_COLUMNS)
         
         # Write the updated data to a new CSV file
         print(f"Writing IST data to {self.ist_file}...")
         df.to_csv(self.ist_file, index=False)
         
         # Update the IST dataframe
-        self.df_ist = df
+        with self._data_lock():
+            self.df_ist = compact_frame(df)
+            self.loaded['ist'] = (QueryPlan(), self.df_ist)
         
         print(f"Conversion completed. New file created: {self.ist_file}")
     
+    @traced()
     def analyze_time_range(self, file_type='ist'):
         """Analyze the time range in the specified file"""
-        # Load the appropriate dataframe
-        df = None
-        file_name = ""
-        
+        self.report_time_range(file_type, self.time_range(file_type))
+    
+    def time_range(self, file_type='ist'):
+        """(min, max) created_at of the specified file, None if it cannot be loaded"""
+        return self._cached(file_type, 'time_range', lambda: self._compute_time_range(file_type))
+    
+    def report_time_range(self, file_type, result):
         if file_type == 'original':
-            if self.df_original is None:
-                self.load_data('original')
-            df = self.df_original
             file_name = self.original_file + " (GST times)"
-        elif file_type == 'ist':
-            if self.df_ist is None:
-                self.load_data('ist')
-            df = self.df_ist
+        else:
             file_name = self.ist_file + " (IST times)"
+        if result is None:
+            return
         
-        if df is None:
+        min_time, max_time = result
+        if pd.isna(min_time):
+            print(f"\nNo rows of {file_name} match the filters.")
             return
+        self._print_time_range(file_name, min_time, max_time)
+    
+    def _compute_time_range(self, file_type):
+        """Return the (min, max) created_at of the specified file"""
+        plan = self._plan('time_range')
+        if self.chunksize:
+            # Read only created_at (and filter columns), chunk by chunk
+            file_path = self.original_file if file_type == 'original' else self.ist_file
+            min_time = max_time = None
+            for chunk in scan(plan, file_path, self.chunksize):
+                if chunk['created_at'].notna().any():
+                    chunk_min, chunk_max = chunk['created_at'].min(), chunk['created_at'].max()
+                    min_time = chunk_min if min_time is None else min(min_time, chunk_min)
+                    max_time = chunk_max if max_time is None else max(max_time, chunk_max)
+            return (pd.NaT, pd.NaT) if min_time is None else (min_time, max_time)
         
-        # Convert created_at to datetime
-        df['created_at'] = pd.to_datetime(df['created_at'])
+        # Load the appropriate dataframe
+        df = self._dataframe(file_type, plan)
+        if df is None:
+            return None
         
-        # Get min and max timestamps
-        min_time = df['created_at'].min()
-        max_time = df['created_at'].max()
+        # Convert created_at to datetime without modifying the loaded frame
+        created_at = pd.to_datetime(df['created_at'])
         
+        # Get min and max timestamps
+        return created_at.min(), created_at.max()
+    
+    def _print_time_range(self, file_name, min_time, max_time):
         # Calculate time range
         time_range = max_time - min_time
         hours = time_range.total_seconds() / 3600
@@ -126,97 +211,110 @@ class ChennaiDataAnalyzer:
         print(f"Total time span: {time_range}")
         print(f"Total hours: {hours:.2f} hours")
     
+    @traced()
     def analyze_search_quotes(self):
         """Analyze search tries and driver quotes in the dataset"""
-        # Use IST file if available, otherwise use original
-        df = None
-        file_name = ""
-        
-        if os.path.exists(self.ist_file):
-            if self.df_ist is None:
-                self.load_data('ist')
-            df = self.df_ist
-            file_name = self.ist_file
-        else:
-            if self.df_original is None:
-                self.load_data('original')
-            df = self.df_original
-            file_name = self.original_file
-        
-        if df is None:
+        self.report_search_quotes(self._search_quote_summary())
+    
+    def report_search_quotes(self, result):
+        file_name, summary = result
+        if summary is None:
             return
             
         print(f"\nAnalyzing search tries and driver quotes in {file_name}...")
-        
-        # Basic dataset stats
-        total_records = len(df)
-        print(f"\nTotal records in dataset: {total_records}")
-        
-        # Analyze search tries
-        search_repeat_counts = df['search_repeat_counter'].value_counts().sort_index()
-        search_repeat_types = df['search_repeat_type'].value_counts()
-        
-        # Analyze driver quotes
-        driver_quotes_present = df['dq.id'].notna().sum()
-        driver_quotes_absent = df['dq.id'].isna().sum()
-        
-        # Analyze completed vs cancelled rides
-        completed_rides = df[df['status'] == 'COMPLETED']
-        cancelled_rides = df[df['status'] == 'CANCELLED']
-        active_rides = df[df['status'] == 'ACTIVE']
-        
-        # Analyze driver data - Clean driver ratings first
-        df['driver_rating'] = pd.to_numeric(df['driver_rating'], errors='coerce')
-        # Clean distance and base_fare columns as well
-        df['distance'] = pd.to_numeric(df['distance'], errors='coerce')
-        df['base_fare'] = pd.to_numeric(df['base_fare'], errors='coerce')
-        drivers_with_ratings = df['driver_rating'].notna().sum()
-        avg_driver_rating = df['driver_rating'].mean()
-        
-        # Analyze fare and distance data
-        avg_base_fare = df['base_fare'].mean()
-        avg_distance = df[df['distance'].notna()]['distance'].mean() / 1000  # Convert to kilometers
-        
-        # Print results
-        print("\n=== SEARCH TRY ANALYSIS ===")
-        print(f"Search repeat counter distribution:\n{search_repeat_counts}")
-        print(f"\nSearch repeat type distribution:\n{search_repeat_types}")
-        
-        print("\n=== DRIVER QUOTE ANALYSIS ===")
-        print(f"Records with driver quotes: {driver_quotes_present} ({driver_quotes_present/total_records*100:.2f}%)")
-        print(f"Records without driver quotes: {driver_quotes_absent} ({driver_quotes_absent/total_records*100:.2f}%)")
-        
-        print("\n=== RIDE STATUS ANALYSIS ===")
-        print(f"Completed rides: {len(completed_rides)} ({len(completed_rides)/total_records*100:.2f}%)")
-        print(f"Cancelled rides: {len(cancelled_rides)} ({len(cancelled_rides)/total_records*100:.2f}%)")
-        print(f"Active rides: {len(active_rides)} ({len(active_rides)/total_records*100:.2f}%)")
-        
-        print("\n=== DRIVER ANALYSIS ===")
-        print(f"Drivers with ratings: {drivers_with_ratings} ({drivers_with_ratings/total_records*100:.2f}%)")
-        print(f"Average driver rating: {avg_driver_rating:.2f}")
-        
-        print("\n=== FARE AND DISTANCE ANALYSIS ===")
-        print(f"Average base fare: ₹{avg_base_fare:.2f}")
-        print(f"Average distance: {avg_distance:.2f} km")
-        
-        # Analyze relationship between search tries and driver quotes
-        print("\n=== RELATIONSHIP BETWEEN SEARCH TRIES AND DRIVER QUOTES ===")
-        # Create a boolean column for whether a driver quote is present
-        df['has_driver_quote'] = df['dq.id'].notna()
-        # Group by search_repeat_type and calculate the percentage of records with driver quotes
-        quote_by_search_type = df.groupby('search_repeat_type')['has_driver_quote'].agg(['count', 'sum'])
-        quote_by_search_type['percentage'] = (quote_by_search_type['sum'] / quote_by_search_type['count']) * 100
-        print(quote_by_search_type)
-        
-        # Time distribution of search tries
-        df['hour'] = pd.to_datetime(df['created_at']).dt.hour
-        hourly_searches = df.groupby('hour').size()
-        print("\n=== TIME DISTRIBUTION OF SEARCH TRIES ===")
-        print(hourly_searches)
+        print_quote_summary(summary)
+    
+    def _search_quote_summary(self):
+        """Return (file name, quote summary), using the IST file if available, otherwise the original"""
+        file_type = 'ist' if os.path.exists(self.ist_file) else 'original'
+        file_name = self.ist_file if file_type == 'ist' else self.original_file
+        
+        plan = self._plan('search_quotes')
+        
+        def compute():
+            if self.chunksize:
+                summary = None
+                for chunk in scan(plan, file_name, self.chunksize):
+                    summary = merge_quote_summaries(summary, quote_summary_partial(chunk))
+                return summary
+            df = self._dataframe(file_type, plan)
+            # Counts, sums and distributions behind the report, computed without modifying df
+            return None if df is None else quote_summary_partial(df)
+        
+        return file_name, self._cached(file_type, 'search_quotes', compute)
+    
+    def _dataframe(self, file_type, plan=None):
+        """Return the rows and columns of file_type that plan needs, loading them if necessary.
+        
+        A frame already loaded for a plan that covers this one is reused; otherwise the
+        two plans are merged and loaded once, so later analyses can reuse the result.
+        """
+        plan = plan or QueryPlan().with_filters(self.filters)
+        with self._data_lock():
+            loaded_plan, df = self.loaded.get(file_type, (None, None))
+            if loaded_plan is None or not loaded_plan.covers(plan):
+                loaded_plan = plan if loaded_plan is None else loaded_plan.merge(plan)
+                df = self.load_data(file_type, loaded_plan)
+                if df is None:
+                    return None
+        return plan.apply(df, loaded_plan)
+    
+    def _source_path(self, file_type):
+        """The file an analysis of file_type reads; its contents key the result cache"""
+        if file_type == 'original':
+            return self.original_file
+        path = prepared_path_for(self.ist_file) or self.ist_file
+        # A mapped column store is keyed by its schema, which carries a digest of the buffers
+        return os.path.join(path, 'schema.json') if os.path.isdir(path) else path
+    
+    def _cached(self, file_type, name, compute):
+        """Run compute() through the result cache when one is configured"""
+        source = self._source_path(file_type)
+        if self.cache is None or not os.path.exists(source):
+            return compute()
+        params = {'file_type': file_type, 'filters': [repr(f) for f in self.filters]}
+        return self.cache.memoize(source, name, params, compute)
+
+    def _menu_tasks(self):
+        """Menu choice -> (task name, function run in the background, report called with its result)"""
+        return {
+            '1': ('convert to IST', self.convert_to_ist, None),
+            '2': ('time range (GST)', lambda: self.time_range('original'),
+                  lambda result: self.report_time_range('original', result)),
+            '3': ('time range (IST)', lambda: self.time_range('ist'),
+                  lambda result: self.report_time_range('ist', result)),
+            '4': ('search tries and quotes', self._search_quote_summary, self.report_search_quotes),
+            '5': ('visualize data', self.visualize_data, self.report_plot),
+        }
+
+    def _report_finished(self, runner):
+        """Print the results of tasks that finished since the menu was last shown"""
+        for task in runner.finished():
+            if task.state == DONE and task.report is not None:
+                task.report(task.result)
+            elif task.state == FAILED:
+                print(f"\nTask #{task.id} ({task.name}) failed: {task.error}")
+            elif task.state == CANCELLED:
+                print(f"\nTask #{task.id} ({task.name}) was cancelled after {task.elapsed:.1f}s.")
 
-    def show_menu(self):
-        """Display the main menu and handle user choices"""
+    def _report_loaded(self, df):
+        if df is not None:
+            print(f"\nIST data loaded ({len(df):,} rows).")
+
+    def show_menu(self, runner=None):
+        """Display the main menu and handle user choices.
+        
+        Every choice runs as a background task, so the menu comes back at once
+        whatever the file size; results are printed when the menu is next shown.
+        """
+        runner = runner or TaskRunner()
+        if not self.chunksize and (prepared_path_for(self.ist_file) or os.path.exists(self.ist_file)):
+            # Load what the analyses need while the user is still choosing one
+            runner.submit('load IST data', lambda: self.plan_session(list(ANALYSIS_PLANS)), self._report_loaded)
+        tasks = self._menu_tasks()
+        
         while True:
+            self._report_finished(runner)
             print("\n" + "="*50)
             print("CHENNAI AUTO RICKSHAW DATA ANALYZER")
             print("="*50)
@@ -225,72 +323,121 @@ class ChennaiDataAnalyzer:
             print("3. Analyze time range (IST)")
             print("4. Analyze search tries and driver quotes")
             print("5. Visualize data")
-            print("6. Exit")
+            print("6. Show running tasks")
+            print("7. Cancel a task")
+            print("8. Exit")
             print("-"*50)
             
-            choice = input("Enter your choice (1-6): ")
+            choice = input("Enter your choice (1-8): ").strip()
             
-            if choice == '1':
-                self.convert_to_ist()
-            elif choice == '2':
-                self.analyze_time_range('original')
-            elif choice == '3':
-                self.analyze_time_range('ist')
-            elif choice == '4':
-                self.analyze_search_quotes()
-            elif choice == '5':
-                self.visualize_data()
+            if choice in tasks:
+                name, func, report = tasks[choice]
+                task = runner.submit(name, func, report)
+                # Quick (e.g. cached) results are shown straight away
+                if not task.wait(REPORT_WAIT_SECONDS):
+                    print(f"Started task #{task.id} ({name}); its result is shown when it finishes.")
             elif choice == '6':
+                active = runner.active()
+                if not active:
+                    print("No tasks running.")
+                for task in active:
+                    print(task.describe())
+            elif choice == '7':
+                task_id = input("Task number to cancel: ").strip().lstrip('#')
+                if task_id.isdigit() and runner.cancel(int(task_id)):
+                    print(f"Cancelling task #{task_id}...")
+                else:
+                    print("No such running task.")
+            elif choice == '8':
                 print("Exiting program. Goodbye!")
+                runner.shutdown()
                 sys.exit(0)
             else:
                 print("Invalid choice. Please try again.")
-            
-            input("\nPress Enter to continue...")
 
+    @traced()
     def visualize_data(self):
-        """Visualize the data using matplotlib"""
-        # Use IST file if available, otherwise use original
-        df = None
-        if os.path.exists(self.ist_file):
-            if self.df_ist is None:
-                self.load_data('ist')
-            df = self.df_ist
-        else:
-            if self.df_original is None:
-                self.load_data('original')
-            df = self.df_original
+        """Plot search tries and quote rates to a PNG in plot_dir; returns its path"""
+        # Reuse the (cached) quote summary rather than adding columns to the loaded frame
+        _, summary = self._search_quote_summary()
+        if summary is None:
+            return None
         
-        if df is None:
-            return
+        # Imported here: matplotlib alone takes longer to import than the menu needs to start
+        from matplotlib.figure import Figure
         
-        # Create a figure with two subplots
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 10))
+        # A standalone Figure renders with Agg and never opens a window, so it is safe off the main thread
+        fig = Figure(figsize=(10, 10))
+        ax1, ax2 = fig.subplots(2, 1)
         
         # Plot 1: Time distribution of search tries
-        df['hour'] = pd.to_datetime(df['created_at']).dt.hour
-        hourly_searches = df.groupby('hour').size()
+        hourly_searches = summary['hourly_searches'].sort_index()
         ax1.bar(hourly_searches.index, hourly_searches.values)
         ax1.set_xlabel('Hour of Day')
         ax1.set_ylabel('Number of Searches')
         ax1.set_title('Time Distribution of Search Tries')
         
         # Plot 2: Relationship between search tries and driver quotes
-        df['has_driver_quote'] = df['dq.id'].notna()
-        quote_by_search_type = df.groupby('search_repeat_type')['has_driver_quote'].agg(['count', 'sum'])
-        quote_by_search_type['percentage'] = (quote_by_search_type['sum'] / quote_by_search_type['count']) * 100
-        quote_by_search_type['percentage'].plot(kind='bar', ax=ax2)
+        quote_by_search_type = summary['quote_by_search_type']
+        percentage = (quote_by_search_type['sum'] / quote_by_search_type['count']) * 100
+        ax2.bar(percentage.index.astype(str), percentage.values)
+        ax2.tick_params(axis='x', labelrotation=90)
         ax2.set_xlabel('Search Repeat Type')
         ax2.set_ylabel('Percentage of Records with Driver Quotes')
         ax2.set_title('Relationship Between Search Tries and Driver Quotes')
         
-        plt.tight_layout()
-        plt.show()
+        fig.tight_layout()
+        os.makedirs(self.plot_dir, exist_ok=True)
+        path = os.path.join(self.plot_dir, 'search_quotes.png')
+        fig.savefig(path)
+        return path
+
+    def report_plot(self, path):
+        if path is not None:
+            print(f"\nPlots saved to {path}")
 
 # Create an instance of the analyzer and run it
 if __name__ == "__main__":
-    analyzer = ChennaiDataAnalyzer()
-    if analyzer.check_files():
-        analyzer.show_menu()
+    parser = argparse.ArgumentParser(description="Interactive analyzer for the Chennai auto rickshaw export")
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help="Stream the CSV in chunks of this many rows instead of loading it whole")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Recompute every analysis instead of using the on-disk result cache")
+    parser.add_argument('--cache-size-mb', type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="Evict least-recently-used cached results beyond this size")
+    parser.add_argument('--memory-report', action='store_true',
+                        help="Print per-column memory use before and after compacting loaded data")
+    parser.add_argument('--start', help="Only rows created at or after this time (e.g. 2025-03-22 18:00)")
+    parser.add_argument('--end', help="Only rows created before this time")
+    parser.add_argument('--vehicle-variant', help="Only rows of this vehicle_variant (e.g. AUTO_RICKSHAW)")
+    parser.add_argument('--plot-dir', default=DEFAULT_PLOT_DIR, help="Where 'Visualize data' saves its plots")
+    parser.add_argument('--run', nargs='+', choices=['time_range_gst', 'time_range_ist', 'search_quotes'],
+                        help="Run these analyses with one merged load instead of showing the menu")
+    add_trace_argument(parser)
+    args = parser.parse_args()
+    enable_from(args.trace)
+    
+    filters = []
+    if args.start:
+        filters.append(Filter('created_at', '>=', pd.Timestamp(args.start)))
+    if args.end:
+        filters.append(Filter('created_at', '<', pd.Timestamp(args.end)))
+    if args.vehicle_variant:
+        filters.append(Filter('vehicle_variant', '==', args.vehicle_variant))
+    
+    cache = None if args.no_cache else ResultCache(max_bytes=args.cache_size_mb * 1024 * 1024)
+    analyzer = ChennaiDataAnalyzer(chunksize=args.chunksize, cache=cache, memory_report=args.memory_report,
+                                   filters=filters, plot_dir=args.plot_dir)
+    if not analyzer.check_files():
+        print("Exiting due to missing files.")
+    elif args.run:
+        if not args.chunksize:
+            ist_analyses = [name for name in ('time_range_ist', 'search_quotes') if name in args.run]
+            analyzer.plan_session([name.replace('_ist', '') for name in ist_analyses])
+        for name in args.run:
+            if name == 'search_quotes':
+                analyzer.analyze_search_quotes()
+            else:
+                analyzer.analyze_time_range('original' if name == 'time_range_gst' else 'ist')
     else:
-        print("Exiting due to missing files.") 
\ No newline at end of file
+        analyzer.show_menu() 
\ No newline at end of file
@@ -0,0 +1,131 @@
+"""Single entry point for the analyzer scripts: python cli.py <command> [options]
+
+    python cli.py convert [--chunksize N]                 GST -> IST (convert_gst_to_ist.py)
+    python cli.py prepare [--input ...]                   prepared dataset and stats header (prepared_dataset.py)
+    python cli.py time-range [--gst] [--chunksize N]      created_at range
+    python cli.py analyze [--chunksize N]                 search try / driver quote report
+    python cli.py to-json [--chunksize N]                 dashboard JSON (csv_to_json_converter.py)
+    python cli.py visualize [--plot-dir plots]            search try and quote plots as a PNG
+
+Only the standard library is imported up front; each command imports pandas,
+pyarrow or matplotlib when it actually needs them. time-range and analyze are
+answered from the prepared dataset's stats header (dataset_stats.py) when it is
+at least as new as the CSV and neither --chunksize nor --no-stats is given;
+time-range then does not import pandas at all.
+"""
+import argparse
+import runpy
+import sys
+
+from dataset_stats import STATS_FILE, format_span, read_stats, summary_from_json, time_range
+
+# Same file names as prepared_dataset.py, which is not imported here because it pulls in pandas
+ORIGINAL_FILE = 'Chennai_22March.csv'
+IST_FILE = 'Chennai_22March_IST.csv'
+
+# Commands that hand their remaining arguments to an existing script
+SCRIPTS = {
+    'convert': ('convert_gst_to_ist', "Convert Chennai_22March.csv from GST to IST"),
+    'prepare': ('prepared_dataset', "Write the prepared dataset, column store and stats header"),
+    'to-json': ('csv_to_json_converter', "Convert the search try export to dashboard JSON"),
+}
+
+
+def run_script(module, argv):
+    """Run one of the analyzer scripts as if it had been started as `python <module>.py argv...`"""
+    sys.argv = [f'{module}.py'] + list(argv)
+    runpy.run_module(module, run_name='__main__', alter_sys=True)
+
+
+def _stats(args, csv_path):
+    if args.no_stats or args.chunksize:
+        return None
+    return read_stats(STATS_FILE, csv_path)
+
+
+def _chunk_args(args):
+    return ['--chunksize', str(args.chunksize)] if args.chunksize else []
+
+
+def time_range_command(args):
+    stats = _stats(args, ORIGINAL_FILE if args.gst else IST_FILE)
+    if stats is None:
+        run_script('time_range_original' if args.gst else 'time_range_ist', _chunk_args(args))
+        return
+
+    min_time, max_time = time_range(stats, gst=args.gst)
+    file_used = f"{STATS_FILE} ({'original GST' if args.gst else 'IST'} times)"
+    print(f"Reading created_at range from {STATS_FILE}...")
+    if min_time is None:
+        print(f"\nNo created_at values in {file_used}.")
+        return
+    span = max_time - min_time
+    print(f"\nTime Range Analysis for {file_used}:")
+    print(f"Earliest created_at: {min_time}")
+    print(f"Latest created_at: {max_time}")
+    print(f"Total time span: {format_span(span)}")
+    print(f"Total hours: {span.total_seconds() / 3600:.2f} hours")
+
+
+def analyze_command(args):
+    stats = _stats(args, IST_FILE)
+    if stats is None:
+        run_script('analyze_search_quotes', _chunk_args(args))
+        return
+
+    from quote_summary import print_quote_summary
+
+    print(f"Analyzing search tries and driver quotes from {STATS_FILE}...")
+    print_quote_summary(summary_from_json(stats['quote_summary']))
+
+
+def visualize_command(args):
+    from chennai_data_analyzer import ChennaiDataAnalyzer
+
+    analyzer = ChennaiDataAnalyzer(chunksize=args.chunksize, plot_dir=args.plot_dir)
+    analyzer.report_plot(analyzer.visualize_data())
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Chennai auto rickshaw export analyzers")
+    commands = parser.add_subparsers(dest='command', required=True, metavar='command')
+
+    for name, (module, help_text) in SCRIPTS.items():
+        # No help of its own: --help is passed on to the script
+        commands.add_parser(name, help=help_text, add_help=False)
+
+    for name, help_text in (('time-range', "Earliest and latest created_at"),
+                            ('analyze', "Search try and driver quote report")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('--chunksize', type=int, default=None,
+                             help="Stream the CSV in chunks of this many rows instead of loading it whole")
+        command.add_argument('--no-stats', action='store_true',
+                             help=f"Compute from the data even when {STATS_FILE} is fresh")
+        if name == 'time-range':
+            command.add_argument('--gst', action='store_true', help="Time range of the original (GST) file")
+
+    command = commands.add_parser('visualize', help="Plot search tries and quote rates to a PNG")
+    command.add_argument('--chunksize', type=int, default=None,
+                         help="Stream the CSV in chunks of this many rows instead of loading it whole")
+    command.add_argument('--plot-dir', default='plots', help="Where the PNG is written")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if args.command in SCRIPTS:
+        run_script(SCRIPTS[args.command][0], extra)
+        return
+    if extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    if args.command == 'time-range':
+        time_range_command(args)
+    elif args.command == 'analyze':
+        analyze_command(args)
+    else:
+        visualize_command(args)
+
+
+if __name__ == "__main__":
+    main()
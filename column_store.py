@@ -0,0 +1,138 @@
+"""Memory-mapped column store for the prepared dataset.
+
+Every column is one fixed-width .npy buffer: float64/int numerics, datetime64[us]
+timestamps (NaT for nulls), integer codes for categoricals and other strings
+(categories kept in schema.json), and UUIDs packed to 16 bytes plus a validity
+bitmap. Loading maps the buffers copy-on-write instead of parsing them, so
+startup is near-instant and concurrent analyzer processes share the same
+page-cache pages rather than each holding a private copy of the frame. A
+process that writes into a column gets private copies of just the pages it
+touched; the files on disk never change.
+
+    <dataset>.columns/
+        schema.json                 rows, column kinds, categories and a digest of the buffers
+        00.npy, 01.npy, ...
+"""
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from compact_loader import UUID_COLUMNS, uuid_to_binary
+
+SCHEMA_FILE = 'schema.json'
+STORE_VERSION = 1
+
+_COMPARISONS = {
+    '==': np.equal, '!=': np.not_equal, '<': np.less, '<=': np.less_equal, '>': np.greater, '>=': np.greater_equal,
+}
+
+
+def schema_path(store_path):
+    return os.path.join(store_path, SCHEMA_FILE)
+
+
+def _uuid_buffers(series):
+    import pyarrow as pa
+
+    array = pa.array(uuid_to_binary(series.astype(object)).array)
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    data = np.frombuffer(array.buffers()[1], dtype=np.uint8)[16 * array.offset:16 * (array.offset + len(array))]
+    valid = np.asarray(array.is_valid(), dtype=bool)
+    return data.reshape(-1, 16), np.packbits(valid, bitorder='little')
+
+
+def write_column_store(df, store_path):
+    """Write df as one fixed-width buffer per column; replaces store_path atomically"""
+    tmp_path = store_path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    schema = {'version': STORE_VERSION, 'rows': len(df), 'columns': []}
+    # Hashed into schema.json so that digesting it (e.g. by the result cache) changes with the data
+    digest = hashlib.sha256()
+
+    for i, col in enumerate(df.columns):
+        series = df[col]
+        entry = {'name': col, 'file': f'{i:02d}.npy'}
+        if col in UUID_COLUMNS:
+            data, validity = _uuid_buffers(series)
+            entry.update(kind='uuid', validity_file=f'{i:02d}.valid.npy')
+            np.save(os.path.join(tmp_path, entry['validity_file']), validity)
+            digest.update(validity.tobytes())
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            entry['kind'] = 'datetime'
+            data = series.to_numpy(dtype='datetime64[us]')
+        elif pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+            entry['kind'] = 'numeric'
+            data = series.to_numpy()
+        else:
+            # Categoricals and any other strings are stored as integer codes
+            categorical = series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype('category')
+            entry.update(kind='category', categories=[str(c) for c in categorical.cat.categories])
+            data = categorical.cat.codes.to_numpy()
+        np.save(os.path.join(tmp_path, entry['file']), data)
+        digest.update(np.ascontiguousarray(data).tobytes())
+        schema['columns'].append(entry)
+    schema['digest'] = digest.hexdigest()
+
+    with open(schema_path(tmp_path), 'w') as f:
+        json.dump(schema, f)
+    # Readers that already mapped the old buffers keep them until they close; new readers see the new store
+    shutil.rmtree(store_path, ignore_errors=True)
+    os.replace(tmp_path, store_path)
+    return store_path
+
+
+def read_schema(store_path):
+    with open(schema_path(store_path)) as f:
+        schema = json.load(f)
+    if schema.get('version') != STORE_VERSION:
+        raise ValueError(f"{store_path} was written by an incompatible version; re-run prepared_dataset.py")
+    return schema
+
+
+def _map_column(store_path, entry, rows):
+    data = np.load(os.path.join(store_path, entry['file']), mmap_mode='c')
+    kind = entry['kind']
+    if kind == 'category':
+        codes = np.asarray(data)
+        return pd.Categorical.from_codes(codes, categories=pd.Index(entry['categories']), validate=False)
+    if kind == 'uuid':
+        import pyarrow as pa
+
+        validity = np.load(os.path.join(store_path, entry['validity_file']), mmap_mode='c')
+        array = pa.FixedSizeBinaryArray.from_buffers(
+            pa.binary(16), rows, [pa.py_buffer(np.asarray(validity)), pa.py_buffer(np.asarray(data))])
+        return pd.arrays.ArrowExtensionArray(array)
+    return np.asarray(data)
+
+
+def _row_mask(df, filters):
+    """Mask of rows matching pyarrow-style [(column, op, value)] filters"""
+    mask = np.ones(len(df), dtype=bool)
+    for column, op, value in filters:
+        series = df[column]
+        if op == 'in':
+            mask &= series.isin(value).to_numpy(dtype=bool)
+        else:
+            mask &= np.asarray(_COMPARISONS[op](series, value).fillna(False), dtype=bool)
+    return mask
+
+
+def load_column_store(store_path, columns=None, filters=None):
+    """Map the store's buffers into a DataFrame, optionally only some columns and matching rows"""
+    schema = read_schema(store_path)
+    entries = {entry['name']: entry for entry in schema['columns']}
+    wanted = list(entries) if columns is None else [col for col in columns if col in entries]
+    needed = wanted + [column for column, _, _ in filters or () if column not in wanted]
+
+    df = pd.DataFrame({col: _map_column(store_path, entries[col], schema['rows']) for col in needed}, copy=False)
+    if filters:
+        df = df[_row_mask(df, filters)].reset_index(drop=True)
+    return df[wanted] if len(needed) > len(wanted) else df
+
@@ -0,0 +1,148 @@
+"""Compact in-memory representation of the search try export.
+
+Raw exports load as 26 object columns, most of them 36-character UUID strings.
+The analyses only need to know whether dq.id is null plus a handful of numeric
+and categorical fields, so the compact loader
+
+- drops UUID columns unless asked for, storing them as 16-byte binary when kept,
+- keeps a boolean has_quote derived from dq.id,
+- stores low-cardinality strings as categoricals and timestamps as datetime64,
+- downcasts numerics to the smallest type that holds them exactly.
+"""
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from instrumentation import traced
+from ist_conversion import DATE_COLUMNS, DATE_FORMAT, EPOCH_SENTINEL
+from streaming_ingest import DEFAULT_CHUNKSIZE, read_chunks
+
+UUID_COLUMNS = ['id', 'dq.id', 'search_try_id', 'driver_id', 'fare_parameters_id']
+CATEGORY_COLUMNS = ['status', 'search_repeat_type', 'vehicle_variant', 'dq.status', 'dq.vehicle_variant',
+                    'service_tier_array', 'special_location_tag', 'client_sdk_version',
+                    'client_bundle_version', 'driver_name']
+NUMERIC_COLUMNS = ['search_repeat_counter', 'customer_extra_fee', 'base_fare', 'distance_to_pickup',
+                   'duration_to_pickup', 'driver_rating', 'distance', 'estimated_fare']
+
+NULL_TOKEN = '\\N'
+
+# Lookup from ASCII hex digit to its value, for vectorized UUID parsing
+_HEX_VALUES = np.zeros(256, dtype=np.uint8)
+for _i, _c in enumerate(b'0123456789abcdef'):
+    _HEX_VALUES[_c] = _i
+for _i, _c in enumerate(b'ABCDEF'):
+    _HEX_VALUES[_c] = 10 + _i
+
+
+def uuid_to_binary(series):
+    """Pack canonical UUID strings into a 16-byte fixed-size binary column (needs pyarrow)"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    valid = series.notna() & (series != NULL_TOKEN) & (series.str.len() == 36)
+    valid = valid.to_numpy(dtype=bool)
+    hex_digits = series.where(valid, '0' * 36).str.replace('-', '', regex=False)
+    ascii_bytes = np.frombuffer(hex_digits.to_numpy(dtype='S32').tobytes(), dtype=np.uint8).reshape(-1, 32)
+    nibbles = _HEX_VALUES[ascii_bytes]
+    packed = (nibbles[:, 0::2] << 4) | nibbles[:, 1::2]
+
+    array = pa.FixedSizeBinaryArray.from_buffers(pa.binary(16), len(series), [None, pa.py_buffer(packed.tobytes())])
+    array = pc.if_else(pa.array(valid), array, pa.scalar(None, pa.binary(16)))
+    return pd.Series(pd.arrays.ArrowExtensionArray(array), index=series.index, name=series.name)
+
+
+def downcast_numeric(series):
+    """Coerce to numbers and downcast to the smallest dtype that is still exact"""
+    values = pd.to_numeric(series, errors='coerce')
+    if values.notna().all() and (values % 1 == 0).all():
+        return pd.to_numeric(values, downcast='integer')
+    as_float = values.astype('float64')
+    narrowed = as_float.astype('float32')
+    if ((narrowed.astype('float64') == as_float) | as_float.isna()).all():
+        return narrowed
+    return as_float
+
+
+def compact_frame(df, keep_uuids=False):
+    """Return a compact copy of a raw export frame"""
+    compact = {}
+    for col in df.columns:
+        series = df[col]
+        if col == 'dq.id':
+            compact['has_quote'] = series.notna().to_numpy(dtype=bool)
+        if col in UUID_COLUMNS:
+            if keep_uuids:
+                compact[col] = uuid_to_binary(series)
+        elif col in DATE_COLUMNS:
+            if pd.api.types.is_datetime64_any_dtype(series):
+                compact[col] = series
+            else:
+                compact[col] = pd.to_datetime(series.where(series != EPOCH_SENTINEL),
+                                              format=DATE_FORMAT, errors='coerce')
+        elif col in NUMERIC_COLUMNS:
+            compact[col] = downcast_numeric(series)
+        elif col in CATEGORY_COLUMNS or not pd.api.types.is_numeric_dtype(series):
+            compact[col] = series.where(series != NULL_TOKEN).astype('category')
+        else:
+            compact[col] = series
+    return pd.DataFrame(compact, index=df.index)
+
+
+def _concat_compact(chunks):
+    """Concatenate compact chunks without expanding categoricals to strings"""
+    if len(chunks) == 1:
+        return chunks[0]
+    columns = {}
+    for col in chunks[0].columns:
+        parts = [chunk[col] for chunk in chunks]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            columns[col] = pd.Series(union_categoricals(parts))
+        else:
+            columns[col] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def column_memory(df):
+    """Deep memory usage in bytes per column"""
+    return df.memory_usage(index=False, deep=True)
+
+
+def print_memory_report(before, after):
+    """Print per-column memory before and after compaction (both Series of bytes)"""
+    print(f"\n{'Column':24} {'Before (KB)':>12} {'After (KB)':>12}")
+    for col in before.index:
+        after_bytes = after.get(col, 0)
+        print(f"{col:24} {before[col] / 1024:>12.1f} {after_bytes / 1024:>12.1f}")
+    for col in after.index.difference(before.index):
+        print(f"{col:24} {'-':>12} {after[col] / 1024:>12.1f}")
+    total_before, total_after = before.sum(), after.sum()
+    print(f"{'TOTAL':24} {total_before / 1024:>12.1f} {total_after / 1024:>12.1f}"
+          f"  ({total_before / max(total_after, 1):.1f}x smaller)")
+
+
+@traced()
+def load_compact(file_path, columns=None, keep_uuids=False, report=False, chunksize=DEFAULT_CHUNKSIZE,
+                 row_filter=None):
+    """Load an export CSV in compact form.
+
+    The file is read in chunks and each chunk is compacted before the next is
+    read, so the raw object columns never exist for the whole file at once.
+    columns restricts which CSV columns are read; row_filter, a function of a
+    compact chunk returning the rows to keep, drops rows chunk by chunk;
+    report=True prints per-column memory use before and after compaction.
+    """
+    before = None
+    chunks = []
+    for chunk in read_chunks(file_path, chunksize, usecols=columns):
+        if report:
+            usage = column_memory(chunk)
+            before = usage if before is None else before + usage
+        chunk = compact_frame(chunk, keep_uuids)
+        if row_filter is not None:
+            chunk = row_filter(chunk).reset_index(drop=True)
+        chunks.append(chunk)
+
+    df = _concat_compact(chunks) if chunks else compact_frame(pd.read_csv(file_path, usecols=columns), keep_uuids)
+    if report and before is not None:
+        print_memory_report(before, column_memory(df))
+    return df
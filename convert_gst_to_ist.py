@@ -1,37 +1,34 @@
+import argparse
 import pandas as pd
-import datetime
+from instrumentation import add_trace_argument, enable_from, stage
+from ist_conversion import DATE_COLUMNS, convert_frame_to_ist
+from streaming_ingest import stream_convert_to_ist
 
-# Read the CSV file
-print("Reading CSV file...")
-df = pd.read_csv('Chennai_22March.csv')
+parser = argparse.ArgumentParser(description="Convert Chennai_22March.csv from GST to IST")
+parser.add_argument('--chunksize', type=int, default=None,
+                    help="Stream the CSV in chunks of this many rows instead of loading it whole")
+add_trace_argument(parser)
+args = parser.parse_args()
+enable_from(args.trace)
 
-# Identify date columns
-date_columns = ['created_at', 'start_time', 'dq.created_at']
+if args.chunksize:
+    # Read, convert and append one bounded chunk at a time
+    print(f"Converting dates from GST to IST in chunks of {args.chunksize} rows...")
+    stream_convert_to_ist('Chennai_22March.csv', 'Chennai_22March_IST.csv', args.chunksize)
+else:
+    # Read the CSV file
+    print("Reading CSV file...")
+    with stage('read_csv') as current:
+        df = pd.read_csv('Chennai_22March.csv')
+        current.rows_out = len(df)
 
-# Function to convert GST to IST
-def convert_to_ist(date_str):
-    if pd.isna(date_str) or date_str == '1970-01-01 00:00:00':
-        return date_str
-    
-    try:
-        # Parse the date string
-        dt = datetime.datetime.strptime(date_str, '%Y-%m-%d %H:%M:%S')
-        
-        # Add 5 hours and 30 minutes to convert from GST to IST
-        ist_dt = dt + datetime.timedelta(hours=5, minutes=30)
-        
-        # Return the IST date string
-        return ist_dt.strftime('%Y-%m-%d %H:%M:%S')
-    except:
-        return date_str
+    # Convert date columns from GST to IST
+    print("Converting dates from GST to IST...")
+    df = convert_frame_to_ist(df, DATE_COLUMNS)
 
-# Convert date columns from GST to IST
-print("Converting dates from GST to IST...")
-for col in date_columns:
-    df[col] = df[col].apply(convert_to_ist)
-
-# Write the updated data to a new CSV file
-print("Writing to new CSV file...")
-df.to_csv('Chennai_22March_IST.csv', index=False)
+    # Write the updated data to a new CSV file
+    print("Writing to new CSV file...")
+    with stage('write_csv', rows_in=len(df)):
+        df.to_csv('Chennai_22March_IST.csv', index=False)
 
 print("Conversion completed. New file created: Chennai_22March_IST.csv") 
\ No newline at end of file
@@ -0,0 +1,172 @@
+"""Joint breakdowns of search tries over several dimensions at once.
+
+Every dimension (hour, distance, fare, pickup distance) is encoded once as an
+integer code per row. A cross-tab of any set of dimensions then combines those
+codes into one mixed-radix cell id and reduces all STATE_FIELDS in a single
+bincount pass, the same reduction the one-dimensional breakdowns use. Requested
+cross-tabs are independent, so they are spread over worker processes, and only
+non-empty cells are emitted. The bins are those of binning.dimension_specs().
+
+    python crosstab.py                                # every pair plus the full 4-way table
+    python crosstab.py --dims fare distance --workers 4
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from bin_index import SCHEMES, schemes_for
+from binning import dimension_specs
+from compact_loader import load_compact
+from dimension_aggregator import HOURLY_SPEC, bin_codes, reduce_by_codes, required_columns, row_fields
+from prepared_dataset import IST_FILE, is_prepared, load_prepared, prepared_path_for
+
+DIMENSIONS = tuple(SCHEMES)
+DEFAULT_OUTPUT_PATH = 'chennai-rickshaw-analytics/public/crosstab.json'
+
+# Above this many possible cells, cell ids are compacted with np.unique instead of a dense bincount
+DENSE_CELL_LIMIT = 1 << 22
+
+# Same averages as the hourly breakdown: distance (km), base fare and pickup distance
+AVERAGES = HOURLY_SPEC.averages
+
+# Set in each worker by _init_worker so the row arrays are sent once per process, not once per task
+_ROWS = {}
+
+
+def encode_dimensions(df, dims=DIMENSIONS, schemes=SCHEMES):
+    """Integer bin code of every row for each dimension (-1 outside all bins)"""
+    return {name: bin_codes(schemes[name], df) for name in dims}
+
+
+def cell_ids(codes, dims, schemes=SCHEMES):
+    """Mixed-radix cell id combining the codes of dims, -1 where any code is missing"""
+    ids = np.zeros(len(codes[dims[0]]), dtype=np.int64)
+    missing = np.zeros(len(ids), dtype=bool)
+    for name in dims:
+        ids = ids * schemes[name].n_bins + codes[name]
+        missing |= codes[name] < 0
+    ids[missing] = -1
+    return ids
+
+
+def crosstab_state(codes, fields, dims, schemes=SCHEMES):
+    """Sparse state of the joint breakdown: (cell ids, state frame) of the non-empty cells"""
+    ids = cell_ids(codes, dims, schemes)
+    n_cells = int(np.prod([schemes[name].n_bins for name in dims]))
+    if n_cells <= DENSE_CELL_LIMIT:
+        state = reduce_by_codes(ids, fields, n_cells)
+        cells = np.flatnonzero(state['totalSearches'].to_numpy())
+        return cells, state.iloc[cells].reset_index(drop=True)
+    valid = ids >= 0
+    cells, dense = np.unique(ids[valid], return_inverse=True)
+    dense_ids = np.full(len(ids), -1, dtype=np.int64)
+    dense_ids[valid] = dense
+    return cells, reduce_by_codes(dense_ids, fields, len(cells))
+
+
+def finalize_crosstab(dims, cells, state, schemes=SCHEMES):
+    """Records with one label per dimension plus counts, conversion and averages"""
+    labels = {}
+    remainder = cells
+    for name in reversed(dims):
+        n_bins = schemes[name].n_bins
+        labels[name] = remainder % n_bins
+        remainder = remainder // n_bins
+
+    records = []
+    for i, row in enumerate(state.itertuples(index=False)):
+        row = row._asdict()
+        record = {schemes[name].label_key: schemes[name].labels[labels[name][i]] for name in dims}
+        record['totalSearches'] = int(row['totalSearches'])
+        record['quotesReceived'] = int(row['quotesReceived'])
+        record['conversionRate'] = float(np.int64(row['quotesReceived']) / np.int64(row['totalSearches']) * 100)
+        for key, col, divisor in AVERAGES:
+            count = row[f'{col}_count']
+            record[key] = float(np.float64(row[f'{col}_sum']) / count / divisor) if count else 0.0
+        records.append(record)
+    return records
+
+
+def _init_worker(codes, fields, schemes):
+    _ROWS['codes'] = codes
+    _ROWS['fields'] = fields
+    _ROWS['schemes'] = schemes
+
+
+def _crosstab_task(dims):
+    start = time.perf_counter()
+    schemes = _ROWS['schemes']
+    cells, state = crosstab_state(_ROWS['codes'], _ROWS['fields'], dims, schemes)
+    return dims, finalize_crosstab(dims, cells, state, schemes), time.perf_counter() - start
+
+
+def requested_crosstabs(dims=DIMENSIONS, pairs=True, full=True):
+    """Dimension tuples to tabulate: every pair and/or all dims jointly"""
+    tables = []
+    if pairs:
+        tables.extend(itertools.combinations(dims, 2))
+    if full and len(dims) > 2:
+        tables.append(tuple(dims))
+    if not tables:
+        tables.append(tuple(dims))
+    return tables
+
+
+def run_crosstabs(df, tables, workers=None, schemes=SCHEMES):
+    """Compute every table in tables; returns {'dim1,dim2': records}"""
+    needed = tuple(dict.fromkeys(name for dims in tables for name in dims))
+    codes = encode_dimensions(df, needed, schemes)
+    fields = row_fields(df)
+    workers = min(workers or os.cpu_count() or 1, len(tables))
+
+    if workers <= 1:
+        _init_worker(codes, fields, schemes)
+        results = [_crosstab_task(dims) for dims in tables]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(codes, fields, schemes)) as pool:
+            results = list(pool.map(_crosstab_task, tables))
+
+    output = {}
+    for dims, records, seconds in results:
+        print(f"  {' x '.join(dims):32} {len(records):>6} non-empty cells in {seconds:.3f}s")
+        output[','.join(dims)] = records
+    return output
+
+
+def load_input(path, schemes=SCHEMES):
+    columns = required_columns(schemes.values())
+    if is_prepared(path):
+        return load_prepared(columns, path)
+    return load_compact(path, columns)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Joint breakdowns over hour, distance, fare and pickup distance")
+    parser.add_argument('--input', default=None, help="IST export (CSV, prepared parquet or mapped column store)")
+    parser.add_argument('--dims', nargs='+', default=list(DIMENSIONS), choices=DIMENSIONS)
+    parser.add_argument('--no-pairs', action='store_true', help="Skip the pairwise tables")
+    parser.add_argument('--no-full', action='store_true', help="Skip the table over all --dims jointly")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_PATH)
+    args = parser.parse_args()
+
+    schemes = schemes_for(dimension_specs())
+    path = args.input or prepared_path_for(IST_FILE) or IST_FILE
+    print(f"Reading {path}...")
+    df = load_input(path, schemes)
+    tables = requested_crosstabs(tuple(args.dims), not args.no_pairs, not args.no_full)
+
+    print(f"Computing {len(tables)} cross-tabs over {len(df)} rows...")
+    start = time.perf_counter()
+    output = run_crosstabs(df, tables, args.workers, schemes)
+    print(f"Done in {time.perf_counter() - start:.2f}s")
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    print(f"Writing cross-tabs to {args.output}...")
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2)
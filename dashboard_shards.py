@@ -0,0 +1,173 @@
+"""Sharded, content-hashed dashboard payloads.
+
+Instead of one data.json that grows with every day and city, the dashboard
+sections are written as one shard per dimension, city and date:
+
+    shards/manifest.json                     which shard holds each (dimension, city, date)
+    shards/hourlyData/9c1e0b7a52d4.json      the hourlyData of one city and date
+    shards/hourlyData/9c1e0b7a52d4.json.gz   precompressed copies for gzip_static / brotli_static
+    shards/hourlyData/9c1e0b7a52d4.json.br
+
+A shard's file name is a hash of its contents, so a shard that does not change
+keeps its URL and can be cached forever; only the small manifest needs to be
+revalidated. "all" stands for every city or every date. Identical payloads
+(e.g. a single-city export's city and "all") share one file. Shards of the
+previous manifest are kept for one more generation, so a client that still
+holds that manifest can fetch them; older ones are pruned.
+
+Brotli copies need the brotli package (pip install brotli); without it only
+gzip copies are written.
+"""
+import gzip
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from dimension_aggregator import DEFAULT_SPECS, aggregate_partials, build_output_data, merge_partials
+from instrumentation import traced
+from streaming_ingest import DEFAULT_CHUNKSIZE, read_chunks
+
+DEFAULT_SHARD_DIR = 'chennai-rickshaw-analytics/public/shards'
+MANIFEST_FILE = 'manifest.json'
+ALL = 'all'
+HASH_LENGTH = 12
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def partials_by_date(df, specs=DEFAULT_SPECS):
+    """Dimension partials of each created_at (IST) date; rows without a timestamp are left out"""
+    created_at = df['created_at']
+    if not pd.api.types.is_datetime64_any_dtype(created_at):
+        created_at = pd.to_datetime(created_at, errors='coerce')
+    return {day.strftime('%Y-%m-%d'): aggregate_partials(group, specs)
+            for day, group in df.groupby(created_at.dt.normalize(), sort=True)}
+
+
+def stream_partials_by_date(file_path, chunksize=DEFAULT_CHUNKSIZE, specs=DEFAULT_SPECS):
+    """(overall partials, {date: partials}) of a CSV in one chunked pass"""
+    overall = None
+    by_date = {}
+    for chunk in read_chunks(file_path, chunksize):
+        overall = merge_partials(overall, aggregate_partials(chunk, specs))
+        for day, partials in partials_by_date(chunk, specs).items():
+            by_date[day] = merge_partials(by_date.get(day), partials)
+    return overall, by_date
+
+
+def fill_levels(partials):
+    """Add the "all" levels to {(city, date): partials}.
+
+    (city, "all") and ("all", "all") entries the caller already has (exact totals
+    that also count rows without a date) are kept; missing ones are merged from
+    the per-date entries.
+    """
+    levels = dict(partials)
+    cities = sorted({city for city, _ in partials if city != ALL})
+    for city in cities:
+        if (city, ALL) not in levels:
+            for (c, day), state in partials.items():
+                if c == city and day != ALL:
+                    levels[(city, ALL)] = merge_partials(levels.get((city, ALL)), state)
+    for (city, day), state in list(levels.items()):
+        if city == ALL or (ALL, day) in partials:
+            continue
+        levels[(ALL, day)] = merge_partials(levels.get((ALL, day)), state)
+    return levels
+
+
+def _write_once(path, data):
+    # Content-hashed: an existing file already has exactly these bytes
+    if os.path.exists(path):
+        return
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def write_shard(output_dir, dimension, payload, brotli=None):
+    """Write one payload as a content-hashed shard (plus .gz/.br); returns its path relative to output_dir"""
+    body = json.dumps(payload, separators=(',', ':')).encode()
+    name = f"{dimension}/{hashlib.sha256(body).hexdigest()[:HASH_LENGTH]}.json"
+    path = os.path.join(output_dir, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _write_once(path, body)
+    _write_once(path + '.gz', gzip.compress(body, compresslevel=9, mtime=0))
+    if brotli is not None:
+        _write_once(path + '.br', brotli.compress(body))
+    return name
+
+
+def _referenced(manifest):
+    """Shard names (dimension/hash.json) a manifest points to"""
+    return {name for by_city in manifest['shards'].values() for by_date in by_city.values()
+            for name in by_date.values()}
+
+
+def _read_manifest(output_dir):
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _prune(output_dir, dimensions, referenced):
+    """Delete shard files of dimensions that are not in referenced"""
+    removed = 0
+    for dimension in dimensions:
+        directory = os.path.join(output_dir, dimension)
+        if not os.path.isdir(directory):
+            continue
+        for file_name in os.listdir(directory):
+            name = f"{dimension}/{file_name.split('.')[0]}.json"
+            if name not in referenced:
+                os.remove(os.path.join(directory, file_name))
+                removed += 1
+    return removed
+
+
+@traced()
+def write_shards(partials, output_dir=DEFAULT_SHARD_DIR, specs=DEFAULT_SPECS):
+    """Write {(city, date): partials} as dashboard shards and a manifest; returns the manifest"""
+    os.makedirs(output_dir, exist_ok=True)
+    brotli = _brotli()
+    if brotli is None:
+        print("brotli is not installed; writing gzip copies only")
+    levels = fill_levels(partials)
+    previous = _read_manifest(output_dir)
+
+    shards = {}
+    for (city, day), state in sorted(levels.items()):
+        for dimension, payload in build_output_data(state, specs).items():
+            shards.setdefault(dimension, {}).setdefault(city, {})[day] = write_shard(
+                output_dir, dimension, payload, brotli)
+
+    manifest = {
+        'cities': sorted({city for city, _ in levels if city != ALL}),
+        'dates': sorted({day for _, day in levels if day != ALL}),
+        'encodings': ['gzip'] + (['br'] if brotli is not None else []),
+        'shards': shards,
+    }
+    tmp_path = os.path.join(output_dir, MANIFEST_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(output_dir, MANIFEST_FILE))
+
+    referenced = _referenced(manifest)
+    # Keep the previous generation for clients that fetched its manifest before this one replaced it
+    kept = referenced | (_referenced(previous) if previous else set())
+    dimensions = set(shards) | (set(previous['shards']) if previous else set())
+    removed = _prune(output_dir, sorted(dimensions), kept)
+    print(f"Wrote {len(referenced)} shards for {len(manifest['cities'])} cities and {len(manifest['dates'])} dates "
+          f"to {output_dir}/" + (f" (removed {removed} stale files)" if removed else ""))
+    return manifest
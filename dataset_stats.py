@@ -0,0 +1,118 @@
+"""Small stats header of the prepared dataset, for answering common queries without loading data.
+
+prepared_dataset.py writes Chennai_22March_IST.stats.json next to the Parquet
+file and column store: row count, the created_at range and the mergeable
+search try / driver quote summary (quote_summary.py) of the whole dataset.
+The time-range and summary queries of the CLI (cli.py) are then answered from
+this file; the time range without even importing pandas.
+
+This module only uses the standard library at import time; the pandas helpers
+import what they need when called.
+"""
+import json
+import os
+from datetime import datetime, timedelta
+
+STATS_FILE = 'Chennai_22March_IST.stats.json'
+STATS_VERSION = 1
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+# The prepared dataset is in IST; GST times are this much earlier (ist_conversion.IST_OFFSET)
+IST_OFFSET = timedelta(hours=5, minutes=30)
+
+
+def _series_to_json(series):
+    return {'name': series.name, 'index_name': series.index.name,
+            'items': [[key.item() if hasattr(key, 'item') else key, int(value)] for key, value in series.items()]}
+
+
+def _series_from_json(data):
+    import pandas as pd
+
+    keys = [key for key, _ in data['items']]
+    return pd.Series([value for _, value in data['items']], dtype='int64', name=data['name'],
+                     index=pd.Index(keys, name=data['index_name']))
+
+
+def summary_to_json(summary):
+    """JSON-able form of a quote_summary_partial result"""
+    import pandas as pd
+
+    data = {}
+    for key, value in summary.items():
+        if isinstance(value, pd.Series):
+            data[key] = {'series': _series_to_json(value)}
+        elif isinstance(value, pd.DataFrame):
+            data[key] = {'frame': {col: _series_to_json(value[col]) for col in value.columns}}
+        else:
+            data[key] = value
+    return data
+
+
+def summary_from_json(data):
+    """The quote summary stored by summary_to_json, ready for quote_summary.print_quote_summary"""
+    import pandas as pd
+
+    summary = {}
+    for key, value in data.items():
+        if isinstance(value, dict) and 'series' in value:
+            summary[key] = _series_from_json(value['series'])
+        elif isinstance(value, dict) and 'frame' in value:
+            summary[key] = pd.DataFrame({col: _series_from_json(series) for col, series in value['frame'].items()})
+        else:
+            summary[key] = value
+    return summary
+
+
+def dataset_stats(df):
+    """Stats header of a prepared (typed, IST) frame"""
+    from quote_summary import quote_summary_partial
+
+    created_at = df['created_at']
+    has_times = created_at.notna().any()
+    return {
+        'version': STATS_VERSION,
+        'rows': len(df),
+        'created_at': {
+            'min': created_at.min().strftime(TIMESTAMP_FORMAT) if has_times else None,
+            'max': created_at.max().strftime(TIMESTAMP_FORMAT) if has_times else None,
+        },
+        'quote_summary': summary_to_json(quote_summary_partial(df)),
+    }
+
+
+def write_stats(df, path=STATS_FILE):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(dataset_stats(df), f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_stats(path=STATS_FILE, csv_path=None):
+    """The stats header, or None if it is missing, from another version or older than csv_path"""
+    if not os.path.exists(path):
+        return None
+    if csv_path and os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(path):
+        return None
+    with open(path) as f:
+        stats = json.load(f)
+    return stats if stats.get('version') == STATS_VERSION else None
+
+
+def time_range(stats, gst=False):
+    """(min, max) created_at from the stats header as datetimes, shifted back to GST if asked"""
+    created_at = stats['created_at']
+    if created_at['min'] is None:
+        return None, None
+    shift = IST_OFFSET if gst else timedelta(0)
+    return tuple(datetime.strptime(created_at[key], TIMESTAMP_FORMAT) - shift for key in ('min', 'max'))
+
+
+def format_span(span):
+    """A timedelta written the way pandas prints a Timedelta, e.g. '0 days 23:51:10'"""
+    seconds = int(span.total_seconds())
+    days, seconds = divmod(seconds, 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    return f"{days} days {hours:02d}:{minutes:02d}:{seconds:02d}"
@@ -0,0 +1,214 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import traced
+
+# Per-bin state kept for every dimension. Everything is a count or a sum so that
+# partial states from different chunks or files can simply be added together.
+STATUS_FIELDS = [('completed', 'COMPLETED'), ('cancelled', 'CANCELLED'), ('active', 'ACTIVE')]
+VALUE_COLUMNS = ['distance', 'base_fare', 'distance_to_pickup']
+STATE_FIELDS = (['totalSearches', 'quotesReceived']
+                + [field for field, _ in STATUS_FIELDS]
+                + [f'{col}_{part}' for col in VALUE_COLUMNS for part in ('sum', 'count')])
+
+INF = float('inf')
+
+
+@dataclass(frozen=True)
+class DimensionSpec:
+    """Describes one breakdown of the dashboard JSON (hourly, distance, ...)"""
+    name: str                   # key of the list in data.json
+    label_key: str              # key holding the bin label in each record
+    column: str                 # source column
+    labels: tuple
+    edges: tuple = None         # left-closed bin edges; None means the column is the hour
+    scale: float = 1.0          # divide the column by this before binning
+    averages: tuple = ()        # (output key, value column, divisor)
+    include_status: bool = False
+
+    @property
+    def n_bins(self):
+        return len(self.labels)
+
+
+HOURLY_SPEC = DimensionSpec(
+    name='hourlyData', label_key='hour', column='created_at', labels=tuple(range(24)),
+    averages=(('avgDistance', 'distance', 1000),
+              ('avgBaseFare', 'base_fare', 1),
+              ('avgPickupDistance', 'distance_to_pickup', 1)),
+    include_status=True,
+)
+
+DISTANCE_SPEC = DimensionSpec(
+    name='distanceData', label_key='distanceRange', column='distance', scale=1000,
+    edges=(0, 5, 10, 15, 20, 25, 30, INF),
+    labels=('0-5', '5-10', '10-15', '15-20', '20-25', '25-30', '30+'),
+    averages=(('avgBaseFare', 'base_fare', 1),),
+)
+
+FARE_SPEC = DimensionSpec(
+    name='fareData', label_key='fareRange', column='base_fare',
+    edges=(0, 50, 100, 150, 200, 250, 300, 350, 400, INF),
+    labels=('0-50', '50-100', '100-150', '150-200', '200-250', '250-300', '300-350', '350-400', '400+'),
+)
+
+PICKUP_SPEC = DimensionSpec(
+    name='pickupDistanceData', label_key='pickupRange', column='distance_to_pickup',
+    edges=(0, 500, 1000, 1500, 2000, 2500, 3000, INF),
+    labels=('0-500', '500-1000', '1000-1500', '1500-2000', '2000-2500', '2500-3000', '3000+'),
+)
+
+DEFAULT_SPECS = (HOURLY_SPEC, DISTANCE_SPEC, FARE_SPEC, PICKUP_SPEC)
+
+SUMMARY_KEY = 'summary'
+
+
+def required_columns(specs=DEFAULT_SPECS):
+    """Columns aggregate_partials reads, for column-pruned loading"""
+    columns = ['created_at', 'status', 'dq.id'] + VALUE_COLUMNS + [spec.column for spec in specs]
+    return list(dict.fromkeys(columns))
+
+
+def quote_present(df):
+    """Boolean array: did each search try get a driver quote (dq.id not null)"""
+    if 'has_quote' in df.columns:
+        return df['has_quote'].to_numpy(dtype=bool)
+    return df['dq.id'].notna().to_numpy()
+
+
+def numeric_values(df, col):
+    """Return a column as a float array, coercing junk like \\N to NaN"""
+    series = df[col]
+    if not pd.api.types.is_numeric_dtype(series):
+        series = pd.to_numeric(series, errors='coerce')
+    return series.to_numpy(dtype='float64', na_value=np.nan)
+
+
+def hour_codes(series):
+    """Hour of day for each row, -1 where the timestamp is missing"""
+    if not pd.api.types.is_datetime64_any_dtype(series):
+        series = pd.to_datetime(series, errors='coerce')
+    return series.dt.hour.fillna(-1).to_numpy(dtype='int64')
+
+
+def bin_codes(spec, df):
+    """Assign every row to a bin of spec, -1 for rows outside all bins"""
+    if spec.edges is None:
+        return hour_codes(df[spec.column])
+
+    values = numeric_values(df, spec.column)
+    if spec.scale != 1:
+        values = values / spec.scale
+    # Left-closed bins, same as pd.cut(..., right=False); NaN and inf fall off the end
+    codes = np.searchsorted(np.asarray(spec.edges, dtype='float64'), values, side='right') - 1
+    codes[(codes >= spec.n_bins) | np.isnan(values)] = -1
+    return codes
+
+
+def row_fields(df):
+    """Per-row arrays feeding each entry of STATE_FIELDS, computed once per frame"""
+    quoted = quote_present(df)
+    status = df['status'].to_numpy()
+    fields = {
+        'totalSearches': None,
+        'quotesReceived': quoted,
+    }
+    for field, value in STATUS_FIELDS:
+        fields[field] = status == value
+    for col in VALUE_COLUMNS:
+        values = numeric_values(df, col)
+        present = ~np.isnan(values)
+        fields[f'{col}_sum'] = np.where(present, values, 0.0)
+        fields[f'{col}_count'] = present
+    return fields
+
+
+def empty_state(n_bins):
+    state = pd.DataFrame(0, index=range(n_bins), columns=STATE_FIELDS, dtype='int64')
+    for col in VALUE_COLUMNS:
+        state[f'{col}_sum'] = state[f'{col}_sum'].astype('float64')
+    return state
+
+
+def reduce_by_codes(codes, fields, n_bins):
+    """Sum every field per bin in a single bincount pass over the rows"""
+    state = empty_state(n_bins)
+    valid = codes >= 0
+    codes = codes[valid]
+    for field in STATE_FIELDS:
+        values = fields[field]
+        weights = None if values is None else values[valid]
+        counts = np.bincount(codes, weights=weights, minlength=n_bins)
+        state[field] = counts.astype(state[field].dtype)
+    return state
+
+
+@traced()
+def aggregate_partials(df, specs=DEFAULT_SPECS):
+    """Compute the mergeable per-bin state of every dimension for one frame"""
+    fields = row_fields(df)
+    partials = {SUMMARY_KEY: reduce_by_codes(np.zeros(len(df), dtype='int64'), fields, 1)}
+    for spec in specs:
+        partials[spec.name] = reduce_by_codes(bin_codes(spec, df), fields, spec.n_bins)
+    return partials
+
+
+def merge_partials(left, right):
+    """Add two partial states together; either side may be None"""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    return {name: left[name] + right[name] for name in left}
+
+
+def finalize_dimension(spec, state):
+    """Turn the per-bin state of one dimension into the records of data.json"""
+    records = []
+    for code, row in enumerate(state.itertuples(index=False)):
+        row = row._asdict()
+        total_searches = row['totalSearches']
+        if total_searches == 0:
+            continue
+
+        quotes_received = row['quotesReceived']
+        record = {
+            spec.label_key: spec.labels[code] if spec.edges is None else str(spec.labels[code]),
+            'totalSearches': int(total_searches),
+            'quotesReceived': int(quotes_received),
+            'conversionRate': float(np.int64(quotes_received) / np.int64(total_searches) * 100),
+        }
+        for key, col, divisor in spec.averages:
+            count = row[f'{col}_count']
+            mean = np.float64(row[f'{col}_sum']) / count if count else 0.0
+            record[key] = float(mean / divisor) if count else 0.0
+        if spec.include_status:
+            for field, _ in STATUS_FIELDS:
+                record[field] = int(row[field])
+        records.append(record)
+    return records
+
+
+def finalize_summary(state):
+    row = state.iloc[0]
+    total = int(row['totalSearches'])
+    quotes = int(row['quotesReceived'])
+    return {
+        'totalRecords': total,
+        'totalSearches': total,
+        'totalQuotes': quotes,
+        'overallConversionRate': float(np.int64(quotes) / total * 100 if total > 0 else 0),
+        'completed': int(row['completed']),
+        'cancelled': int(row['cancelled']),
+        'active': int(row['active']),
+    }
+
+
+def build_output_data(partials, specs=DEFAULT_SPECS):
+    """Assemble the dashboard JSON payload from (possibly merged) partial states"""
+    output_data = {SUMMARY_KEY: finalize_summary(partials[SUMMARY_KEY])}
+    for spec in specs:
+        output_data[spec.name] = finalize_dimension(spec, partials[spec.name])
+    return output_data
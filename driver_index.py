@@ -0,0 +1,436 @@
+"""Driver supply index: per-driver quote, pickup and rating statistics kept across daily exports.
+
+Each driver is one row of a set of fixed-width numpy arrays (structure of
+arrays), keyed by a 64-bit hash of the driver_id UUID:
+
+- quotes and quotes per hour of day (dq.created_at, else created_at),
+- active hours: distinct (date, hour) slots with at least one quote,
+- pickup distance and pickup duration histograms (PICKUP_SPEC / DURATION_SPEC
+  bins) with their sums for averages,
+- rating sum and count, and the last seen driver name.
+
+That is about 230 bytes per driver, so hundreds of thousands of drivers fit in
+tens of MB. The index of a chunk is merged into the running index by sums,
+except for active hours: each driver keeps a 24-bit mask of the hours of the
+latest date seen, folded into the total when a later date arrives. Daily files
+(and the chunks of one file) can therefore be added in any number of runs.
+
+The index also records the dates (of created_at) of the search tries it has
+seen. A file covering any of those dates is refused, whatever its name or
+format: the CSV and the prepared column store of one day, or a renamed or moved
+export, would otherwise be counted twice. The index is saved as a compressed
+npz together with these dates and the files it was built from, so rerunning
+with a new daily export only reads that file:
+
+    python driver_index.py exports/Chennai_23March_IST.csv [--state data_drivers.npz]
+    python driver_index.py --top 20 --peak 3
+    python driver_index.py --driver 6714d211-51fa-484a-8178-1a970913e0a0
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from compact_loader import compact_frame, load_compact, uuid_to_binary
+from dimension_aggregator import INF, PICKUP_SPEC, DimensionSpec, bin_codes, numeric_values, quote_present
+from instrumentation import add_trace_argument, enable_from, traced
+from prepared_dataset import IST_FILE, is_prepared, load_prepared, prepared_path_for
+from sketches import uuid_hashes
+from streaming_ingest import read_chunks
+
+DRIVER_COLUMNS = ['created_at', 'dq.id', 'dq.created_at', 'driver_id', 'driver_name', 'driver_rating',
+                  'distance_to_pickup', 'duration_to_pickup']
+DEFAULT_STATE_PATH = 'chennai-rickshaw-analytics/data_drivers.npz'
+INDEX_VERSION = 2
+
+DURATION_SPEC = DimensionSpec(
+    name='pickupDurationData', label_key='pickupDurationRange', column='duration_to_pickup',
+    edges=(0, 60, 120, 180, 240, 300, INF),
+    labels=('0-1', '1-2', '2-3', '3-4', '4-5', '5+'),
+)
+
+# Per-driver arrays: (dtype, columns per driver); 0 means one value per driver
+DRIVER_FIELDS = {
+    'quotes': (np.uint32, 0),
+    'hourly_quotes': (np.uint32, 24),
+    'pickup_distance': (np.uint32, PICKUP_SPEC.n_bins),
+    'pickup_distance_sum': (np.float64, 0),
+    'pickup_duration': (np.uint32, DURATION_SPEC.n_bins),
+    'pickup_duration_sum': (np.float64, 0),
+    'rating_sum': (np.float64, 0),
+    'rating_count': (np.uint32, 0),
+    # Active hours of dates before `day`, plus the bitmask of active hours on `day` itself
+    'active_hours': (np.uint32, 0),
+    'day': (np.int32, 0),
+    'day_hours': (np.uint32, 0),
+    'name': (np.int32, 0),
+}
+# Fields that add up when two indexes are merged
+SUM_FIELDS = ['quotes', 'hourly_quotes', 'pickup_distance', 'pickup_distance_sum', 'pickup_duration',
+              'pickup_duration_sum', 'rating_sum', 'rating_count', 'active_hours']
+
+NO_DAY = -1
+NO_NAME = -1
+
+
+def _empty(field, n):
+    dtype, width = DRIVER_FIELDS[field]
+    fill = NO_DAY if field == 'day' else NO_NAME if field == 'name' else 0
+    return np.full((n, width) if width else n, fill, dtype=dtype)
+
+
+def _popcount(bits):
+    """Number of set bits of each uint32"""
+    return np.unpackbits(bits.astype('<u4').view(np.uint8).reshape(-1, 4), axis=1).sum(axis=1).astype(np.uint32)
+
+
+def _uuid_bytes(series):
+    """Driver UUIDs as an (n, 16) uint8 array; strings and packed binary alike"""
+    import pyarrow as pa
+
+    if not isinstance(series.dtype, pd.ArrowDtype):
+        series = uuid_to_binary(series.astype(object))
+    array = pa.array(series.array)
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    data = np.frombuffer(array.buffers()[1], dtype=np.uint8, count=16 * (array.offset + len(array)))
+    return data[16 * array.offset:].reshape(-1, 16)
+
+
+def format_uuid(raw):
+    digits = bytes(raw).hex()
+    return f"{digits[:8]}-{digits[8:12]}-{digits[12:16]}-{digits[16:20]}-{digits[20:]}"
+
+
+def driver_key(driver_id):
+    """64-bit key of one driver_id string"""
+    hashes, valid = uuid_hashes(pd.Series([driver_id], dtype=object))
+    if not valid[0]:
+        raise ValueError(f"Not a driver UUID: {driver_id}")
+    return hashes[0]
+
+
+def _quote_times(df):
+    """Quote timestamps, falling back to the search try's created_at"""
+    times = df['dq.created_at'] if 'dq.created_at' in df.columns else df['created_at']
+    if not pd.api.types.is_datetime64_any_dtype(times):
+        times = pd.to_datetime(times, errors='coerce')
+    if 'dq.created_at' in df.columns:
+        created = df['created_at']
+        if not pd.api.types.is_datetime64_any_dtype(created):
+            created = pd.to_datetime(created, errors='coerce')
+        times = times.fillna(created)
+    return times.to_numpy(dtype='datetime64[s]')
+
+
+class DriverIndex:
+    """Per-driver supply statistics as parallel arrays, one row per driver"""
+
+    def __init__(self):
+        self.keys = np.empty(0, dtype=np.uint64)
+        self.ids = np.empty((0, 16), dtype=np.uint8)
+        self.fields = {field: _empty(field, 0) for field in DRIVER_FIELDS}
+        self.names = []
+        self.sources = []
+        self.dates = np.empty(0, dtype='datetime64[D]')
+        self._lookup = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def nbytes(self):
+        return self.keys.nbytes + self.ids.nbytes + sum(values.nbytes for values in self.fields.values())
+
+    def rows(self, keys):
+        """Row of every key, -1 for unknown drivers"""
+        if self._lookup is None:
+            self._lookup = pd.Index(self.keys)
+        return self._lookup.get_indexer(keys)
+
+    @classmethod
+    def from_frame(cls, df):
+        """Index of the driver quotes in one frame"""
+        index = cls()
+        created = df['created_at']
+        if not pd.api.types.is_datetime64_any_dtype(created):
+            created = pd.to_datetime(created, errors='coerce')
+        index.dates = np.unique(created.dropna().to_numpy(dtype='datetime64[D]'))
+        hashes, valid = uuid_hashes(df['driver_id'])
+        quoted = valid & quote_present(df)
+        times = _quote_times(df)[quoted]
+        df = df[quoted]
+        codes, keys = pd.factorize(hashes[quoted], sort=False)
+        n = len(keys)
+
+        first = np.full(n, len(codes), dtype=np.int64)
+        np.minimum.at(first, codes, np.arange(len(codes)))
+        index.keys = keys.astype(np.uint64)
+        index.ids = _uuid_bytes(df['driver_id'])[first].copy()
+
+        fields = index.fields = {field: _empty(field, n) for field in DRIVER_FIELDS}
+        fields['quotes'][:] = np.bincount(codes, minlength=n)
+        timed = ~np.isnat(times)
+        hours = times.astype('datetime64[h]').view(np.int64) % 24
+        fields['hourly_quotes'][:] = np.bincount(codes[timed] * 24 + hours[timed], minlength=n * 24).reshape(n, 24)
+
+        for field, spec in (('pickup_distance', PICKUP_SPEC), ('pickup_duration', DURATION_SPEC)):
+            bins = bin_codes(spec, df)
+            binned = bins >= 0
+            fields[field][:] = np.bincount(codes[binned] * spec.n_bins + bins[binned],
+                                           minlength=n * spec.n_bins).reshape(n, spec.n_bins)
+            values = numeric_values(df, spec.column)
+            fields[field + '_sum'][:] = np.bincount(codes[binned], weights=values[binned], minlength=n)
+
+        rating = numeric_values(df, 'driver_rating')
+        rated = ~np.isnan(rating)
+        fields['rating_sum'][:] = np.bincount(codes[rated], weights=rating[rated], minlength=n)
+        fields['rating_count'][:] = np.bincount(codes[rated], minlength=n)
+
+        # Active hours per (driver, date): every date but the latest is closed into active_hours
+        days = times.astype('datetime64[D]').view(np.int64)
+        for day in np.unique(days[timed]):
+            on_day = timed & (days == day)
+            mask = np.zeros(n, dtype=np.uint32)
+            np.bitwise_or.at(mask, codes[on_day], np.left_shift(np.uint32(1), hours[on_day].astype(np.uint32)))
+            index._fold_day(np.flatnonzero(mask), int(day), mask[mask != 0])
+
+        if 'driver_name' in df.columns:
+            names = df['driver_name'].astype(object).to_numpy()
+            named = pd.notna(names) & (names != '\\N')
+            last = np.full(n, -1, dtype=np.int64)
+            np.maximum.at(last, codes[named], np.flatnonzero(named))
+            has_name = last >= 0
+            name_codes, vocabulary = pd.factorize(names[last[has_name]], sort=False)
+            index.names = vocabulary.tolist()
+            fields['name'][has_name] = name_codes
+        return index
+
+    def _fold_day(self, rows, day, mask):
+        """Merge the active-hour masks of `day` into rows (unique) of this index"""
+        current = self.fields['day'][rows]
+        day_hours = self.fields['day_hours']
+        same = current == day
+        day_hours[rows[same]] |= mask[same]
+        later = current < day
+        moved = rows[later]
+        self.fields['active_hours'][moved] += _popcount(day_hours[moved])
+        self.fields['day'][moved] = day
+        day_hours[moved] = mask[later]
+        # A date older than the open one is assumed not to have been seen before
+        earlier = current > day
+        self.fields['active_hours'][rows[earlier]] += _popcount(mask[earlier])
+
+    def merge(self, other):
+        """Fold another index (e.g. of the next chunk or file) into this one"""
+        rows = self.rows(other.keys)
+        new = rows < 0
+        if new.any():
+            start = len(self.keys)
+            rows[new] = np.arange(start, start + int(new.sum()))
+            self.keys = np.concatenate([self.keys, other.keys[new]])
+            self.ids = np.concatenate([self.ids, other.ids[new]])
+            for field, values in self.fields.items():
+                self.fields[field] = np.concatenate([values, _empty(field, int(new.sum()))])
+            self._lookup = None
+
+        for field in SUM_FIELDS:
+            self.fields[field][rows] += other.fields[field]
+        open_day = other.fields['day'] != NO_DAY
+        for day in np.unique(other.fields['day'][open_day]):
+            on_day = other.fields['day'] == day
+            self._fold_day(rows[on_day], int(day), other.fields['day_hours'][on_day])
+
+        named = other.fields['name'] != NO_NAME
+        if named.any():
+            vocabulary = {name: code for code, name in enumerate(self.names)}
+            codes = []
+            for name in (other.names[code] for code in other.fields['name'][named]):
+                if name not in vocabulary:
+                    vocabulary[name] = len(self.names)
+                    self.names.append(name)
+                codes.append(vocabulary[name])
+            self.fields['name'][rows[named]] = codes
+        self.sources.extend(source for source in other.sources if source not in self.sources)
+        self.dates = np.union1d(self.dates, other.dates)
+        return self
+
+    def indexed_dates(self, other):
+        """Dates of other (e.g. the index of a new file) that this index already holds"""
+        return [str(day) for day in np.intersect1d(self.dates, other.dates)]
+
+    def active_hours(self):
+        return self.fields['active_hours'] + _popcount(self.fields['day_hours'])
+
+    def table(self, rows=None, hours=None):
+        """Readable per-driver frame for the given rows (default all)"""
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows)
+        fields = {field: values[rows] for field, values in self.fields.items()}
+
+        def average(total, count):
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return np.round(np.where(count > 0, total / count, np.nan), 2)
+
+        names = np.array(self.names + [None], dtype=object)
+        table = pd.DataFrame({
+            'driver_id': [format_uuid(raw) for raw in self.ids[rows]],
+            'driver_name': names[fields['name']],
+            'quotes': fields['quotes'],
+        })
+        if hours is not None:
+            table['quotes_in_hours'] = fields['hourly_quotes'][:, list(hours)].sum(axis=1)
+        table['active_hours'] = self.active_hours()[rows]
+        table['avg_pickup_m'] = average(fields['pickup_distance_sum'], fields['pickup_distance'].sum(axis=1))
+        table['avg_pickup_s'] = average(fields['pickup_duration_sum'], fields['pickup_duration'].sum(axis=1))
+        table['rating'] = average(fields['rating_sum'], fields['rating_count'])
+        return table
+
+    def driver(self, driver_id):
+        """Record of one driver (None if unknown), with its hourly quotes and pickup histograms"""
+        row = self.rows(np.array([driver_key(driver_id)], dtype=np.uint64))[0]
+        if row < 0:
+            return None
+        record = self.table([row]).iloc[0].to_dict()
+        record['hourly_quotes'] = self.fields['hourly_quotes'][row].tolist()
+        record['pickup_distance'] = dict(zip(PICKUP_SPEC.labels, self.fields['pickup_distance'][row].tolist()))
+        record['pickup_duration_min'] = dict(zip(DURATION_SPEC.labels, self.fields['pickup_duration'][row].tolist()))
+        return record
+
+    def top(self, n=10, hours=None):
+        """The n drivers with the most quotes, overall or within the given hours of day"""
+        if hours is None:
+            quotes = self.fields['quotes']
+        else:
+            quotes = self.fields['hourly_quotes'][:, list(hours)].sum(axis=1)
+        n = min(n, len(quotes))
+        if n == 0:
+            return self.table([], hours)
+        best = np.argpartition(-quotes.astype(np.int64), n - 1)[:n]
+        best = best[np.lexsort((best, -quotes[best].astype(np.int64)))]
+        return self.table(best, hours)
+
+    def supply_by_hour(self):
+        """Drivers quoting and quotes in each hour of day"""
+        hourly = self.fields['hourly_quotes']
+        drivers = (hourly > 0).sum(axis=0)
+        quotes = hourly.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            per_driver = np.where(drivers > 0, quotes / drivers, 0)
+        return pd.DataFrame({'hour': range(24), 'drivers': drivers, 'quotes': quotes,
+                             'quotes_per_driver': np.round(per_driver, 2)})
+
+    def peak_hours(self, k=3):
+        """The k hours of day with the most quotes"""
+        quotes = self.fields['hourly_quotes'].sum(axis=0)
+        return sorted(np.argsort(-quotes, kind='stable')[:k].tolist())
+
+    def save(self, path=DEFAULT_STATE_PATH):
+        arrays = {f'field/{field}': values for field, values in self.fields.items()}
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, version=np.int64(INDEX_VERSION), keys=self.keys, ids=self.ids,
+                                names=np.array(self.names, dtype=str), sources=np.array(self.sources, dtype=str),
+                                dates=self.dates, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=DEFAULT_STATE_PATH):
+        index = cls()
+        with np.load(path) as data:
+            if int(data['version']) != INDEX_VERSION:
+                raise ValueError(f"{path} was written by an incompatible version; rebuild it with --rebuild")
+            index.keys = data['keys']
+            index.ids = data['ids']
+            index.names = data['names'].tolist()
+            index.sources = data['sources'].tolist()
+            index.dates = data['dates']
+            index.fields = {field: data[f'field/{field}'] for field in DRIVER_FIELDS}
+        return index
+
+
+def source_key(path):
+    """Absolute path and size: lets a file indexed before be skipped without reading it"""
+    target = os.path.join(path, 'schema.json') if os.path.isdir(path) else path
+    return f"{os.path.abspath(path)}:{os.path.getsize(target)}"
+
+
+@traced()
+def index_file(path, chunksize=None):
+    """Driver index of one export (CSV, prepared parquet or mapped column store)"""
+    if is_prepared(path):
+        index = DriverIndex.from_frame(load_prepared(DRIVER_COLUMNS, path))
+    elif chunksize:
+        index = DriverIndex()
+        for chunk in read_chunks(path, chunksize, usecols=DRIVER_COLUMNS):
+            index.merge(DriverIndex.from_frame(compact_frame(chunk, keep_uuids=True)))
+    else:
+        index = DriverIndex.from_frame(load_compact(path, DRIVER_COLUMNS, keep_uuids=True))
+    index.sources = [source_key(path)]
+    return index
+
+
+def print_supply(index, top_n=10, peak=3):
+    print(f"\n{len(index):,} drivers, {int(index.fields['quotes'].sum()):,} quotes "
+          f"({index.nbytes / 1e6:.1f} MB in memory)")
+    print("\nSupply by hour of day:")
+    print(index.supply_by_hour().to_string(index=False))
+    hours = index.peak_hours(peak)
+    print(f"\nTop {top_n} drivers at peak hours {', '.join(map(str, hours))}:")
+    print(index.top(top_n, hours).to_string(index=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-driver supply index built incrementally from daily exports")
+    parser.add_argument('files', nargs='*', help="IST exports to add (CSV, prepared parquet or column store)")
+    parser.add_argument('--state', default=DEFAULT_STATE_PATH, help="Where the index is kept between runs")
+    parser.add_argument('--rebuild', action='store_true', help="Ignore the existing index and start over")
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help="Stream CSVs in chunks of this many rows instead of loading them whole")
+    parser.add_argument('--driver', help="Print the record of this driver_id")
+    parser.add_argument('--top', type=int, default=10, help="How many drivers to list")
+    parser.add_argument('--hours', type=int, nargs='+', choices=range(24), metavar='HOUR',
+                        help="Rank drivers by quotes in these hours of day (0-23)")
+    parser.add_argument('--peak', type=int, default=3, help="Number of peak hours to rank by when --hours is not given")
+    add_trace_argument(parser)
+    args = parser.parse_args()
+    if args.driver:
+        # Checked before any file is indexed
+        try:
+            driver_key(args.driver)
+        except ValueError as e:
+            parser.error(str(e))
+    enable_from(args.trace)
+
+    exists = os.path.exists(args.state) and not args.rebuild
+    index = DriverIndex.load(args.state) if exists else DriverIndex()
+    files = args.files or ([] if exists else [prepared_path_for(IST_FILE) or IST_FILE])
+    added = False
+    for path in files:
+        if source_key(path) in index.sources:
+            print(f"{path} is already indexed, skipping")
+            continue
+        print(f"Indexing drivers in {path}...")
+        file_index = index_file(path, args.chunksize)
+        overlap = index.indexed_dates(file_index)
+        if overlap:
+            print(f"{path} covers dates already indexed ({', '.join(overlap)}), skipping")
+            continue
+        index.merge(file_index)
+        added = True
+    if added:
+        print(f"Saving driver index to {args.state}...")
+        index.save(args.state)
+
+    if args.driver:
+        record = index.driver(args.driver)
+        if record is None:
+            print(f"Driver {args.driver} is not in the index")
+        for key, value in (record or {}).items():
+            print(f"{key:>20}: {value}")
+    elif args.hours:
+        print(f"\nTop {args.top} drivers in hours {', '.join(map(str, args.hours))}:")
+        print(index.top(args.top, args.hours).to_string(index=False))
+    else:
+        print_supply(index, args.top, args.peak)
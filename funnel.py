@@ -0,0 +1,365 @@
+"""Search chain funnel: retries, quotes and outcomes of each customer search.
+
+Every retry of a customer's search is a separate search try row, with
+search_repeat_counter 0, 1, 2, ... and the same start_time (when the customer
+started searching). Separate searches can share a start_time second and
+vehicle variant, though, so a search chain is built in two steps:
+
+- tries: the rows of each try id (the export repeats status snapshots of some
+  tries, possibly thousands of rows apart) are reduced into one per-try state,
+  keyed by a 64-bit hash of the id and mapped to dense ids with pd.factorize
+  (a hash table, sort=False); every field is a sum, min or max reduced with
+  np.bincount or np.minimum.at / np.maximum.at. The state of each chunk merges
+  the same way, so a file of any size is read once, chunk by chunk.
+- chains: the tries sharing start_time and vehicle_variant (the chain key) are
+  ordered by created_at once, and every INITIAL try (search_repeat_counter 0)
+  starts a new chain; the retries after it join that chain. Tries without a
+  start_time form a chain of their own.
+
+Tries are counted by distinct id. A retry whose chain key holds several
+searches is assigned to the latest of them started before it; the funnel
+reports how many chains share their key this way.
+
+The funnel then reports, per chain, whether each STAGE was reached, the time to
+the first driver quote (dq.created_at - created_at of the chain's first try,
+and from start_time) and how many tries it took.
+
+    python funnel.py [--input Chennai_22March_IST.csv] [--chunksize 1000000] [--chains chains.csv]
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from compact_loader import compact_frame, load_compact
+from dimension_aggregator import quote_present
+from instrumentation import add_trace_argument, enable_from, traced
+from prepared_dataset import IST_FILE, is_prepared, load_prepared, prepared_path_for
+from sketches import uuid_hashes
+from streaming_ingest import read_chunks
+
+FUNNEL_COLUMNS = ['id', 'created_at', 'start_time', 'vehicle_variant', 'status', 'search_repeat_counter',
+                  'search_repeat_type', 'dq.id', 'dq.created_at']
+CHAIN_COLUMNS = ['start_time', 'vehicle_variant']
+DEFAULT_OUTPUT_PATH = 'chennai-rickshaw-analytics/public/funnel.json'
+
+# Funnel stages in order: (key, label, predicate on a try); a chain reaches a stage if any of its tries does.
+# The export has no booking or ride columns, so rider acceptance (RAR) and booking completion (BCR) stages
+# can only be added here once those exports are joined in.
+STAGES = (
+    ('searched', 'Searched', None),
+    ('quoted', 'Driver quoted (DAR)', lambda df: quote_present(df)),
+    ('completed', 'Search completed', lambda df: (df['status'] == 'COMPLETED').to_numpy(dtype=bool)),
+)
+
+OUTCOMES = ('COMPLETED', 'CANCELLED', 'ACTIVE')
+
+# Missing timestamps in min-reduced fields
+NO_TIME = np.iinfo(np.int64).max
+
+# Per-try state and how two partial states of the same try (rows of other chunks) combine
+TRY_FIELDS = {
+    'rows': 'sum',
+    # Hash of the chain columns, as int64; the same on every row of a try
+    'chain_key': 'min',
+    'counter': 'max',
+    'initial': 'max',
+    'retry': 'max',
+    'reallocation': 'max',
+    'start_us': 'min',
+    'created_us': 'min',
+    'first_quote_us': 'min',
+    'min_quote_latency_us': 'min',
+    'first_quoted_counter': 'min',
+    # created_at of the latest row with its status code in the low bits, so max() gives the latest status
+    'last_status': 'max',
+    **{f'reached_{key}': 'max' for key, _, _ in STAGES[1:]},
+}
+
+# Per-chain state: (try field it is reduced from, op)
+CHAIN_FIELDS = {
+    'rows': ('rows', 'sum'),
+    'tries': (None, 'count'),
+    'retries': ('retry', 'sum'),
+    'reallocations': ('reallocation', 'sum'),
+    'start_us': ('start_us', 'min'),
+    'first_try_us': ('created_us', 'min'),
+    'first_quote_us': ('first_quote_us', 'min'),
+    'min_quote_latency_us': ('min_quote_latency_us', 'min'),
+    'first_quoted_counter': ('first_quoted_counter', 'min'),
+    'max_counter': ('counter', 'max'),
+    'last_status': ('last_status', 'max'),
+    **{f'reached_{key}': (f'reached_{key}', 'max') for key, _, _ in STAGES[1:]},
+}
+
+_STATUS_BITS = 2
+
+
+def _micros(series):
+    """Timestamps as int64 microseconds, NO_TIME where missing"""
+    if not pd.api.types.is_datetime64_any_dtype(series):
+        series = pd.to_datetime(series, errors='coerce')
+    values = series.to_numpy(dtype='datetime64[us]')
+    micros = values.view(np.int64).copy()
+    micros[np.isnat(values)] = NO_TIME
+    return micros
+
+
+def try_keys(df):
+    """64-bit hash of each row's try id"""
+    keys, valid = uuid_hashes(df['id'])
+    if not valid.all():
+        keys[~valid] = pd.util.hash_pandas_object(df.loc[~valid, 'id'].astype(str), index=False).to_numpy()
+    return keys
+
+
+def chain_keys(df, tries=None):
+    """64-bit hash of each row's chain columns; rows without start_time are keyed by their try id"""
+    keys = pd.util.hash_pandas_object(df[CHAIN_COLUMNS], index=False).to_numpy()
+    alone = df['start_time'].isna().to_numpy()
+    if alone.any():
+        keys[alone] = (try_keys(df) if tries is None else tries)[alone]
+    return keys
+
+
+def _reduce(codes, n_groups, columns, ops):
+    """Reduce per-row columns into per-group state, each with its op (sum, min, max)"""
+    state = {}
+    for field, values in columns.items():
+        op = ops[field]
+        if op == 'sum':
+            out = np.bincount(codes, weights=values, minlength=n_groups).astype(np.int64)
+        else:
+            out = np.full(n_groups, NO_TIME if op == 'min' else np.iinfo(np.int64).min, dtype=np.int64)
+            (np.minimum if op == 'min' else np.maximum).at(out, codes, values)
+        state[field] = out
+    return state
+
+
+def _row_fields(df, tries):
+    """Per-row values of every TRY_FIELDS entry"""
+    created = _micros(df['created_at'])
+    quote_time = _micros(df['dq.created_at'])
+    has_quote = quote_present(df) & (quote_time != NO_TIME)
+    repeat_type = df['search_repeat_type']
+    counter = pd.to_numeric(df['search_repeat_counter'], errors='coerce').fillna(0).to_numpy(dtype=np.int64)
+    status = df['status'].astype(object).to_numpy()
+    status_codes = np.full(len(df), len(OUTCOMES), dtype=np.int64)
+    for code, outcome in enumerate(OUTCOMES):
+        status_codes[status == outcome] = code
+
+    latency = np.where(has_quote & (created != NO_TIME), quote_time - created, NO_TIME)
+    retry = (repeat_type != 'INITIAL').to_numpy(dtype=bool) & repeat_type.notna().to_numpy()
+    fields = {
+        'rows': np.ones(len(df), dtype=np.int64),
+        'chain_key': chain_keys(df, tries).view(np.int64),
+        'counter': counter,
+        'initial': ((counter == 0) & ~retry).astype(np.int64),
+        'retry': retry.astype(np.int64),
+        'reallocation': (repeat_type == 'REALLOCATION').to_numpy(dtype=np.int64),
+        'start_us': _micros(df['start_time']),
+        'created_us': created,
+        'first_quote_us': np.where(has_quote, quote_time, NO_TIME),
+        'min_quote_latency_us': latency,
+        'first_quoted_counter': np.where(has_quote, counter, NO_TIME),
+        'last_status': np.where(created != NO_TIME, created, 0) << _STATUS_BITS | np.minimum(status_codes, 3),
+    }
+    for key, _, predicate in STAGES[1:]:
+        fields[f'reached_{key}'] = predicate(df).astype(np.int64)
+    return fields
+
+
+@traced()
+def try_partials(df):
+    """Per-try state of a frame of search tries: a frame with a 'key' column (try id hash) plus TRY_FIELDS"""
+    tries = try_keys(df)
+    codes, uniques = pd.factorize(tries, sort=False)
+    state = _reduce(codes, len(uniques), _row_fields(df, tries), TRY_FIELDS)
+    return pd.DataFrame({'key': uniques, **state})
+
+
+@traced()
+def merge_try_partials(partials):
+    """Combine per-try states of several chunks; tries spanning chunks are merged by key"""
+    partials = [p for p in partials if p is not None and len(p)]
+    if not partials:
+        return pd.DataFrame({'key': np.array([], dtype=np.uint64),
+                             **{field: np.array([], dtype=np.int64) for field in TRY_FIELDS}})
+    if len(partials) == 1:
+        return partials[0]
+    stacked = pd.concat(partials, ignore_index=True)
+    codes, uniques = pd.factorize(stacked['key'].to_numpy(), sort=False)
+    state = _reduce(codes, len(uniques), {field: stacked[field].to_numpy() for field in TRY_FIELDS}, TRY_FIELDS)
+    return pd.DataFrame({'key': uniques, **state})
+
+
+@traced()
+def build_chains(tries):
+    """Per-chain state from per-try state: every INITIAL try starts a new chain within its chain key.
+
+    Also flags (shared_key) the chains whose key holds more than one search.
+    """
+    keys = tries['chain_key'].to_numpy()
+    initial = tries['initial'].to_numpy()
+    # One sort of the tries: by chain key, then created_at (counter breaks ties)
+    order = np.lexsort((tries['counter'].to_numpy(), tries['created_us'].to_numpy(), keys))
+    sorted_keys = keys[order]
+    new_key = np.ones(len(order), dtype=bool)
+    new_key[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    # A try before any INITIAL of its key (e.g. the INITIAL is in another day's export) opens a chain too
+    new_chain = new_key | (initial[order] == 1)
+    codes = np.empty(len(order), dtype=np.int64)
+    codes[order] = np.cumsum(new_chain) - 1
+    n_chains = int(new_chain.sum())
+
+    key_codes = np.empty(len(order), dtype=np.int64)
+    key_codes[order] = np.cumsum(new_key) - 1
+    searches_per_key = np.bincount(key_codes, weights=initial, minlength=int(new_key.sum()))
+
+    state = {}
+    for field, (source, op) in CHAIN_FIELDS.items():
+        if op == 'count':
+            state[field] = np.bincount(codes, minlength=n_chains).astype(np.int64)
+        else:
+            state.update(_reduce(codes, n_chains, {field: tries[source].to_numpy()}, {field: op}))
+    shared = np.zeros(n_chains, dtype=np.int64)
+    np.maximum.at(shared, codes, (searches_per_key[key_codes] > 1).astype(np.int64))
+    state['shared_key'] = shared
+    return pd.DataFrame(state)
+
+
+def stream_tries(file_path, chunksize):
+    """Per-try state of a CSV export in one chunked pass"""
+    partials = []
+    for chunk in read_chunks(file_path, chunksize, usecols=FUNNEL_COLUMNS):
+        partials.append(try_partials(compact_frame(chunk, keep_uuids=True)))
+    return merge_try_partials(partials)
+
+
+def load_chains(path, chunksize=None):
+    if chunksize and not is_prepared(path):
+        return build_chains(stream_tries(path, chunksize))
+    if is_prepared(path):
+        df = load_prepared(FUNNEL_COLUMNS, path)
+    else:
+        df = load_compact(path, FUNNEL_COLUMNS, keep_uuids=True)
+    return build_chains(try_partials(df))
+
+
+def chain_table(chains):
+    """Readable per-chain frame: tries, stages reached, time to quote and final outcome"""
+    def seconds(values, valid):
+        return np.where(valid, values / 1e6, np.nan)
+
+    quoted = chains['first_quote_us'].to_numpy() != NO_TIME
+    first_try = chains['first_try_us'].to_numpy()
+    start = chains['start_us'].to_numpy()
+    last_status = chains['last_status'].to_numpy() & ((1 << _STATUS_BITS) - 1)
+    table = pd.DataFrame({
+        'start_time': pd.to_datetime(np.where(start != NO_TIME, start, np.iinfo(np.int64).min), unit='us'),
+        'rows': chains['rows'],
+        'tries': chains['tries'],
+        'retries': chains['retries'],
+        'reallocations': chains['reallocations'],
+        **{key: chains[f'reached_{key}'].astype(bool) for key, _, _ in STAGES[1:]},
+        'tries_to_quote': np.where(quoted, chains['first_quoted_counter'] + 1, 0),
+        'time_to_quote_s': seconds(chains['first_quote_us'] - first_try, quoted & (first_try != NO_TIME)),
+        'time_from_start_s': seconds(chains['first_quote_us'] - start, quoted & (start != NO_TIME)),
+        'fastest_quote_s': seconds(chains['min_quote_latency_us'], chains['min_quote_latency_us'] != NO_TIME),
+        'shared_key': chains['shared_key'].astype(bool),
+        'outcome': pd.Categorical.from_codes(np.minimum(last_status, len(OUTCOMES)),
+                                             categories=list(OUTCOMES) + ['UNKNOWN']),
+    })
+    return table
+
+
+def _percentiles(values):
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return {'p50': None, 'p90': None, 'p99': None}
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {'p50': float(p50), 'p90': float(p90), 'p99': float(p99)}
+
+
+def funnel_summary(table):
+    """Chain-level funnel: stage counts and conversion, retries, time to quote and outcomes"""
+    chains = len(table)
+    stages = []
+    previous = chains
+    for key, label, _ in STAGES:
+        reached = chains if key == 'searched' else int(table[key].sum())
+        stages.append({
+            'stage': key,
+            'label': label,
+            'chains': reached,
+            'conversionRate': float(reached / previous * 100) if previous else 0.0,
+            'overallRate': float(reached / chains * 100) if chains else 0.0,
+        })
+        previous = reached
+
+    by_tries = table.groupby('tries').agg(chains=('tries', 'size'), quoted=('quoted', 'sum'))
+    return {
+        'chains': chains,
+        'tries': int(table['tries'].sum()),
+        'rows': int(table['rows'].sum()),
+        'stages': stages,
+        'byTries': [{'tries': int(tries), 'chains': int(row.chains),
+                     'quoteRate': float(row.quoted / row.chains * 100)} for tries, row in by_tries.iterrows()],
+        'timeToQuoteSeconds': _percentiles(table['time_to_quote_s'].to_numpy()),
+        'timeFromStartSeconds': _percentiles(table['time_from_start_s'].to_numpy()),
+        'fastestQuoteSeconds': _percentiles(table['fastest_quote_s'].to_numpy()),
+        'chainsWithReallocation': int((table['reallocations'] > 0).sum()),
+        # Chains whose start_time and vehicle variant are shared with another search of the export
+        'chainsSharingKey': int(table['shared_key'].sum()),
+        'outcomes': {str(k): int(v) for k, v in table['outcome'].value_counts(sort=False).items() if v},
+    }
+
+
+def print_funnel(summary):
+    print(f"\n=== SEARCH CHAIN FUNNEL ({summary['chains']} chains, {summary['tries']} tries, "
+          f"{summary['rows']} rows) ===")
+    print(f"{'Stage':24} {'Chains':>8} {'Step %':>8} {'Overall %':>10}")
+    for stage in summary['stages']:
+        print(f"{stage['label']:24} {stage['chains']:>8} {stage['conversionRate']:>8.2f} {stage['overallRate']:>10.2f}")
+
+    print("\nQuote rate by tries per chain:")
+    for row in summary['byTries']:
+        print(f"  {row['tries']} tries: {row['chains']:>6} chains, {row['quoteRate']:.2f}% quoted")
+
+    for key, label in [('timeToQuoteSeconds', 'first try -> first quote'),
+                       ('timeFromStartSeconds', 'search start -> first quote'),
+                       ('fastestQuoteSeconds', 'fastest try -> its quote')]:
+        p = summary[key]
+        if p['p50'] is not None:
+            print(f"Time {label:28} p50 {p['p50']:.0f}s  p90 {p['p90']:.0f}s  p99 {p['p99']:.0f}s")
+    print(f"Chains with a reallocation: {summary['chainsWithReallocation']}")
+    print(f"Chains sharing start_time and vehicle variant with another search: {summary['chainsSharingKey']}")
+    print(f"Final outcome of each chain: {summary['outcomes']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search chain funnel: retries, quotes and outcomes per search")
+    parser.add_argument('--input', default=None, help="IST export (CSV, prepared parquet or mapped column store)")
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help="Stream the CSV in chunks of this many rows instead of loading it whole")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_PATH, help="Funnel summary JSON for the dashboard")
+    parser.add_argument('--chains', default=None, help="Also write the per-chain table to this CSV")
+    add_trace_argument(parser)
+    args = parser.parse_args()
+    enable_from(args.trace)
+
+    path = args.input or prepared_path_for(IST_FILE) or IST_FILE
+    print(f"Building search chains from {path}...")
+    table = chain_table(load_chains(path, args.chunksize))
+    summary = funnel_summary(table)
+    print_funnel(summary)
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    print(f"\nWriting funnel summary to {args.output}...")
+    with open(args.output, 'w') as f:
+        json.dump(summary, f, indent=2)
+    if args.chains:
+        print(f"Writing {len(table)} chains to {args.chains}...")
+        table.to_csv(args.chains, index=False)
@@ -0,0 +1,185 @@
+"""Incremental append mode: fold only the new rows of growing exports into the dashboard.
+
+The per-bin aggregate state (counts, sums and non-null counts) of every input file,
+overall and per created_at date, is kept in a state file together with how many
+bytes of that file were consumed. Each run reads only the bytes appended since
+the last run, adds their partial state, and rewrites data.json and the dashboard
+shards and manifest (dashboard_shards.py), which the dashboard reads, so update
+time scales with the delta.
+The bins are those of binning.dimension_specs(); when binnings.json redefines
+them, the saved state no longer fits and every file is consumed again.
+
+    python incremental_update.py Chennai_22March_IST.csv [more.csv ...] [--gst]
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+
+import pandas as pd
+
+from batch_process import city_from_path
+from binning import bins_signature, dimension_specs
+from dashboard_shards import ALL, DEFAULT_SHARD_DIR, partials_by_date, write_shards
+from dimension_aggregator import (DEFAULT_SPECS, SUMMARY_KEY, aggregate_partials, build_output_data,
+                                  empty_state, merge_partials)
+from ist_conversion import DATE_COLUMNS, convert_frame_to_ist
+
+DEFAULT_STATE_PATH = 'chennai-rickshaw-analytics/data_state.json'
+DEFAULT_OUTPUT_PATH = 'chennai-rickshaw-analytics/public/data.json'
+
+STATE_VERSION = 2
+
+# Bytes at the start of a file hashed to detect an export rewritten in place
+FINGERPRINT_BYTES = 64 * 1024
+
+
+def _fingerprint(f, length):
+    f.seek(0)
+    return hashlib.sha256(f.read(min(length, FINGERPRINT_BYTES))).hexdigest()
+
+
+def partials_to_json(partials):
+    return {name: state.to_dict(orient='list') for name, state in partials.items()}
+
+
+def partials_from_json(data, specs=DEFAULT_SPECS):
+    partials = {}
+    for name, n_bins in [(SUMMARY_KEY, 1)] + [(spec.name, spec.n_bins) for spec in specs]:
+        state = empty_state(n_bins)
+        for field, values in data[name].items():
+            state[field] = pd.Series(values, dtype=state[field].dtype)
+        partials[name] = state
+    return partials
+
+
+def load_state(state_path, specs=DEFAULT_SPECS):
+    bins = bins_signature(specs)
+    if not os.path.exists(state_path):
+        return {'version': STATE_VERSION, 'bins': bins, 'sources': {}}
+    with open(state_path) as f:
+        state = json.load(f)
+    if state.get('version') != STATE_VERSION:
+        print(f"State file {state_path} has an unknown version, rebuilding from scratch...")
+        return {'version': STATE_VERSION, 'bins': bins, 'sources': {}}
+    # States saved before the bins were recorded used the built-in ones
+    if state.get('bins', bins_signature(DEFAULT_SPECS)) != bins:
+        print(f"State file {state_path} was built with other bins, rebuilding from scratch...")
+        return {'version': STATE_VERSION, 'bins': bins, 'sources': {}}
+    state['bins'] = bins
+    return state
+
+
+def save_state(state, state_path):
+    os.makedirs(os.path.dirname(state_path) or '.', exist_ok=True)
+    tmp_path = state_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_path)
+
+
+def read_delta(file_path, source, convert_gst):
+    """Read the complete lines appended to file_path since source was recorded.
+
+    Returns (frame or None, updated source record). A trailing line without a
+    newline is left for the next run, since the export may still be writing it.
+    """
+    with open(file_path, 'rb') as f:
+        size = f.seek(0, io.SEEK_END)
+        offset = source.get('bytes_consumed', 0)
+
+        # A shrunk or rewritten file cannot be appended to; consume it from the start
+        if offset and (size < offset or _fingerprint(f, offset) != source.get('fingerprint')):
+            print(f"{file_path} was rewritten, reprocessing it from the start...")
+            source, offset = {}, 0
+
+        f.seek(offset)
+        data = f.read()
+        data = data[:data.rfind(b'\n') + 1]
+        if not data:
+            return None, source
+
+        if offset == 0:
+            frame = pd.read_csv(io.BytesIO(data))
+            columns = list(frame.columns)
+        else:
+            columns = source['columns']
+            frame = pd.read_csv(io.BytesIO(data), header=None, names=columns)
+
+        consumed = offset + len(data)
+        source = {
+            'bytes_consumed': consumed,
+            'rows_consumed': source.get('rows_consumed', 0) + len(frame),
+            'columns': columns,
+            'fingerprint': _fingerprint(f, consumed),
+            'partials': source.get('partials'),
+            'date_partials': source.get('date_partials', {}),
+        }
+
+    if convert_gst:
+        frame = convert_frame_to_ist(frame, DATE_COLUMNS)
+    return frame, source
+
+
+def update_incrementally(file_paths, state_path=DEFAULT_STATE_PATH, output_path=DEFAULT_OUTPUT_PATH,
+                         convert_gst=False, specs=DEFAULT_SPECS, shard_dir=DEFAULT_SHARD_DIR):
+    """Fold new rows of file_paths into the saved state and rewrite data.json and the shards"""
+    state = load_state(state_path, specs)
+    new_rows = 0
+
+    for file_path in file_paths:
+        key = os.path.abspath(file_path)
+        frame, source = read_delta(file_path, state['sources'].get(key, {}), convert_gst)
+        if frame is not None:
+            print(f"Folding {len(frame)} new rows from {file_path}...")
+            previous = partials_from_json(source['partials'], specs) if source['partials'] else None
+            source['partials'] = partials_to_json(merge_partials(previous, aggregate_partials(frame, specs)))
+            for day, partials in partials_by_date(frame, specs).items():
+                saved = source['date_partials'].get(day)
+                previous = partials_from_json(saved, specs) if saved else None
+                source['date_partials'][day] = partials_to_json(merge_partials(previous, partials))
+            new_rows += len(frame)
+        state['sources'][key] = source
+
+    # The dashboard reflects every file recorded in the state, not just this run's inputs
+    totals = None
+    shard_partials = {}
+    for path, source in state['sources'].items():
+        if not source.get('partials'):
+            continue
+        partials = partials_from_json(source['partials'], specs)
+        totals = merge_partials(totals, partials)
+        city = city_from_path(path)
+        shard_partials[(city, ALL)] = merge_partials(shard_partials.get((city, ALL)), partials)
+        for day, saved in source['date_partials'].items():
+            shard_partials[(city, day)] = merge_partials(shard_partials.get((city, day)),
+                                                         partials_from_json(saved, specs))
+    if totals is None:
+        print("No data consumed yet.")
+        return None
+
+    save_state(state, state_path)
+
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    print(f"Writing data to {output_path}...")
+    with open(output_path, 'w') as f:
+        json.dump(build_output_data(totals, specs), f, indent=2)
+    if shard_dir:
+        shard_partials[(ALL, ALL)] = totals
+        write_shards(shard_partials, shard_dir, specs)
+
+    print(f"Incremental update completed: {new_rows} new rows.")
+    return output_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Update the dashboard data from only the new rows of growing exports")
+    parser.add_argument('files', nargs='+', help="Export CSV files (IST unless --gst is given)")
+    parser.add_argument('--state', default=DEFAULT_STATE_PATH, help="Where the aggregate state is kept")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_PATH)
+    parser.add_argument('--shard-dir', default=DEFAULT_SHARD_DIR,
+                        help="Where the dashboard shards and manifest are written ('' to skip)")
+    parser.add_argument('--gst', action='store_true', help="Inputs are raw GST exports; convert to IST on read")
+    args = parser.parse_args()
+    update_incrementally(args.files, args.state, args.output, args.gst, dimension_specs(), args.shard_dir)
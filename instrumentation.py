@@ -0,0 +1,281 @@
+"""Per-stage profiling of the pipeline scripts: wall/CPU time, rows, peak memory and bytes read.
+
+Off by default. Turn it on with --trace [PATH] on a script or by setting
+PIPELINE_TRACE (1 for the default path, or a path):
+
+    PIPELINE_TRACE=1 python csv_to_json_converter.py
+    python analyze_search_quotes.py --trace trace.json
+
+At exit a JSON trace of every stage is written and a summary table is printed.
+Stages nest: a stage opened while another is running in the same thread is
+recorded as its child; each thread keeps its own stack of open stages, so the
+stages of concurrent tasks (analysis_tasks.py) are separate roots. CPU time
+(process_time) and peak RSS are process-wide, though: a stage that overlaps
+another thread's work is charged for that work's CPU and memory too.
+
+When tracing is off, stage() hands back one shared no-op object and traced
+functions call straight through, so the cost is one global lookup per call.
+"""
+import atexit
+import functools
+import json
+import os
+import resource
+import threading
+import time
+
+import pandas as pd
+
+ENV_VAR = 'PIPELINE_TRACE'
+DEFAULT_TRACE_PATH = 'pipeline_trace.json'
+
+_tracer = None
+
+
+def _rss_peak_kb():
+    """Peak RSS since the last reset (VmHWM) on Linux, else since process start"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _reset_rss_peak():
+    """Reset VmHWM to the current RSS so the next reading is this stage's own peak"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _bytes_read():
+    """Bytes this process has read through read() calls so far, None where /proc/self/io is missing"""
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                if line.startswith('rchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+class Stage:
+    """One timed stage; set rows_in/rows_out/bytes_read inside the with block where known"""
+
+    def __init__(self, name, parent=None, rows_in=None):
+        self.name = name
+        self.parent = parent
+        self.depth = 0 if parent is None else parent.depth + 1
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.bytes_read = None
+        self.peak_kb = 0
+        self.thread = threading.current_thread().name
+
+    def start(self, origin):
+        self.offset = time.perf_counter() - origin
+        self._read = _bytes_read()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+
+    def stop(self):
+        self.wall = time.perf_counter() - self._wall
+        self.cpu = time.process_time() - self._cpu
+        if self.bytes_read is None and self._read is not None:
+            self.bytes_read = _bytes_read() - self._read
+
+    def record(self):
+        return {
+            'name': self.name,
+            'parent': self.parent.name if self.parent is not None else None,
+            'depth': self.depth,
+            'start_s': round(self.offset, 6),
+            'wall_s': round(self.wall, 6),
+            'cpu_s': round(self.cpu, 6),
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'peak_rss_mb': round(self.peak_kb / 1024, 1),
+            'bytes_read': self.bytes_read,
+            'thread': self.thread,
+        }
+
+
+class _NullStage:
+    """Stand-in for Stage when tracing is off: accepts the same attributes and does nothing"""
+    rows_in = rows_out = bytes_read = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Tracer:
+    """Collects finished stages and writes them out at exit"""
+
+    def __init__(self, path=DEFAULT_TRACE_PATH):
+        self.path = path
+        self.origin = time.perf_counter()
+        self.stages = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.per_stage_peaks = _reset_rss_peak()
+
+    @property
+    def current(self):
+        """The innermost open stage of the calling thread"""
+        return getattr(self._local, 'current', None)
+
+    @current.setter
+    def current(self, stage):
+        self._local.current = stage
+
+    def open(self, stage):
+        stage.start(self.origin)
+        if self.current is not None:
+            self.current.peak_kb = max(self.current.peak_kb, _rss_peak_kb())
+        if self.per_stage_peaks:
+            _reset_rss_peak()
+        self.current = stage
+
+    def close(self, stage):
+        stage.stop()
+        stage.peak_kb = max(stage.peak_kb, _rss_peak_kb())
+        if stage.parent is not None:
+            stage.parent.peak_kb = max(stage.parent.peak_kb, stage.peak_kb)
+        self.current = stage.parent
+        with self._lock:
+            self.stages.append(stage)
+
+    def write(self):
+        with self._lock:
+            stages = list(self.stages)
+        records = sorted((stage.record() for stage in stages), key=lambda r: r['start_s'])
+        trace = {
+            'total_wall_s': round(time.perf_counter() - self.origin, 6),
+            'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            'per_stage_peaks': self.per_stage_peaks,
+            'stages': records,
+        }
+        with open(self.path, 'w') as f:
+            json.dump(trace, f, indent=2)
+        return trace
+
+    def report(self):
+        if not self.stages:
+            return
+        trace = self.write()
+        print_summary(trace['stages'])
+        print(f"Trace written to {self.path}")
+
+
+class _StageContext:
+    def __init__(self, tracer, name, rows_in):
+        self.tracer = tracer
+        self.stage = Stage(name, tracer.current, rows_in)
+
+    def __enter__(self):
+        self.tracer.open(self.stage)
+        return self.stage
+
+    def __exit__(self, *exc):
+        self.tracer.close(self.stage)
+        return False
+
+
+def enable(path=None):
+    """Start tracing this process; the trace is written to path (default pipeline_trace.json) at exit"""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer(path or DEFAULT_TRACE_PATH)
+        atexit.register(_tracer.report)
+    return _tracer
+
+
+def enable_from(flag=None):
+    """Enable tracing from a --trace argument or, failing that, the PIPELINE_TRACE variable"""
+    value = flag or os.environ.get(ENV_VAR)
+    if not value or value == '0':
+        return None
+    return enable(None if value in ('1', 'true', 'yes') else value)
+
+
+def add_trace_argument(parser):
+    parser.add_argument('--trace', nargs='?', const=DEFAULT_TRACE_PATH, default=None, metavar='PATH',
+                        help=f"Profile every stage and write a JSON trace (default {DEFAULT_TRACE_PATH}); "
+                             f"also enabled by {ENV_VAR}=1")
+
+
+def stage(name, rows_in=None):
+    """Context manager timing one stage; yields the Stage so rows_out etc. can be filled in"""
+    if _tracer is None:
+        return _NULL_STAGE
+    return _StageContext(_tracer, name, rows_in)
+
+
+def _rows(value):
+    return len(value) if isinstance(value, (pd.DataFrame, pd.Series)) else None
+
+
+def traced(name=None):
+    """Decorator timing every call as a stage; rows are taken from DataFrame arguments and results"""
+    def decorate(func):
+        stage_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            rows_in = next((rows for rows in map(_rows, args) if rows is not None), None)
+            with _StageContext(_tracer, stage_name, rows_in) as current:
+                result = func(*args, **kwargs)
+                current.rows_out = _rows(result)
+            return result
+        return wrapper
+    return decorate
+
+
+def summarize(records):
+    """Stage records grouped by name, in first-start order: calls, time, rows, peak memory and bytes read"""
+    groups = {}
+    for record in records:
+        group = groups.setdefault(record['name'], {
+            'name': record['name'], 'depth': record['depth'], 'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0,
+            'rows_in': None, 'rows_out': None, 'peak_rss_mb': 0.0, 'bytes_read': None,
+        })
+        group['calls'] += 1
+        group['wall_s'] += record['wall_s']
+        group['cpu_s'] += record['cpu_s']
+        group['peak_rss_mb'] = max(group['peak_rss_mb'], record['peak_rss_mb'])
+        for key in ('rows_in', 'rows_out', 'bytes_read'):
+            if record[key] is not None:
+                group[key] = (group[key] or 0) + record[key]
+    return list(groups.values())
+
+
+def print_summary(records):
+    def number(value):
+        return '-' if value is None else f"{value:,}"
+
+    print(f"\n{'Stage':44} {'Calls':>6} {'Wall (s)':>9} {'CPU (s)':>9} {'Rows in':>11} {'Rows out':>11} "
+          f"{'Peak (MB)':>10} {'Read (MB)':>10}")
+    for group in summarize(records):
+        label = '  ' * group['depth'] + group['name']
+        read = '-' if group['bytes_read'] is None else f"{group['bytes_read'] / 1e6:.1f}"
+        print(f"{label[:44]:44} {group['calls']:>6} {group['wall_s']:>9.3f} {group['cpu_s']:>9.3f} "
+              f"{number(group['rows_in']):>11} {number(group['rows_out']):>11} "
+              f"{group['peak_rss_mb']:>10.1f} {read:>10}")
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from instrumentation import traced
+
+# Timestamp columns exported in GST that need shifting to IST
+DATE_COLUMNS = ['created_at', 'start_time', 'dq.created_at']
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# ClickHouse writes this for missing timestamps; it must stay as-is
+EPOCH_SENTINEL = '1970-01-01 00:00:00'
+
+IST_OFFSET = np.timedelta64(5 * 3600 + 30 * 60, 's')
+
+
+def convert_series_to_ist(series):
+    """Shift a column of GST timestamp strings to IST in one vectorized pass.
+
+    Nulls, the epoch sentinel and anything that does not parse (e.g. \\N) are
+    returned unchanged, matching the old per-row strptime/strftime path.
+    """
+    parsed = pd.to_datetime(series, format=DATE_FORMAT, errors='coerce')
+    convertible = (parsed.notna() & (series != EPOCH_SENTINEL)).to_numpy()
+
+    result = series.copy()
+    if not convertible.any():
+        return result
+
+    # Shift at second resolution and format back without going through Python objects
+    shifted = parsed.to_numpy()[convertible].astype('datetime64[s]') + IST_OFFSET
+    formatted = np.char.replace(np.datetime_as_string(shifted, unit='s'), 'T', ' ')
+    result[convertible] = formatted.astype(object)
+    return result
+
+
+@traced()
+def convert_frame_to_ist(df, date_columns=DATE_COLUMNS):
+    """Return a copy of df with every date column converted from GST to IST"""
+    df = df.copy()
+    for col in date_columns:
+        if col in df.columns:
+            df[col] = convert_series_to_ist(df[col])
+    return df
@@ -0,0 +1,405 @@
+"""Live driver accept rate (DAR) over a stream of search try and driver quote events.
+
+Events are JSON lines, either appended to a file (followed like tail -f) or sent
+to a local TCP socket standing in for the production feed:
+
+    {"type": "search_try", "search_try_id": "...", "created_at": "2025-03-22 18:04:11"}
+    {"type": "driver_quote", "search_try_id": "...", "created_at": "2025-03-22 18:04:15",
+     "distance_to_pickup": 420}
+
+Quotes are joined to pending tries by search_try_id. Tries still unmatched
+join_timeout seconds (event time) after they were created are evicted and stay
+counted as searches without a quote; quotes stamped before their try (clock
+skew between services) wait for it for the same time before being dropped.
+A try or quote re-sent for a search_try_id already seen within the window (the
+exports carry one row per status change of a try) is counted once. Conversion is kept per IST hour bin and per
+pickup distance bin, both for a sliding window (a ring of per-slot counters)
+and since start; like the dashboard's pickupDistanceData, the pickup bins only
+see tries whose quote reported a pickup distance. Memory is bounded by the ring
+size and max_pending, not by the number of events.
+
+    python live_dar.py --tail events.jsonl
+    python live_dar.py --socket 127.0.0.1:9099
+    python live_dar.py --replay Chennai_22March_IST.csv [--write-events events.jsonl]
+"""
+import argparse
+import json
+import os
+import socket
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from dimension_aggregator import HOURLY_SPEC, PICKUP_SPEC
+from ist_conversion import DATE_FORMAT, EPOCH_SENTINEL
+
+SEARCH_TRY = 'search_try'
+DRIVER_QUOTE = 'driver_quote'
+
+DEFAULT_WINDOW_MINUTES = 60
+DEFAULT_SLOT_SECONDS = 60
+DEFAULT_JOIN_TIMEOUT = 600
+DEFAULT_MAX_PENDING = 1_000_000
+
+_PICKUP_EDGES = [float(edge) for edge in PICKUP_SPEC.edges[1:-1]]
+
+
+def _epoch_seconds(text):
+    """Seconds since the epoch of a naive IST timestamp string"""
+    if not isinstance(text, str):
+        raise TypeError(f"created_at must be a string, got {text!r}")
+    return float(np.datetime64(text.replace(' ', 'T'), 's').astype('int64'))
+
+
+def pickup_code(distance):
+    """Pickup distance bin of one value, -1 when missing"""
+    if distance is None or distance != distance or distance < 0:
+        return -1
+    code = 0
+    for edge in _PICKUP_EDGES:
+        if distance < edge:
+            break
+        code += 1
+    return code
+
+
+class SlidingCounts:
+    """Per-bin searches and quotes over the last n_slots slots of event time"""
+
+    def __init__(self, n_bins, n_slots):
+        self.n_slots = n_slots
+        self.searches = np.zeros((n_slots, n_bins), dtype=np.int64)
+        self.quotes = np.zeros((n_slots, n_bins), dtype=np.int64)
+        self.slot_ids = np.full(n_slots, -1, dtype=np.int64)
+        self.current = -1
+
+    def advance(self, slot_id):
+        """Move the window forward so that slot_id is its newest slot"""
+        if slot_id <= self.current:
+            return
+        first = max(self.current + 1, slot_id - self.n_slots + 1)
+        for new_slot in range(first, slot_id + 1):
+            ring = new_slot % self.n_slots
+            self.searches[ring] = 0
+            self.quotes[ring] = 0
+            self.slot_ids[ring] = new_slot
+        self.current = slot_id
+
+    def add(self, slot_id, code, searches=0, quotes=0):
+        ring = slot_id % self.n_slots
+        if code < 0 or self.slot_ids[ring] != slot_id:
+            return
+        self.searches[ring, code] += searches
+        self.quotes[ring, code] += quotes
+
+    def totals(self):
+        return self.searches.sum(axis=0), self.quotes.sum(axis=0)
+
+
+class LiveDarCalculator:
+    """Joins quote events to try events and keeps windowed and cumulative DAR"""
+
+    def __init__(self, window_minutes=DEFAULT_WINDOW_MINUTES, slot_seconds=DEFAULT_SLOT_SECONDS,
+                 join_timeout=DEFAULT_JOIN_TIMEOUT, max_pending=DEFAULT_MAX_PENDING):
+        self.slot_seconds = slot_seconds
+        self.join_timeout = join_timeout
+        self.max_pending = max_pending
+        n_slots = max(1, window_minutes * 60 // slot_seconds)
+        self.window_hourly = SlidingCounts(HOURLY_SPEC.n_bins, n_slots)
+        self.window_pickup = SlidingCounts(PICKUP_SPEC.n_bins, n_slots)
+        self.hourly_searches = np.zeros(HOURLY_SPEC.n_bins, dtype=np.int64)
+        self.hourly_quotes = np.zeros(HOURLY_SPEC.n_bins, dtype=np.int64)
+        self.pickup_quotes = np.zeros(PICKUP_SPEC.n_bins, dtype=np.int64)
+        # search_try_id -> (created_at seconds, hour bin, slot id), in arrival order
+        self.pending = OrderedDict()
+        # search_try_id -> (created_at seconds, distance_to_pickup) of quotes that arrived first
+        self.early_quotes = OrderedDict()
+        # search_try_id -> (created_at seconds,) of tries already joined, to drop re-sent events
+        self.joined = OrderedDict()
+        self.watermark = None
+        self.events = 0
+        self.matched = 0
+        self.expired = 0
+        self.orphan_quotes = 0
+        self.duplicates = 0
+
+    def _advance(self, ts):
+        if self.watermark is None or ts > self.watermark:
+            self.watermark = ts
+            slot_id = int(ts // self.slot_seconds)
+            self.window_hourly.advance(slot_id)
+            self.window_pickup.advance(slot_id)
+        self.evict()
+
+    def evict(self):
+        """Drop pending tries and early quotes older than the join timeout (or beyond max_pending)"""
+        cutoff = self.watermark - self.join_timeout
+        self.expired += _evict_before(self.pending, cutoff, self.max_pending)
+        self.orphan_quotes += _evict_before(self.early_quotes, cutoff, self.max_pending)
+        _evict_before(self.joined, cutoff, self.max_pending)
+
+    def on_search_try(self, search_try_id, ts):
+        self.events += 1
+        self._advance(ts)
+        if search_try_id in self.pending or search_try_id in self.joined:
+            self.duplicates += 1
+            return
+        hour = int(ts // 3600 % 24)
+        slot_id = int(ts // self.slot_seconds)
+        self.hourly_searches[hour] += 1
+        self.window_hourly.add(slot_id, hour, searches=1)
+        early = self.early_quotes.pop(search_try_id, None)
+        if early is None:
+            self.pending[search_try_id] = (ts, hour, slot_id)
+        else:
+            self._match(search_try_id, ts, hour, slot_id, early[1])
+
+    def on_driver_quote(self, search_try_id, ts, distance_to_pickup=None):
+        self.events += 1
+        self._advance(ts)
+        if search_try_id in self.joined:
+            self.duplicates += 1
+            return
+        match = self.pending.pop(search_try_id, None)
+        if match is None:
+            self.early_quotes[search_try_id] = (ts, distance_to_pickup)
+            return
+        self._match(search_try_id, *match, distance_to_pickup)
+
+    def _match(self, search_try_id, created, hour, slot_id, distance_to_pickup):
+        self.matched += 1
+        self.joined[search_try_id] = (created,)
+        self.hourly_quotes[hour] += 1
+        self.window_hourly.add(slot_id, hour, quotes=1)
+        code = pickup_code(distance_to_pickup)
+        if code >= 0:
+            self.pickup_quotes[code] += 1
+            self.window_pickup.add(slot_id, code, searches=1, quotes=1)
+
+    def process(self, event):
+        """Handle one decoded JSON event.
+
+        Every field is parsed before any state changes, so a malformed event
+        (KeyError, TypeError or ValueError) leaves the counts untouched.
+        """
+        event_type = event['type']
+        if event_type not in (SEARCH_TRY, DRIVER_QUOTE):
+            raise ValueError(f"Unknown event type {event_type!r}")
+        search_try_id = event['search_try_id']
+        if not isinstance(search_try_id, str):
+            raise TypeError(f"search_try_id must be a string, got {search_try_id!r}")
+        ts = _epoch_seconds(event['created_at'])
+        if event_type == SEARCH_TRY:
+            self.on_search_try(search_try_id, ts)
+        else:
+            distance = event.get('distance_to_pickup')
+            self.on_driver_quote(search_try_id, ts, None if distance is None else float(distance))
+
+    def snapshot(self):
+        """Current metrics in the record shapes of the dashboard JSON"""
+        window_searches, window_quotes = self.window_hourly.totals()
+        _, window_pickup = self.window_pickup.totals()
+        return {
+            'watermark': None if self.watermark is None else str(np.datetime64(int(self.watermark), 's')),
+            'pending': len(self.pending),
+            'earlyQuotes': len(self.early_quotes),
+            'matched': self.matched,
+            'expired': self.expired,
+            'orphanQuotes': self.orphan_quotes,
+            'duplicates': self.duplicates,
+            'window': {
+                'hourlyData': _records(HOURLY_SPEC, window_searches, window_quotes),
+                'pickupDistanceData': _records(PICKUP_SPEC, window_pickup, window_pickup),
+            },
+            'total': {
+                'hourlyData': _records(HOURLY_SPEC, self.hourly_searches, self.hourly_quotes),
+                'pickupDistanceData': _records(PICKUP_SPEC, self.pickup_quotes, self.pickup_quotes),
+            },
+        }
+
+
+def _evict_before(entries, cutoff, max_entries):
+    """Pop entries (oldest first) created before cutoff or beyond max_entries; returns how many"""
+    evicted = 0
+    while entries:
+        created = next(iter(entries.values()))[0]
+        if created >= cutoff and len(entries) <= max_entries:
+            break
+        entries.popitem(last=False)
+        evicted += 1
+    return evicted
+
+
+def _records(spec, searches, quotes):
+    records = []
+    for code, total in enumerate(searches):
+        if total == 0:
+            continue
+        records.append({
+            spec.label_key: spec.labels[code],
+            'totalSearches': int(total),
+            'quotesReceived': int(quotes[code]),
+            'conversionRate': float(quotes[code] / total * 100),
+        })
+    return records
+
+
+def print_snapshot(snapshot):
+    print(f"\n[{snapshot['watermark']}] pending={snapshot['pending']} matched={snapshot['matched']} "
+          f"expired={snapshot['expired']} orphan quotes={snapshot['orphanQuotes']} "
+          f"duplicates={snapshot['duplicates']}")
+    print(f"{'Hour':>4} {'Searches':>9} {'Quotes':>7} {'DAR %':>7}   (sliding window)")
+    for record in snapshot['window']['hourlyData']:
+        print(f"{record['hour']:>4} {record['totalSearches']:>9} {record['quotesReceived']:>7} "
+              f"{record['conversionRate']:>7.2f}")
+
+
+def replay_events(csv_path):
+    """Yield (ts, type, search_try_id, distance_to_pickup) for an export, in event-time order"""
+    df = pd.read_csv(csv_path, usecols=['id', 'created_at', 'dq.id', 'dq.created_at', 'distance_to_pickup'],
+                     dtype=str, keep_default_na=False)
+    created = pd.to_datetime(df['created_at'], format=DATE_FORMAT, errors='coerce')
+    quoted = (df['dq.id'] != '').to_numpy()
+    quote_time = pd.to_datetime(df['dq.created_at'].where(df['dq.created_at'] != EPOCH_SENTINEL),
+                                format=DATE_FORMAT, errors='coerce').fillna(created)
+    pickup = pd.to_numeric(df['distance_to_pickup'], errors='coerce').to_numpy()
+
+    valid = created.notna().to_numpy()
+    try_ts = created.to_numpy(dtype='datetime64[s]').astype('int64')
+    quote_ts = quote_time.to_numpy(dtype='datetime64[s]').astype('int64')
+    ids = df['id'].to_numpy()
+
+    try_rows = np.flatnonzero(valid)
+    quote_rows = np.flatnonzero(valid & quoted)
+    times = np.concatenate([try_ts[try_rows], quote_ts[quote_rows]])
+    # Tries sort ahead of quotes stamped in the same second
+    kinds = np.concatenate([np.zeros(len(try_rows), dtype=np.int8), np.ones(len(quote_rows), dtype=np.int8)])
+    rows = np.concatenate([try_rows, quote_rows])
+    order = np.lexsort((kinds, times))
+    for i in order:
+        row = rows[i]
+        if kinds[i] == 0:
+            yield float(times[i]), SEARCH_TRY, ids[row], None
+        else:
+            yield float(times[i]), DRIVER_QUOTE, ids[row], pickup[row]
+
+
+def replay(calculator, csv_path):
+    """Feed an export through the calculator as an event stream; returns the event count"""
+    on_try, on_quote = calculator.on_search_try, calculator.on_driver_quote
+    count = 0
+    for ts, kind, search_try_id, distance in replay_events(csv_path):
+        if kind == SEARCH_TRY:
+            on_try(search_try_id, ts)
+        else:
+            on_quote(search_try_id, ts, distance)
+        count += 1
+    return count
+
+
+def write_events(csv_path, output_path):
+    """Write an export as a JSON-lines event file, for testing --tail and --socket"""
+    with open(output_path, 'w') as f:
+        for ts, kind, search_try_id, distance in replay_events(csv_path):
+            event = {'type': kind, 'search_try_id': search_try_id,
+                     'created_at': str(np.datetime64(int(ts), 's')).replace('T', ' ')}
+            if kind == DRIVER_QUOTE and distance == distance:
+                event['distance_to_pickup'] = float(distance)
+            f.write(json.dumps(event) + '\n')
+
+
+def tail_events(path, from_start=False, poll_interval=0.5):
+    """Yield the complete lines appended to a JSON-lines file, and None whenever it is idle"""
+    with open(path) as f:
+        if not from_start:
+            f.seek(0, os.SEEK_END)
+        partial = ''
+        while True:
+            line = f.readline()
+            if not line:
+                yield None
+                time.sleep(poll_interval)
+                continue
+            partial += line
+            if not partial.endswith('\n'):
+                continue
+            if partial.strip():
+                yield partial
+            partial = ''
+
+
+def socket_events(host, port, poll_interval=0.5):
+    """Accept connections one at a time and yield the JSON lines they send, None while idle"""
+    with socket.create_server((host, port)) as server:
+        print(f"Listening for events on {host}:{port}...")
+        server.settimeout(poll_interval)
+        while True:
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                yield None
+                continue
+            conn.settimeout(None)
+            with conn, conn.makefile('r') as lines:
+                for line in lines:
+                    if line.strip():
+                        yield line
+
+
+def run_live(lines, calculator, report_every=5.0):
+    """Process JSON-lines events forever, printing the window metrics every report_every seconds.
+
+    A line that is not valid JSON or not a known event is reported and skipped.
+    """
+    last_report = time.monotonic()
+    skipped = 0
+    try:
+        for line in lines:
+            if line is not None:
+                try:
+                    calculator.process(json.loads(line))
+                except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+                    skipped += 1
+                    print(f"Skipping malformed event ({type(e).__name__}: {e}): {line.strip()[:200]!r}")
+            if calculator.events and time.monotonic() - last_report >= report_every:
+                print_snapshot(calculator.snapshot())
+                last_report = time.monotonic()
+    except KeyboardInterrupt:
+        pass
+    print_snapshot(calculator.snapshot())
+    if skipped:
+        print(f"Skipped {skipped} malformed events")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Live driver accept rate over a search try / quote event feed")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--tail', help="JSON-lines event file to follow")
+    source.add_argument('--socket', help="host:port to listen on for JSON-lines events")
+    source.add_argument('--replay', help="Export CSV to replay as an event stream")
+    parser.add_argument('--from-start', action='store_true', help="With --tail, read the existing events first")
+    parser.add_argument('--write-events', help="With --replay, write the events as JSON lines instead")
+    parser.add_argument('--window-minutes', type=int, default=DEFAULT_WINDOW_MINUTES)
+    parser.add_argument('--slot-seconds', type=int, default=DEFAULT_SLOT_SECONDS)
+    parser.add_argument('--join-timeout', type=int, default=DEFAULT_JOIN_TIMEOUT,
+                        help="Seconds an unmatched try waits for its quote")
+    parser.add_argument('--report-every', type=float, default=5.0, help="Seconds between reports")
+    args = parser.parse_args()
+
+    calculator = LiveDarCalculator(args.window_minutes, args.slot_seconds, args.join_timeout)
+    if args.replay and args.write_events:
+        write_events(args.replay, args.write_events)
+        print(f"Events written to {args.write_events}")
+    elif args.replay:
+        start = time.perf_counter()
+        count = replay(calculator, args.replay)
+        elapsed = time.perf_counter() - start
+        print_snapshot(calculator.snapshot())
+        print(f"\nReplayed {count} events in {elapsed:.2f}s ({count / elapsed:,.0f} events/s)")
+    elif args.tail:
+        run_live(tail_events(args.tail, args.from_start), calculator, args.report_every)
+    else:
+        host, port = args.socket.rsplit(':', 1)
+        run_live(socket_events(host, int(port)), calculator, args.report_every)
@@ -0,0 +1,136 @@
+"""Prepare stage: write the cleaned, IST-converted and typed export once as Parquet.
+
+Analyzers then read only the columns they need from the Parquet file instead of
+re-parsing the quoted CSV and re-coercing numerics and dates every run. The same
+frame is also written as a memory-mapped column store (see column_store.py),
+which analyzers prefer: it opens without decoding anything and concurrent
+processes share its pages.
+
+    python prepared_dataset.py [--input Chennai_22March.csv] [--output Chennai_22March_IST.parquet]
+
+Requires pyarrow (pip install pyarrow).
+"""
+import argparse
+import os
+
+import pandas as pd
+
+from dataset_stats import STATS_FILE, write_stats
+from instrumentation import traced
+from ist_conversion import DATE_COLUMNS, DATE_FORMAT, EPOCH_SENTINEL, IST_OFFSET
+
+ORIGINAL_FILE = 'Chennai_22March.csv'
+IST_FILE = 'Chennai_22March_IST.csv'
+PREPARED_FILE = 'Chennai_22March_IST.parquet'
+MAPPED_DIR = 'Chennai_22March_IST.columns'
+
+# ClickHouse exports write NULL as an unquoted \N
+NULL_TOKEN = '\\N'
+
+CATEGORY_COLUMNS = ['status', 'search_repeat_type', 'vehicle_variant', 'dq.status', 'dq.vehicle_variant']
+FLOAT_COLUMNS = ['distance', 'base_fare', 'driver_rating', 'distance_to_pickup',
+                 'duration_to_pickup', 'estimated_fare', 'customer_extra_fee']
+INT_COLUMNS = {'search_repeat_counter': 'int16'}
+
+
+def parse_timestamps(series, shift_to_ist):
+    """Parse a timestamp column to datetime64, mapping the epoch sentinel and \\N to NaT"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    parsed = pd.to_datetime(series.where(series != EPOCH_SENTINEL), format=DATE_FORMAT, errors='coerce')
+    if shift_to_ist:
+        parsed = parsed + pd.Timedelta(IST_OFFSET)
+    return parsed
+
+
+def apply_schema(df, shift_to_ist=False):
+    """Return df with explicit dtypes: categoricals, floats, small ints and native datetimes"""
+    typed = {}
+    for col in df.columns:
+        series = df[col]
+        if col in DATE_COLUMNS:
+            typed[col] = parse_timestamps(series, shift_to_ist)
+        elif col in FLOAT_COLUMNS:
+            typed[col] = pd.to_numeric(series, errors='coerce').astype('float64')
+        elif col in INT_COLUMNS:
+            typed[col] = pd.to_numeric(series, errors='coerce').astype(INT_COLUMNS[col])
+        elif col in CATEGORY_COLUMNS:
+            typed[col] = series.where(series != NULL_TOKEN).astype('category')
+        elif series.dtype == object or pd.api.types.is_string_dtype(series):
+            typed[col] = series.where(series != NULL_TOKEN)
+        else:
+            typed[col] = series
+    return pd.DataFrame(typed, index=df.index)
+
+
+def prepare_dataset(input_path=ORIGINAL_FILE, output_path=PREPARED_FILE, input_is_ist=False, mapped_dir=MAPPED_DIR,
+                    stats_path=STATS_FILE):
+    """Clean, convert and type the export, and write it as a Parquet file, a mapped column store and a stats header"""
+    # Imported here: clickhouse_csv and column_store build on this module's schema constants
+    from clickhouse_csv import read_export
+    from column_store import write_column_store
+
+    # Nulls, sentinels and types are handled while parsing (same result as apply_schema(pd.read_csv(...)))
+    print(f"Reading {input_path} and converting timestamps to IST...")
+    df = read_export(input_path, shift_to_ist=not input_is_ist)
+
+    print(f"Writing prepared dataset to {output_path}...")
+    df.to_parquet(output_path, index=False)
+    if mapped_dir:
+        print(f"Writing mapped column store to {mapped_dir}...")
+        write_column_store(df, mapped_dir)
+    if stats_path:
+        print(f"Writing stats header to {stats_path}...")
+        write_stats(df, stats_path)
+    return output_path
+
+
+def is_prepared(path):
+    """Whether path is a prepared dataset (Parquet file or mapped column store) rather than a CSV"""
+    return path.endswith('.parquet') or os.path.isdir(path)
+
+
+def _fresh(prepared_path, csv_path):
+    # A mapped store's schema.json is written last, so its mtime dates the whole store
+    stamp = os.path.join(prepared_path, 'schema.json') if os.path.isdir(prepared_path) else prepared_path
+    if not os.path.exists(stamp):
+        return False
+    return not (os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(stamp))
+
+
+def prepared_path_for(csv_path):
+    """Path of the prepared dataset standing in for csv_path, if it is usable.
+
+    The mapped column store is preferred over the Parquet file. Either is used
+    only when it is at least as new as the CSV, so an updated export is never
+    shadowed by a stale cache.
+    """
+    for path in (MAPPED_DIR, PREPARED_FILE):
+        if _fresh(path, csv_path):
+            return path
+    return None
+
+
+@traced()
+def load_prepared(columns=None, path=PREPARED_FILE, filters=None):
+    """Read the prepared dataset, optionally only the given columns and rows matching pyarrow filters"""
+    if os.path.isdir(path):
+        from column_store import load_column_store
+
+        return load_column_store(path, columns, filters)
+    return pd.read_parquet(path, columns=columns, filters=filters)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write the cleaned, typed dataset as Parquet")
+    parser.add_argument('--input', default=ORIGINAL_FILE)
+    parser.add_argument('--output', default=PREPARED_FILE)
+    parser.add_argument('--mapped-dir', default=MAPPED_DIR,
+                        help="Also write the memory-mapped column store here ('' to skip)")
+    parser.add_argument('--stats', default=STATS_FILE,
+                        help="Also write the time range and quote summary header here ('' to skip)")
+    parser.add_argument('--input-is-ist', action='store_true',
+                        help="The input timestamps are already IST (e.g. Chennai_22March_IST.csv)")
+    args = parser.parse_args()
+    prepare_dataset(args.input, args.output, args.input_is_ist, args.mapped_dir, args.stats)
+    print("Preparation completed!")
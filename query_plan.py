@@ -0,0 +1,135 @@
+"""Lazy load plans: which columns an analysis reads and which rows it keeps.
+
+Analyses declare a QueryPlan instead of loading the whole export. Plans of
+analyses that run in the same session are merged (union of columns, filters
+they share) and executed once. Execution pushes both down into the reader:
+
+- Parquet: pyarrow reads only the planned columns and skips row groups whose
+  statistics rule out the filters.
+- Mapped column store: only the planned columns are mapped and the filters
+  select rows from the mapped buffers.
+- CSV: only the planned columns are parsed, and each chunk is filtered as soon
+  as it is typed, so dropped rows never accumulate in memory.
+
+Filters an analysis has but the merged plan does not are applied afterwards by
+QueryPlan.apply.
+"""
+import operator
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from compact_loader import compact_frame, load_compact
+from instrumentation import traced
+from prepared_dataset import is_prepared, load_prepared
+from streaming_ingest import DEFAULT_CHUNKSIZE, read_chunks
+
+_OPERATORS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+
+@dataclass(frozen=True)
+class Filter:
+    """A row predicate: column op value, with op one of ==, !=, <, <=, >, >= or 'in'"""
+    column: str
+    op: str
+    value: object
+
+    def mask(self, df):
+        series = df[self.column]
+        if self.op == 'in':
+            return series.isin(self.value).to_numpy(dtype=bool)
+        result = _OPERATORS[self.op](series, self.value)
+        # Missing values never match
+        return np.asarray(result.fillna(False) if hasattr(result, 'fillna') else result, dtype=bool)
+
+    def to_arrow(self):
+        value = list(self.value) if self.op == 'in' else self.value
+        return (self.column, self.op, value)
+
+
+@dataclass(frozen=True)
+class QueryPlan:
+    """Columns to read and filters every returned row satisfies; columns=None reads everything"""
+    columns: frozenset = None
+    filters: tuple = ()
+
+    @classmethod
+    def of(cls, columns=None, filters=()):
+        return cls(None if columns is None else frozenset(columns), tuple(filters))
+
+    def with_filters(self, filters):
+        """This plan with extra filters (e.g. session-wide date range) added"""
+        return QueryPlan(self.columns, tuple(dict.fromkeys(self.filters + tuple(filters))))
+
+    def merge(self, other):
+        """One plan serving both: every column either needs, only the filters both share"""
+        if self.columns is None or other.columns is None:
+            columns = None
+        else:
+            columns = self.columns | other.columns
+        return QueryPlan(columns, tuple(f for f in self.filters if f in other.filters))
+
+    def covers(self, other):
+        """Whether the frame loaded for this plan can answer other (possibly after apply)"""
+        if self.columns is not None and (other.columns is None or not other.columns <= self.columns):
+            return False
+        return all(f in other.filters for f in self.filters) and self._filter_columns_loaded(other)
+
+    def _filter_columns_loaded(self, other):
+        if self.columns is None:
+            return True
+        return all(f.column in self.columns for f in other.filters if f not in self.filters)
+
+    def read_columns(self):
+        """CSV/Parquet columns to read: the planned columns plus the ones filters look at"""
+        if self.columns is None:
+            return None
+        return sorted(self.columns | {f.column for f in self.filters})
+
+    def apply(self, df, loaded_plan=None):
+        """Rows of a frame loaded for loaded_plan that satisfy this plan's remaining filters"""
+        already = loaded_plan.filters if loaded_plan is not None else ()
+        remaining = [f for f in self.filters if f not in already]
+        if not remaining:
+            return df
+        mask = np.ones(len(df), dtype=bool)
+        for f in remaining:
+            mask &= f.mask(df)
+        df = df[mask]
+        # Categories of filtered-out rows would otherwise show up as zero counts
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].cat.remove_unused_categories()
+        return df
+
+    def describe(self):
+        columns = 'all columns' if self.columns is None else f"{len(self.read_columns())} columns"
+        filters = ', '.join(f"{f.column} {f.op} {f.value}" for f in self.filters) or 'no filters'
+        return f"{columns}, {filters}"
+
+
+def scan(plan, file_path, chunksize=DEFAULT_CHUNKSIZE):
+    """Yield compact, filtered chunks of a CSV according to plan"""
+    for chunk in read_chunks(file_path, chunksize, usecols=plan.read_columns()):
+        chunk = compact_frame(chunk)
+        if plan.filters:
+            chunk = plan.apply(chunk).reset_index(drop=True)
+        yield chunk
+
+
+@traced()
+def execute(plan, file_path, chunksize=DEFAULT_CHUNKSIZE):
+    """Load file_path (CSV, prepared Parquet or mapped column store) according to plan"""
+    if is_prepared(file_path):
+        filters = [f.to_arrow() for f in plan.filters] or None
+        return load_prepared(plan.read_columns(), file_path, filters=filters)
+    return load_compact(file_path, plan.read_columns(), chunksize=chunksize,
+                        row_filter=plan.apply if plan.filters else None)
@@ -0,0 +1,118 @@
+import pandas as pd
+
+from dimension_aggregator import hour_codes, numeric_values, quote_present
+from instrumentation import traced
+
+RIDE_STATUSES = ['COMPLETED', 'CANCELLED', 'ACTIVE']
+
+# Columns quote_summary_partial reads, for column-pruned loading
+SUMMARY_COLUMNS = ['created_at', 'status', 'dq.id', 'search_repeat_counter', 'search_repeat_type',
+                   'driver_rating', 'base_fare', 'distance']
+
+
+def _sum_and_count(values):
+    present = values[~pd.isna(values)]
+    return float(present.sum()), int(len(present))
+
+
+@traced()
+def quote_summary_partial(df):
+    """Compute the mergeable state behind the search try / driver quote report.
+
+    Only counts and sums are kept, so summaries of separate chunks can be added
+    with merge_quote_summaries and printed as if the whole file had been loaded.
+    """
+    has_quote = pd.Series(quote_present(df), index=df.index)
+    hours = pd.Series(hour_codes(df['created_at']))
+    hours = hours[hours >= 0]
+
+    summary = {
+        'records': len(df),
+        'search_repeat_counts': df['search_repeat_counter'].value_counts(),
+        'search_repeat_types': df['search_repeat_type'].value_counts(),
+        'quotes_present': int(has_quote.sum()),
+        'status_counts': {status: int((df['status'] == status).sum()) for status in RIDE_STATUSES},
+        'quote_by_search_type': has_quote.groupby(df['search_repeat_type'], observed=True).agg(['count', 'sum']),
+        'hourly_searches': hours.groupby(hours.rename('hour')).size(),
+    }
+    for key, col in [('rating', 'driver_rating'), ('fare', 'base_fare'), ('distance', 'distance')]:
+        summary[f'{key}_sum'], summary[f'{key}_count'] = _sum_and_count(numeric_values(df, col))
+    return summary
+
+
+def _add_series(left, right):
+    merged = left.add(right, fill_value=0).astype('int64')
+    merged.name = left.name
+    merged.index.name = left.index.name
+    return merged
+
+
+def merge_quote_summaries(left, right):
+    """Add two quote summaries together; either side may be None"""
+    if left is None:
+        return right
+    if right is None:
+        return left
+
+    merged = {}
+    for key, value in left.items():
+        if isinstance(value, pd.Series):
+            merged[key] = _add_series(value, right[key])
+        elif isinstance(value, pd.DataFrame):
+            merged[key] = value.add(right[key], fill_value=0).astype('int64')
+        elif isinstance(value, dict):
+            merged[key] = {k: value[k] + right[key][k] for k in value}
+        else:
+            merged[key] = value + right[key]
+    return merged
+
+
+def print_quote_summary(summary):
+    """Print the search try and driver quote report from a (merged) summary"""
+    total_records = summary['records']
+    print(f"\nTotal records in dataset: {total_records}")
+
+    search_repeat_counts = summary['search_repeat_counts'].sort_index()
+    search_repeat_types = summary['search_repeat_types'].sort_values(ascending=False, kind='stable')
+
+    driver_quotes_present = summary['quotes_present']
+    driver_quotes_absent = total_records - driver_quotes_present
+
+    completed = summary['status_counts']['COMPLETED']
+    cancelled = summary['status_counts']['CANCELLED']
+    active = summary['status_counts']['ACTIVE']
+
+    drivers_with_ratings = summary['rating_count']
+    avg_driver_rating = summary['rating_sum'] / drivers_with_ratings if drivers_with_ratings else float('nan')
+    avg_base_fare = summary['fare_sum'] / summary['fare_count'] if summary['fare_count'] else float('nan')
+    avg_distance = summary['distance_sum'] / summary['distance_count'] / 1000 if summary['distance_count'] else float('nan')
+
+    print("\n=== SEARCH TRY ANALYSIS ===")
+    print(f"Search repeat counter distribution:\n{search_repeat_counts}")
+    print(f"\nSearch repeat type distribution:\n{search_repeat_types}")
+
+    print("\n=== DRIVER QUOTE ANALYSIS ===")
+    print(f"Records with driver quotes: {driver_quotes_present} ({driver_quotes_present/total_records*100:.2f}%)")
+    print(f"Records without driver quotes: {driver_quotes_absent} ({driver_quotes_absent/total_records*100:.2f}%)")
+
+    print("\n=== RIDE STATUS ANALYSIS ===")
+    print(f"Completed rides: {completed} ({completed/total_records*100:.2f}%)")
+    print(f"Cancelled rides: {cancelled} ({cancelled/total_records*100:.2f}%)")
+    print(f"Active rides: {active} ({active/total_records*100:.2f}%)")
+
+    print("\n=== DRIVER ANALYSIS ===")
+    print(f"Drivers with ratings: {drivers_with_ratings} ({drivers_with_ratings/total_records*100:.2f}%)")
+    print(f"Average driver rating: {avg_driver_rating:.2f}")
+
+    print("\n=== FARE AND DISTANCE ANALYSIS ===")
+    print(f"Average base fare: ₹{avg_base_fare:.2f}")
+    print(f"Average distance: {avg_distance:.2f} km")
+
+    # Percentage of records with driver quotes per search_repeat_type
+    print("\n=== RELATIONSHIP BETWEEN SEARCH TRIES AND DRIVER QUOTES ===")
+    quote_by_search_type = summary['quote_by_search_type'].copy()
+    quote_by_search_type['percentage'] = (quote_by_search_type['sum'] / quote_by_search_type['count']) * 100
+    print(quote_by_search_type)
+
+    print("\n=== TIME DISTRIBUTION OF SEARCH TRIES ===")
+    print(summary['hourly_searches'].sort_index())
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+
+DEFAULT_CACHE_DIR = '.analysis_cache'
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Sidecar remembering the digest of each source file, keyed by its size and mtime
+DIGEST_INDEX = 'digests.json'
+
+_MISSING = object()
+
+
+def file_digest(path, block_size=1 << 20):
+    """SHA-256 of a file's contents, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """On-disk memoization of analysis results keyed on the source file's content.
+
+    A result is stored under the SHA-256 of the source file plus the analysis name
+    and its parameters, so reruns on an unchanged export (in this or another
+    process) are served from disk while any edit to the file forces a recompute.
+    Entries are evicted least-recently-used first once the cache exceeds max_bytes.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def source_digest(self, path):
+        """Content hash of path, only re-read when its size or mtime changes"""
+        stat = os.stat(path)
+        index_path = os.path.join(self.cache_dir, DIGEST_INDEX)
+        try:
+            with open(index_path) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+
+        abs_path = os.path.abspath(path)
+        entry = index.get(abs_path)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['sha256']
+
+        digest = file_digest(path)
+        index[abs_path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest}
+        self._atomic_write(index_path, json.dumps(index).encode())
+        return digest
+
+    def key(self, source_path, name, params=None):
+        payload = json.dumps([self.source_digest(source_path), name, params or {}], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.pkl')
+
+    def get(self, key, default=None):
+        path = self._entry_path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return default
+        # Touch the entry so eviction sees it as recently used
+        os.utime(path)
+        return value
+
+    def put(self, key, value):
+        self._atomic_write(self._entry_path(key), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        self.evict()
+
+    def evict(self):
+        """Drop least-recently-used entries until the cache fits in max_bytes"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.pkl'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def memoize(self, source_path, name, params, compute):
+        """Return the cached result of compute() for this source, name and params.
+
+        A None result means the analysis could not run and is not stored.
+        """
+        key = self.key(source_path, name, params)
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            if value is not None:
+                self.put(key, value)
+        return value
+
+    def _atomic_write(self, path, data):
+        # Unique per writer: background analysis threads may store the same entry at once
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
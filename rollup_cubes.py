@@ -0,0 +1,164 @@
+"""Pre-aggregated time rollups of search tries at 5, 15 and 60 minute granularity.
+
+The finest cube is built from the raw rows in one bincount pass: one row of
+mergeable state (searches, quotes, status counts, distance/fare/pickup sums and
+counts, see dimension_aggregator.STATE_FIELDS) per non-empty time bucket. Every
+coarser cube is derived by summing buckets of the next finer cube, so the raw
+rows are scanned once regardless of how many granularities are materialized.
+
+    python rollup_cubes.py [Chennai_22March_IST.csv ...] [--granularities 5 15 60]
+
+writes chennai-rickshaw-analytics/public/rollups/<minutes>min.json for the dashboard.
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from compact_loader import load_compact
+from dimension_aggregator import (HOURLY_SPEC, STATE_FIELDS, DimensionSpec, empty_state, finalize_dimension,
+                                  reduce_by_codes, required_columns, row_fields)
+from prepared_dataset import IST_FILE, is_prepared, load_prepared, prepared_path_for
+
+GRANULARITIES = (5, 15, 60)
+DEFAULT_OUTPUT_DIR = 'chennai-rickshaw-analytics/public/rollups'
+
+ABSOLUTE_LABEL_FORMAT = '%Y-%m-%d %H:%M'
+TIME_OF_DAY_LABEL_FORMAT = '%H:%M'
+
+
+def rollup_path(minutes, output_dir=DEFAULT_OUTPUT_DIR):
+    return os.path.join(output_dir, f'{minutes}min.json')
+
+
+def bucket_codes(created_at, minutes):
+    """Bucket number (minutes-wide buckets since the epoch) of every row, -1 where created_at is missing"""
+    values = pd.to_datetime(created_at, errors='coerce').to_numpy(dtype='datetime64[ns]')
+    codes = values.astype('int64') // (minutes * 60 * 10**9)
+    codes[np.isnat(values)] = -1
+    return codes
+
+
+def _empty_cube():
+    return empty_state(0).set_index(pd.DatetimeIndex([], name='bucket'))
+
+
+def build_base_cube(df, minutes=GRANULARITIES[0], fields=None):
+    """Per-bucket state of one frame; only buckets with at least one search are kept"""
+    codes = bucket_codes(df['created_at'], minutes)
+    return cube_from_codes(codes, row_fields(df) if fields is None else fields, minutes)
+
+
+def cube_from_codes(codes, fields, minutes):
+    """Reduce per-row bucket codes into a cube indexed by bucket start"""
+    valid = codes >= 0
+    if not valid.any():
+        return _empty_cube()
+    buckets, dense = np.unique(codes[valid], return_inverse=True)
+    dense_codes = np.full(len(codes), -1, dtype='int64')
+    dense_codes[valid] = dense
+    state = reduce_by_codes(dense_codes, fields, len(buckets))
+    state.index = pd.DatetimeIndex((buckets * minutes * 60 * 10**9).astype('datetime64[ns]'), name='bucket')
+    return state
+
+
+def roll_up(cube, from_minutes, to_minutes):
+    """Derive a coarser cube by summing the buckets of a finer one"""
+    if to_minutes % from_minutes:
+        raise ValueError(f"{to_minutes} min buckets cannot be built from {from_minutes} min buckets")
+    if to_minutes == from_minutes:
+        return cube
+    return cube.groupby(cube.index.floor(f'{to_minutes}min')).sum().rename_axis('bucket')
+
+
+def build_cubes(df, granularities=GRANULARITIES):
+    """Cubes for every granularity, each coarser one rolled up from the next finer one"""
+    granularities = sorted(granularities)
+    cubes = {granularities[0]: build_base_cube(df, granularities[0])}
+    for finer, coarser in zip(granularities, granularities[1:]):
+        cubes[coarser] = roll_up(cubes[finer], finer, coarser)
+    return cubes
+
+
+def merge_cubes(left, right):
+    """Add two cubes of the same granularity; either side may be None"""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    merged = left.add(right, fill_value=0).sort_index()
+    return merged.astype({field: left[field].dtype for field in STATE_FIELDS})
+
+
+def slice_cube(cube, start=None, end=None):
+    """Buckets starting in [start, end)"""
+    mask = np.ones(len(cube), dtype=bool)
+    if start is not None:
+        mask &= cube.index >= pd.Timestamp(start)
+    if end is not None:
+        mask &= cube.index < pd.Timestamp(end)
+    return cube[mask]
+
+
+def time_of_day_profile(cube):
+    """Fold the days of a cube onto one day, for peak-period comparisons across dates"""
+    folded = cube.groupby(cube.index.strftime(TIME_OF_DAY_LABEL_FORMAT)).sum()
+    return folded.sort_index()
+
+
+def finalize_cube(cube, time_of_day=False):
+    """Records in the shape of hourlyData, keyed by 'bucket' instead of 'hour'"""
+    if time_of_day:
+        cube = time_of_day_profile(cube)
+        labels = tuple(cube.index)
+    else:
+        labels = tuple(cube.index.strftime(ABSOLUTE_LABEL_FORMAT))
+    spec = DimensionSpec(name='rollupData', label_key='bucket', column='created_at', labels=labels,
+                         averages=HOURLY_SPEC.averages, include_status=True)
+    return finalize_dimension(spec, cube.reset_index(drop=True))
+
+
+def load_inputs(file_paths):
+    frames = []
+    for path in file_paths:
+        print(f"Loading {path}...")
+        if is_prepared(path):
+            frames.append(load_prepared(required_columns(), path))
+        else:
+            frames.append(load_compact(path, required_columns()))
+    return frames
+
+
+def write_rollups(file_paths, granularities=GRANULARITIES, output_dir=DEFAULT_OUTPUT_DIR):
+    """Build cubes per input, merge them, and write one dashboard JSON per granularity"""
+    cubes = {}
+    for df in load_inputs(file_paths):
+        for minutes, cube in build_cubes(df, granularities).items():
+            cubes[minutes] = merge_cubes(cubes.get(minutes), cube)
+
+    os.makedirs(output_dir, exist_ok=True)
+    for minutes in sorted(cubes):
+        path = rollup_path(minutes, output_dir)
+        print(f"Writing {len(cubes[minutes])} {minutes} min buckets to {path}...")
+        with open(path, 'w') as f:
+            json.dump({
+                'granularityMinutes': minutes,
+                'rollupData': finalize_cube(cubes[minutes]),
+                'timeOfDayData': finalize_cube(cubes[minutes], time_of_day=True),
+            }, f, indent=2)
+    return cubes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Materialize time rollups at several granularities")
+    parser.add_argument('files', nargs='*', help="IST exports (CSV, prepared parquet or mapped column store)")
+    parser.add_argument('--granularities', nargs='+', type=int, default=list(GRANULARITIES),
+                        help="Bucket widths in minutes; each must divide the next")
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR)
+    args = parser.parse_args()
+
+    files = args.files or [prepared_path_for(IST_FILE) or IST_FILE]
+    write_rollups(files, args.granularities, args.output_dir)
+    print("Rollups completed successfully.")
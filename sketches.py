@@ -0,0 +1,273 @@
+"""Mergeable quantile and distinct-count sketches per dashboard bin.
+
+Percentiles of distance, base_fare and distance_to_pickup use a log-bucketed
+quantile sketch (the DDSketch construction): each bucket counts the values
+between two consecutive powers of gamma, so every reported quantile is within
+RELATIVE_ACCURACY of a true value. Distinct drivers and search tries use HyperLogLog registers.
+Both are fixed-size arrays per bin that merge by addition (quantiles) or
+element-wise max (HyperLogLog), so chunks and files combine exactly like the
+count/sum state of dimension_aggregator, in bounded memory.
+
+Distinct search tries are counted on `id` (the search try's own id);
+search_try_id is only filled in when a quote was received.
+
+    python sketches.py [Chennai_22March_IST.csv ...] [--chunksize N]
+"""
+import argparse
+import json
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from compact_loader import uuid_to_binary
+from dimension_aggregator import DEFAULT_SPECS, SUMMARY_KEY, VALUE_COLUMNS, bin_codes, numeric_values
+from instrumentation import traced
+from streaming_ingest import DEFAULT_CHUNKSIZE, read_chunks
+
+QUANTILES = (0.5, 0.9, 0.99)
+QUANTILE_COLUMNS = VALUE_COLUMNS
+# Reported in the same units as the averages of data.json
+QUANTILE_DIVISORS = {'distance': 1000}
+
+DISTINCT_COLUMNS = {'distinctDrivers': 'driver_id', 'distinctSearchTries': 'id'}
+
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+# Bucket 0 holds values below 1 (reported as 0); the rest cover [1, MAX_VALUE]
+MAX_VALUE = 1e9
+N_QUANTILE_BUCKETS = int(math.ceil(math.log(MAX_VALUE) / math.log(GAMMA))) + 2
+
+HLL_PRECISION = 12
+HLL_REGISTERS = 1 << HLL_PRECISION
+
+DEFAULT_OUTPUT_PATH = 'chennai-rickshaw-analytics/public/sketches.json'
+DEFAULT_STATE_PATH = 'chennai-rickshaw-analytics/data_sketches.npz'
+
+
+def sketch_columns(specs=DEFAULT_SPECS):
+    """Columns sketch_partials reads"""
+    columns = ['created_at'] + QUANTILE_COLUMNS + list(DISTINCT_COLUMNS.values())
+    return list(dict.fromkeys(columns + [spec.column for spec in specs]))
+
+
+def quantile_buckets(values):
+    """Sketch bucket of every value, -1 for NaN or negative values"""
+    buckets = np.full(len(values), -1, dtype=np.int64)
+    present = ~np.isnan(values) & (values >= 0)
+    small = present & (values < 1)
+    buckets[small] = 0
+    large = present & ~small
+    clipped = np.minimum(values[large], MAX_VALUE)
+    buckets[large] = 1 + np.ceil(np.log(clipped) / np.log(GAMMA)).astype(np.int64)
+    return buckets
+
+
+def bucket_value(bucket):
+    """Representative value of a bucket, within RELATIVE_ACCURACY of all its members"""
+    if bucket == 0:
+        return 0.0
+    return 2 * GAMMA ** (bucket - 1) / (GAMMA + 1)
+
+
+def _splitmix64(x):
+    x = (x + np.uint64(0x9E3779B97F4A7C15))
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def uuid_hashes(series):
+    """64-bit hash of every UUID and a validity mask; strings and packed binary hash alike"""
+    import pyarrow as pa
+
+    if not isinstance(series.dtype, pd.ArrowDtype):
+        series = uuid_to_binary(series.astype(object))
+    array = pa.array(series.array)
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    valid = np.asarray(array.is_valid(), dtype=bool)
+    data = np.frombuffer(array.buffers()[1], dtype=np.uint64, count=2 * (array.offset + len(array)))
+    halves = data[2 * array.offset:].reshape(-1, 2)
+    with np.errstate(over='ignore'):
+        hashes = _splitmix64(_splitmix64(halves[:, 0]) ^ halves[:, 1])
+    return hashes, valid
+
+
+def _leading_zeros(x):
+    """Leading zero bits of each uint64 (64 for zero)"""
+    zeros = np.zeros(len(x), dtype=np.int64)
+    x = x.copy()
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = x >> np.uint64(64 - shift)
+        empty = high == 0
+        zeros[empty] += shift
+        x[empty] <<= np.uint64(shift)
+    zeros[x == 0] = 64
+    return zeros
+
+
+def hll_registers(codes, hashes, valid, n_bins):
+    """HyperLogLog registers (n_bins x HLL_REGISTERS) of the hashes of rows in each bin"""
+    registers = np.zeros((n_bins, HLL_REGISTERS), dtype=np.uint8)
+    keep = valid & (codes >= 0)
+    hashes = hashes[keep]
+    index = (hashes >> np.uint64(64 - HLL_PRECISION)).astype(np.int64)
+    rank = np.minimum(_leading_zeros(hashes << np.uint64(HLL_PRECISION)), 64 - HLL_PRECISION) + 1
+    np.maximum.at(registers, (codes[keep], index), rank.astype(np.uint8))
+    return registers
+
+
+def hll_estimate(registers):
+    """Estimated distinct count from one row of registers"""
+    m = HLL_REGISTERS
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.sum(np.exp2(-registers.astype(np.float64)))
+    empty = np.count_nonzero(registers == 0)
+    if estimate <= 2.5 * m and empty:
+        # Linear counting is more accurate for small cardinalities
+        estimate = m * math.log(m / empty)
+    return int(round(estimate))
+
+
+def _sketch_bins(codes, df, hashes, n_bins):
+    quantiles = {}
+    for col in QUANTILE_COLUMNS:
+        buckets = quantile_buckets(numeric_values(df, col))
+        keep = (codes >= 0) & (buckets >= 0)
+        flat = codes[keep] * N_QUANTILE_BUCKETS + buckets[keep]
+        counts = np.bincount(flat, minlength=n_bins * N_QUANTILE_BUCKETS)
+        quantiles[col] = counts.reshape(n_bins, N_QUANTILE_BUCKETS).astype(np.int64)
+    distinct = {}
+    for key, col in DISTINCT_COLUMNS.items():
+        distinct[key] = hll_registers(codes, *hashes[col], n_bins)
+    return {'quantiles': quantiles, 'distinct': distinct}
+
+
+def sketch_partials(df, specs=DEFAULT_SPECS):
+    """Sketch state of every dimension (and the summary) for one frame"""
+    hashes = {col: uuid_hashes(df[col]) for col in DISTINCT_COLUMNS.values()}
+    partials = {SUMMARY_KEY: _sketch_bins(np.zeros(len(df), dtype=np.int64), df, hashes, 1)}
+    for spec in specs:
+        partials[spec.name] = _sketch_bins(bin_codes(spec, df), df, hashes, spec.n_bins)
+    return partials
+
+
+def merge_sketches(left, right):
+    """Combine two sketch states; either side may be None"""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    merged = {}
+    for name in left:
+        merged[name] = {
+            'quantiles': {col: left[name]['quantiles'][col] + right[name]['quantiles'][col]
+                          for col in left[name]['quantiles']},
+            'distinct': {key: np.maximum(left[name]['distinct'][key], right[name]['distinct'][key])
+                         for key in left[name]['distinct']},
+        }
+    return merged
+
+
+def estimate_quantiles(counts, quantiles=QUANTILES):
+    """Estimated quantiles from one row of bucket counts, None when it is empty"""
+    total = int(counts.sum())
+    if total == 0:
+        return {f'p{round(q * 100)}': None for q in quantiles}
+    cumulative = np.cumsum(counts)
+    estimates = {}
+    for q in quantiles:
+        rank = q * (total - 1)
+        bucket = int(np.searchsorted(cumulative, rank, side='right'))
+        estimates[f'p{round(q * 100)}'] = bucket_value(bucket)
+    return estimates
+
+
+def _finalize_bin(state, code):
+    record = {}
+    for col, counts in state['quantiles'].items():
+        estimates = estimate_quantiles(counts[code])
+        divisor = QUANTILE_DIVISORS.get(col, 1)
+        record[col] = {key: None if value is None else value / divisor for key, value in estimates.items()}
+    for key, registers in state['distinct'].items():
+        record[key] = hll_estimate(registers[code])
+    return record
+
+
+def finalize_sketches(partials, specs=DEFAULT_SPECS):
+    """Percentiles and distinct counts per bin, keyed like data.json"""
+    output = {SUMMARY_KEY: _finalize_bin(partials[SUMMARY_KEY], 0)}
+    for spec in specs:
+        state = partials[spec.name]
+        records = []
+        for code, label in enumerate(spec.labels):
+            if not any(counts[code].any() for counts in state['quantiles'].values()) and \
+                    not any(registers[code].any() for registers in state['distinct'].values()):
+                continue
+            records.append({spec.label_key: label if spec.edges is None else str(label),
+                            **_finalize_bin(state, code)})
+        output[spec.name] = records
+    return output
+
+
+def save_sketches(partials, path=DEFAULT_STATE_PATH):
+    """Write the mergeable sketch state as a compressed npz"""
+    arrays = {}
+    for name, state in partials.items():
+        for kind in ('quantiles', 'distinct'):
+            for key, values in state[kind].items():
+                arrays[f'{name}/{kind}/{key}'] = values
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+
+
+def load_sketches(path=DEFAULT_STATE_PATH):
+    partials = {}
+    with np.load(path) as data:
+        for key in data.files:
+            name, kind, field = key.split('/')
+            partials.setdefault(name, {'quantiles': {}, 'distinct': {}})[kind][field] = data[key]
+    return partials
+
+
+@traced()
+def stream_sketches(file_path, chunksize=DEFAULT_CHUNKSIZE, specs=DEFAULT_SPECS):
+    """Build the sketch state of a CSV one chunk at a time"""
+    partials = None
+    for chunk in read_chunks(file_path, chunksize, usecols=sketch_columns(specs)):
+        partials = merge_sketches(partials, sketch_partials(chunk, specs))
+    return partials
+
+
+@traced()
+def write_sketches(partials, output_path=DEFAULT_OUTPUT_PATH, state_path=DEFAULT_STATE_PATH, specs=DEFAULT_SPECS):
+    """Write the dashboard percentiles JSON and, if state_path is given, the mergeable state"""
+    print(f"Writing sketches to {output_path}...")
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(finalize_sketches(partials, specs), f, indent=2)
+    if state_path:
+        save_sketches(partials, state_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Percentile and distinct-count sketches per dashboard bin")
+    parser.add_argument('files', nargs='*', default=['Chennai_22March_IST.csv'], help="IST export CSVs")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_PATH)
+    parser.add_argument('--state', default=DEFAULT_STATE_PATH, help="Where the mergeable sketch state is written")
+    parser.add_argument('--merge', action='store_true', help="Fold the inputs into the existing state file")
+    args = parser.parse_args()
+
+    from binning import dimension_specs
+
+    specs = dimension_specs()
+    partials = load_sketches(args.state) if args.merge and os.path.exists(args.state) else None
+    for path in args.files:
+        print(f"Sketching {path}...")
+        partials = merge_sketches(partials, stream_sketches(path, args.chunksize, specs))
+    write_sketches(partials, args.output, args.state, specs)
+    print("Sketches completed successfully.")
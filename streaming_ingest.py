@@ -0,0 +1,70 @@
+import os
+
+import pandas as pd
+
+from analysis_tasks import checkpoint
+from dimension_aggregator import DEFAULT_SPECS, aggregate_partials, merge_partials
+from instrumentation import traced
+from ist_conversion import DATE_COLUMNS, convert_frame_to_ist
+from quote_summary import merge_quote_summaries, quote_summary_partial
+
+# Rows per chunk; peak memory is bounded by this rather than by the file size
+DEFAULT_CHUNKSIZE = 100_000
+
+
+def read_chunks(file_path, chunksize=DEFAULT_CHUNKSIZE, **read_csv_kwargs):
+    """Yield the CSV as DataFrames of at most chunksize rows"""
+    with pd.read_csv(file_path, chunksize=chunksize, **read_csv_kwargs) as reader:
+        for chunk in reader:
+            # Progress of (and cancellation point for) a background analysis task
+            checkpoint(f"reading {os.path.basename(str(file_path))}", len(chunk))
+            yield chunk
+
+
+@traced()
+def stream_convert_to_ist(input_path, output_path, chunksize=DEFAULT_CHUNKSIZE):
+    """Convert a GST export to IST chunk by chunk, appending to output_path.
+
+    Columns are read as text so every value is written back exactly as it was
+    exported, independent of the types pandas would infer for a given chunk.
+    """
+    rows = 0
+    for i, chunk in enumerate(read_chunks(input_path, chunksize, dtype=str)):
+        chunk = convert_frame_to_ist(chunk, DATE_COLUMNS)
+        chunk.to_csv(output_path, index=False, mode='w' if i == 0 else 'a', header=(i == 0))
+        rows += len(chunk)
+    return rows
+
+
+@traced()
+def stream_dimension_partials(file_path, chunksize=DEFAULT_CHUNKSIZE, specs=DEFAULT_SPECS, convert_ist=False):
+    """Build the dashboard aggregates incrementally and merge the per-chunk states"""
+    partials = None
+    for chunk in read_chunks(file_path, chunksize):
+        if convert_ist:
+            chunk = convert_frame_to_ist(chunk, DATE_COLUMNS)
+        partials = merge_partials(partials, aggregate_partials(chunk, specs))
+    return partials
+
+
+@traced()
+def stream_quote_summary(file_path, chunksize=DEFAULT_CHUNKSIZE):
+    """Build the search try / driver quote summary one chunk at a time"""
+    summary = None
+    for chunk in read_chunks(file_path, chunksize):
+        summary = merge_quote_summaries(summary, quote_summary_partial(chunk))
+    return summary
+
+
+@traced()
+def stream_time_range(file_path, chunksize=DEFAULT_CHUNKSIZE, column='created_at'):
+    """Return the (min, max) of a timestamp column reading only that column"""
+    min_time = max_time = None
+    for chunk in read_chunks(file_path, chunksize, usecols=[column]):
+        values = pd.to_datetime(chunk[column])
+        chunk_min, chunk_max = values.min(), values.max()
+        if pd.isna(chunk_min):
+            continue
+        min_time = chunk_min if min_time is None else min(min_time, chunk_min)
+        max_time = chunk_max if max_time is None else max(max_time, chunk_max)
+    return min_time, max_time
@@ -1,24 +1,47 @@
+import argparse
 import pandas as pd
+from compact_loader import load_compact
+from prepared_dataset import load_prepared, prepared_path_for
+from streaming_ingest import stream_time_range
+
+parser = argparse.ArgumentParser(description="Time range of created_at, preferring the IST file")
+parser.add_argument('--chunksize', type=int, default=None,
+                    help="Stream the CSV in chunks of this many rows instead of loading it whole")
+args = parser.parse_args()
 
 # Determine which file to use
 print("Analyzing time range for created_at column...")
 
-# Try to load the IST version first, fall back to original if needed
-try:
-    print("Reading Chennai_22March_IST.csv...")
-    df = pd.read_csv('Chennai_22March_IST.csv')
-    file_used = "Chennai_22March_IST.csv (IST times)"
-except FileNotFoundError:
-    print("IST file not found, reading Chennai_22March.csv...")
-    df = pd.read_csv('Chennai_22March.csv')
-    file_used = "Chennai_22March.csv (original times)"
+# Prefer the prepared dataset, then the IST version, falling back to original if needed
+prepared_path = prepared_path_for('Chennai_22March_IST.csv')
+if prepared_path and not args.chunksize:
+    # Only created_at is needed, already parsed to datetimes
+    print(f"Reading created_at from {prepared_path}...")
+    df = load_prepared(['created_at'], prepared_path)
+    file_used = f"{prepared_path} (IST times)"
+else:
+    try:
+        print("Reading Chennai_22March_IST.csv...")
+        if args.chunksize:
+            min_time, max_time = stream_time_range('Chennai_22March_IST.csv', args.chunksize)
+        else:
+            df = load_compact('Chennai_22March_IST.csv', ['created_at'])
+        file_used = "Chennai_22March_IST.csv (IST times)"
+    except FileNotFoundError:
+        print("IST file not found, reading Chennai_22March.csv...")
+        if args.chunksize:
+            min_time, max_time = stream_time_range('Chennai_22March.csv', args.chunksize)
+        else:
+            df = load_compact('Chennai_22March.csv', ['created_at'])
+        file_used = "Chennai_22March.csv (original times)"
 
-# Convert created_at to datetime
-df['created_at'] = pd.to_datetime(df['created_at'])
+if not args.chunksize:
+    # Convert created_at to datetime
+    df['created_at'] = pd.to_datetime(df['created_at'])
 
-# Get min and max timestamps
-min_time = df['created_at'].min()
-max_time = df['created_at'].max()
+    # Get min and max timestamps
+    min_time = df['created_at'].min()
+    max_time = df['created_at'].max()
 
 # Calculate time range
 time_range = max_time - min_time
@@ -1,15 +1,26 @@
+import argparse
 import pandas as pd
+from compact_loader import load_compact
+from streaming_ingest import stream_time_range
+
+parser = argparse.ArgumentParser(description="Time range of created_at in the original file")
+parser.add_argument('--chunksize', type=int, default=None,
+                    help="Stream the CSV in chunks of this many rows instead of loading it whole")
+args = parser.parse_args()
 
 # Load the original file
 print("Analyzing time range for created_at column in the original file...")
-df = pd.read_csv('Chennai_22March.csv')
+if args.chunksize:
+    min_time, max_time = stream_time_range('Chennai_22March.csv', args.chunksize)
+else:
+    df = load_compact('Chennai_22March.csv', ['created_at'])
 
-# Convert created_at to datetime
-df['created_at'] = pd.to_datetime(df['created_at'])
+    # Convert created_at to datetime
+    df['created_at'] = pd.to_datetime(df['created_at'])
 
-# Get min and max timestamps
-min_time = df['created_at'].min()
-max_time = df['created_at'].max()
+    # Get min and max timestamps
+    min_time = df['created_at'].min()
+    max_time = df['created_at'].max()
 
 # Calculate time range
 time_range = max_time - min_time